@@ -1,20 +1,23 @@
 import sh
 import os
 from rich.console import Console
-from archclean.utils import run_command, confirm_action, check_binary
-from archclean.tui_analyzer import LargeFilesApp
+from archclean.utils import run_command, confirm_action
+from archclean.tui_analyzer import LargeFilesApp, DiskTreeApp, DuplicatesApp, StaleFilesApp
+from archclean.rules import load_excludes
 
 console = Console()
 
-def analyze_disk_usage(force=False):
+def analyze_disk_usage(force=False, limit=100, min_size=0, exclude=(), all_mounts=False, scan_rate=None, delete_rate=None):
     console.print("[bold cyan]Disk Usage Analyzer[/bold cyan]")
     
     choice = "1"
     if not force:
         console.print("1. Interactive Large File Cleaner (Built-in TUI)")
-        console.print("2. ncdu (Standard CLI Tool)")
+        console.print("2. Directory Size Tree (Built-in TUI)")
+        console.print("3. Duplicate File Finder (Built-in TUI)")
+        console.print("4. Stale File Finder (Built-in TUI)")
         from rich.prompt import Prompt
-        choice = Prompt.ask("Choose an analyzer", choices=["1", "2"], default="1")
+        choice = Prompt.ask("Choose an analyzer", choices=["1", "2", "3", "4"], default="1")
 
     target = os.path.expanduser("~")
     use_root = False
@@ -24,35 +27,34 @@ def analyze_disk_usage(force=False):
         target = "/"
         use_root = True
 
+    if use_root:
+        # Refresh sudo credentials before starting TUI to avoid password prompt issues inside TUI
+        run_command("sudo", ["-v"])
+
+    exclude = load_excludes(exclude)
     if choice == "1":
-        # Interactive TUI
-        if use_root:
-            # Refresh sudo credentials before starting TUI to avoid password prompt issues inside TUI
-            run_command("sudo", ["-v"])
-            
-        app = LargeFilesApp(target_path=target, sudo=use_root)
-        app.run()
-        
-        # Print CLI Summary after TUI exit
-        if app.total_deleted_count > 0:
-            from rich.filesize import decimal
-            console.print("\n[bold green]Cleanup Summary:[/bold green]")
-            console.print(f"  Files Deleted: {app.total_deleted_count}")
-            console.print(f"  Space Reclaimed: {decimal(app.total_reclaimed_space)}")
+        app = LargeFilesApp(
+            target_path=target, limit=limit, sudo=use_root, min_size=min_size,
+            exclude=exclude, all_mounts=all_mounts, scan_rate=scan_rate, delete_rate=delete_rate
+        )
+        noun = "Files"
+    elif choice == "2":
+        app = DiskTreeApp(target_path=target, sudo=use_root, exclude=exclude, scan_rate=scan_rate, delete_rate=delete_rate)
+        noun = "Directories"
+    elif choice == "3":
+        app = DuplicatesApp(target_path=target, sudo=use_root, exclude=exclude, scan_rate=scan_rate, delete_rate=delete_rate)
+        noun = "Duplicates"
     else:
-        # ncdu fallback
-        if not check_binary("ncdu"):
-            console.print("[yellow]ncdu is not installed.[/yellow]")
-            if confirm_action("Do you want to install ncdu? (sudo pacman -S ncdu)", force=False):
-                run_command("pacman", ["-S", "ncdu"], sudo=True)
-                if not check_binary("ncdu"):
-                     console.print("[red]Failed to install ncdu.[/red]")
-                     return
-            else:
-                 return
-
-        args = [target]
-        if use_root:
-            args.append("-x")
-        
-        run_command("ncdu", args, sudo=use_root)
\ No newline at end of file
+        app = StaleFilesApp(
+            target_path=target, limit=limit, sudo=use_root, min_size=min_size, exclude=exclude,
+            scan_rate=scan_rate, delete_rate=delete_rate
+        )
+        noun = "Files"
+    app.run()
+    
+    # Print CLI Summary after TUI exit
+    if app.total_deleted_count > 0:
+        from rich.filesize import decimal
+        console.print("\n[bold green]Cleanup Summary:[/bold green]")
+        console.print(f"  {noun} Deleted: {app.total_deleted_count}")
+        console.print(f"  Space Reclaimed: {decimal(app.total_reclaimed_space)}")
@@ -1,30 +1,105 @@
 import os
 import shutil
+import stat
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
+from urllib.parse import unquote
 from rich.console import Console
-from archclean.utils import confirm_action
+from rich.filesize import decimal
+from rich.prompt import Prompt
+from rich.table import Table
+from archclean.utils import confirm_action, parse_selection, xdg_cache_home
 from archclean.tracker import tracker
+from archclean.sizing import USAGE_WORKERS, estimate_usage, forget_usage, is_empty, prefetch_usage, reclaimable_size, tree_usage
+from archclean.tombstone import bury, remove_tree, start_reaper
+from archclean.cleaners import languages
 
 console = Console()
 
+TRASHINFO = ".trashinfo"
+# Largest items listed before the purge prompt
+TRASH_LISTED = 15
+
+# original is None for files/ entries without an info file; deleted is a timestamp
+TrashItem = namedtuple("TrashItem", "name original deleted size")
+
+# Friendly names for well-known top-level entries of ~/.cache
+CACHE_APPS = {
+    "mozilla": "Firefox",
+    "chromium": "Chromium",
+    "google-chrome": "Google Chrome",
+    "BraveSoftware": "Brave",
+    "vivaldi": "Vivaldi",
+    "microsoft-edge": "Microsoft Edge",
+    "opera": "Opera",
+    "JetBrains": "JetBrains IDEs",
+    "vscode-cpptools": "VS Code C/C++",
+    "typescript": "TypeScript server",
+    "pip": "pip",
+    "pypoetry": "Poetry",
+    "pipenv": "Pipenv",
+    "uv": "uv",
+    "yarn": "Yarn",
+    "pnpm": "pnpm",
+    "node-gyp": "node-gyp",
+    "go-build": "Go build cache",
+    "ccache": "ccache",
+    "bazel": "Bazel",
+    "mesa_shader_cache": "Mesa shader cache",
+    "mesa_shader_cache_db": "Mesa shader cache",
+    "nvidia": "NVIDIA shader cache",
+    "fontconfig": "Fontconfig",
+    "spotify": "Spotify",
+    "discord": "Discord",
+    "Slack": "Slack",
+    "yay": "yay",
+    "paru": "paru",
+    "flatpak": "Flatpak",
+    "gstreamer-1.0": "GStreamer",
+    "tracker3": "GNOME search index",
+    "electron": "Electron",
+    "huggingface": "Hugging Face",
+    "torch": "PyTorch",
+    "wine": "Wine",
+    "winetricks": "Winetricks",
+}
+# Handled by their own cleaners, or archclean's own state
+CACHE_SKIPPED = {"thumbnails", "archclean", "yay", "paru"}
+# Cleared without asking under --force: rebuilt automatically, never data
+CACHE_FORCE_SAFE = {"mesa_shader_cache", "mesa_shader_cache_db", "nvidia", "fontconfig"}
+
+CacheEntry = namedtuple("CacheEntry", "name app path size")
+
 def get_home_dir():
     return Path.home()
 
-def clean_thumbnails(force=False):
+def clean_thumbnails(force=False, background=False):
     thumb_dir = get_home_dir() / ".cache" / "thumbnails"
     if thumb_dir.exists():
-        size = 0
-        for p in thumb_dir.rglob('*'):
-            if p.is_file():
-                size += p.stat().st_size
+        apparent, size = estimate_usage(thumb_dir)
         
         size_mb = size / (1024 * 1024)
-        if confirm_action(f"[bold yellow]Do you want to clean the thumbnail cache ({size_mb:.2f} MB)?[/bold yellow]", force):
+        apparent_mb = apparent / (1024 * 1024)
+        if confirm_action(f"[bold yellow]Do you want to clean the thumbnail cache ({size_mb:.2f} MB reclaimable, {apparent_mb:.2f} MB apparent)?[/bold yellow]", force):
             console.print("[blue]Cleaning thumbnails...[/blue]")
+            started = time.monotonic()
             try:
-                shutil.rmtree(thumb_dir)
+                if background:
+                    bury(thumb_dir)
+                    start_reaper()
+                else:
+                    shutil.rmtree(thumb_dir)
+                forget_usage(thumb_dir)
                 console.print("[green]Thumbnails cleaned.[/green]")
-                tracker.add("Home", "Thumbnails", "Cleaned", f"Freed {size_mb:.2f} MB")
+                # The whole tree goes, so it frees what was just measured
+                seconds = time.monotonic() - started
+                if background:
+                    tracker.add("Home", "Thumbnails", "Pending", f"Moved aside, {size_mb:.2f} MB freed in background", freed=size, seconds=seconds)
+                else:
+                    tracker.add("Home", "Thumbnails", "Cleaned", f"Freed {size_mb:.2f} MB", freed=size, seconds=seconds)
             except Exception as e:
                 console.print(f"[red]Error cleaning thumbnails: {e}[/red]")
                 tracker.add("Home", "Thumbnails", "Failed", str(e))
@@ -33,33 +108,291 @@ def clean_thumbnails(force=False):
     else:
         tracker.add("Home", "Thumbnails", "Cleaned", "Already empty")
 
-def empty_trash(force=False):
+def parse_trashinfo(text):
+    """Returns (original path, deletion time as a timestamp) from a .trashinfo file.
+
+    Either is None when missing or malformed. DeletionDate is local time,
+    as the trash spec stores it.
+    """
+    original = None
+    deleted = None
+    for line in text.splitlines():
+        key, _, value = line.partition("=")
+        key = key.strip()
+        if key == "Path":
+            original = unquote(value.strip())
+        elif key == "DeletionDate":
+            try:
+                deleted = datetime.fromisoformat(value.strip()).timestamp()
+            except ValueError:
+                pass
+    return original, deleted
+
+def _item_size(path):
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return 0
+    if stat.S_ISDIR(st.st_mode):
+        return tree_usage(path)[1]
+    return reclaimable_size(st)
+
+def read_trash(trash_dir):
+    """Indexes a trash directory as TrashItems, sizing the items concurrently.
+
+    Items come from info/*.trashinfo; files/ entries without one (left by
+    an interrupted trash operation) fall back to their own mtime.
+    """
+    files_dir = os.path.join(trash_dir, "files")
+    info_dir = os.path.join(trash_dir, "info")
+    found = {}
+    try:
+        with os.scandir(info_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(TRASHINFO):
+                    continue
+                try:
+                    with open(entry.path, encoding="utf-8", errors="replace") as f:
+                        original, deleted = parse_trashinfo(f.read())
+                    if deleted is None:
+                        deleted = entry.stat().st_mtime
+                except OSError:
+                    continue
+                found[entry.name[:-len(TRASHINFO)]] = (original, deleted)
+    except OSError:
+        pass
+    try:
+        with os.scandir(files_dir) as it:
+            for entry in it:
+                if entry.name not in found:
+                    try:
+                        found[entry.name] = (None, entry.stat(follow_symlinks=False).st_mtime)
+                    except OSError:
+                        continue
+    except OSError:
+        pass
+
+    names = list(found)
+    with ThreadPoolExecutor(max_workers=USAGE_WORKERS) as pool:
+        sizes = pool.map(lambda name: _item_size(os.path.join(files_dir, name)), names)
+        return [TrashItem(name, *found[name], size) for name, size in zip(names, sizes)]
+
+def select_trash(items, older_than_days=None, target=None, now=None):
+    """Picks the items to purge, oldest first.
+
+    With `older_than_days`, only items deleted at least that long ago are
+    candidates; with `target`, candidates are taken until they add up to
+    that many bytes. Without either, everything is selected.
+    """
+    candidates = sorted(items, key=lambda item: item.deleted)
+    if older_than_days is not None:
+        cutoff = (now or time.time()) - older_than_days * 86400
+        candidates = [item for item in candidates if item.deleted <= cutoff]
+    if target is None:
+        return candidates
+    chosen = []
+    freed = 0
+    for item in candidates:
+        if freed >= target:
+            break
+        chosen.append(item)
+        freed += item.size
+    return chosen
+
+def _purge_item(trash_dir, item, background=False):
+    # Data first: if it cannot be removed, its info file still describes it
+    path = os.path.join(trash_dir, "files", item.name)
+    if os.path.isdir(path) and not os.path.islink(path):
+        if background:
+            bury(path)
+        else:
+            shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.unlink(path)
+    info = os.path.join(trash_dir, "info", item.name + TRASHINFO)
+    if os.path.lexists(info):
+        os.unlink(info)
+
+def _drop_directorysizes(trash_dir, names):
+    # File managers cache directory sizes here; purged entries must go too
+    path = os.path.join(trash_dir, "directorysizes")
+    try:
+        with open(path) as f:
+            lines = f.readlines()
+        kept = [line for line in lines if unquote(line.rstrip("\n").split(" ", 2)[-1]) not in names]
+        if len(kept) != len(lines):
+            with open(path, "w") as f:
+                f.writelines(kept)
+    except OSError:
+        pass
+
+def purge_trash(trash_dir, items, background=False):
+    """Removes the files/ and info/ entries of `items`, several at a time.
+
+    With `background`, directories are buried (see archclean.tombstone) and
+    deleted by the reaper instead. Returns (purged, failed) lists of TrashItems.
+    """
+    purged = []
+    failed = []
+
+    def purge(item):
+        try:
+            _purge_item(trash_dir, item, background)
+            return True
+        except OSError:
+            return False
+
+    with ThreadPoolExecutor(max_workers=USAGE_WORKERS) as pool:
+        for item, ok in zip(items, pool.map(purge, items)):
+            (purged if ok else failed).append(item)
+    if background and purged:
+        start_reaper()
+    _drop_directorysizes(trash_dir, {item.name for item in purged})
+    return purged, failed
+
+def show_trash(items, total):
+    table = Table(title=f"Trash: {len(items)} items, {decimal(total)}")
+    table.add_column("Size", justify="right", style="bold")
+    table.add_column("Deleted", style="cyan")
+    table.add_column("Original Location", style="magenta")
+    for item in sorted(items, key=lambda item: item.size, reverse=True)[:TRASH_LISTED]:
+        deleted = datetime.fromtimestamp(item.deleted).strftime("%Y-%m-%d") if item.deleted else "?"
+        table.add_row(decimal(item.size), deleted, item.original or item.name)
+    if len(items) > TRASH_LISTED:
+        table.caption = f"{len(items) - TRASH_LISTED} smaller items not shown"
+    console.print(table)
+
+def empty_trash(force=False, older_than_days=None, target=None, background=False):
+    """Purges Trash items, all of them or the oldest ones (see select_trash)."""
     trash_dir = get_home_dir() / ".local" / "share" / "Trash"
     if trash_dir.exists():
-        files = list(trash_dir.rglob('*'))
-        if not files:
+        if is_empty(trash_dir):
+            console.print("[dim]Trash is empty.[/dim]")
+            tracker.add("Home", "Trash", "Cleaned", "Already empty")
+            return
+
+        items = read_trash(trash_dir)
+        if not items:
+            # Only bookkeeping such as directorysizes is left
             console.print("[dim]Trash is empty.[/dim]")
             tracker.add("Home", "Trash", "Cleaned", "Already empty")
             return
+        chosen = select_trash(items, older_than_days, target)
+        if not chosen:
+            if older_than_days is not None:
+                console.print(f"[dim]Nothing in the Trash was deleted more than {older_than_days} days ago.[/dim]")
+                tracker.add("Home", "Trash", "Skipped", f"{len(items)} recent items kept")
+            else:
+                console.print("[dim]No Trash items selected.[/dim]")
+                tracker.add("Home", "Trash", "Skipped", f"{len(items)} items kept")
+            return
 
-        if confirm_action("[bold yellow]Do you want to empty the Trash?[/bold yellow]", force):
+        size = sum(item.size for item in chosen)
+        show_trash(chosen, size)
+        what = "the Trash" if len(chosen) == len(items) else f"the {len(chosen)} oldest of {len(items)} Trash items"
+        if confirm_action(f"[bold yellow]Do you want to empty {what} ({decimal(size)})?[/bold yellow]", force):
             console.print("[blue]Emptying Trash...[/blue]")
-            try:
-                for item in trash_dir.iterdir():
-                    if item.is_dir():
-                        shutil.rmtree(item)
-                    else:
-                        item.unlink()
+            started = time.monotonic()
+            purged, failed = purge_trash(str(trash_dir), chosen, background)
+            forget_usage(trash_dir)
+            measured = {"freed": sum(item.size for item in purged), "seconds": time.monotonic() - started}
+            freed = decimal(measured["freed"])
+            if failed:
+                console.print(f"[red]Could not remove {len(failed)} Trash items.[/red]")
+                tracker.add("Home", "Trash", "Failed", f"Purged {len(purged)} items ({freed}), {len(failed)} failed", **measured)
+            elif len(purged) == len(items):
                 console.print("[green]Trash emptied.[/green]")
-                tracker.add("Home", "Trash", "Cleaned", "Trash emptied")
-            except Exception as e:
-                console.print(f"[red]Error emptying Trash: {e}[/red]")
-                tracker.add("Home", "Trash", "Failed", str(e))
+                tracker.add("Home", "Trash", "Cleaned", f"Trash emptied, freed {freed}", **measured)
+            else:
+                console.print(f"[green]Purged {len(purged)} Trash items.[/green]")
+                tracker.add("Home", "Trash", "Cleaned", f"Purged {len(purged)} items, freed {freed}", **measured)
         else:
             tracker.add("Home", "Trash", "Skipped", "Items kept")
     else:
         tracker.add("Home", "Trash", "Not Found", "Directory missing")
 
-def clean_home(force=False):
-    clean_thumbnails(force)
-    empty_trash(force)
\ No newline at end of file
+def read_app_caches(cache_home=None):
+    """Sizes every top-level entry of ~/.cache concurrently, largest first.
+
+    Entries that hold nothing reclaimable are left out, as are the caches a
+    language cleaner empties or prunes.
+    """
+    cache_home = cache_home or xdg_cache_home()
+    language_dirs = {os.path.abspath(path) for paths in languages.cache_dirs().values() for path in paths}
+    paths = []
+    try:
+        with os.scandir(cache_home) as it:
+            for entry in it:
+                if entry.name not in CACHE_SKIPPED and os.path.abspath(entry.path) not in language_dirs:
+                    paths.append(entry.path)
+    except OSError:
+        return []
+
+    prefetch_usage(paths)
+    entries = []
+    for path in paths:
+        name = os.path.basename(path)
+        size = estimate_usage(path)[1]
+        if size:
+            entries.append(CacheEntry(name, CACHE_APPS.get(name, name), path, size))
+    entries.sort(key=lambda entry: entry.size, reverse=True)
+    return entries
+
+def show_app_caches(entries):
+    table = Table(title=f"~/.cache: {decimal(sum(entry.size for entry in entries))} in {len(entries)} entries")
+    table.add_column("#", justify="right", style="dim")
+    table.add_column("Size", justify="right", style="bold")
+    table.add_column("Application", style="cyan")
+    table.add_column("Directory", style="magenta")
+    for number, entry in enumerate(entries, 1):
+        table.add_row(str(number), decimal(entry.size), entry.app, entry.name)
+    console.print(table)
+
+def clean_app_caches(force=False, background=False):
+    """Lets the user pick which applications' caches to clear from a ranked list.
+
+    With force only the CACHE_FORCE_SAFE ones are cleared.
+    """
+    entries = read_app_caches()
+    if not entries:
+        tracker.add("Home", "App Caches", "Cleaned", "Already empty")
+        return
+
+    show_app_caches(entries)
+    if force:
+        chosen = [entry for entry in entries if entry.name in CACHE_FORCE_SAFE]
+    else:
+        while True:
+            answer = Prompt.ask("[bold yellow]Caches to clean (e.g. 1,3-5, all or none)[/bold yellow]", default="none")
+            try:
+                chosen = [entries[i] for i in parse_selection(answer, len(entries))]
+                break
+            except ValueError as e:
+                console.print(f"[red]{e}[/red]")
+    if not chosen:
+        tracker.add("Home", "App Caches", "Skipped", f"{decimal(sum(entry.size for entry in entries))} kept")
+        return
+
+    console.print(f"[blue]Cleaning {len(chosen)} application caches...[/blue]")
+    for entry in chosen:
+        started = time.monotonic()
+        try:
+            if os.path.isdir(entry.path) and not os.path.islink(entry.path):
+                pending = remove_tree(entry.path, background)
+            else:
+                os.unlink(entry.path)
+                pending = False
+            forget_usage(entry.path)
+            measured = {"freed": entry.size, "seconds": time.monotonic() - started}
+            if pending:
+                tracker.add("Home", f"Cache: {entry.app}", "Pending", f"Moved aside, {decimal(entry.size)} freed in background", **measured)
+            else:
+                tracker.add("Home", f"Cache: {entry.app}", "Cleaned", f"Freed {decimal(entry.size)}", **measured)
+        except OSError as e:
+            console.print(f"[red]Error cleaning {entry.name}: {e}[/red]")
+            tracker.add("Home", f"Cache: {entry.app}", "Failed", str(e))
+
+def clean_home(force=False, trash_older_than=None, trash_target=None, background=False):
+    clean_thumbnails(force, background)
+    clean_app_caches(force, background)
+    empty_trash(force, older_than_days=trash_older_than, target=trash_target, background=background)
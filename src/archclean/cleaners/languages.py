@@ -1,98 +1,169 @@
+import os
+import time
 from rich.console import Console
-from archclean.utils import run_command, confirm_action, check_binary
+from rich.filesize import decimal
+from rich.table import Table
+from archclean import docker_api
+from archclean.utils import run_command, confirm_action, check_binary, xdg_cache_home
 from archclean.tracker import tracker
+from archclean.sizing import Reclaim, forget_usage, prefetch_usage, size_hint
+from archclean.tombstone import bury, remove_tree, start_reaper
+from archclean.prune import index_cache, remove_entries, select_victims
 
 console = Console()
 
-def clean_python_cache(force=False):
+def cache_dirs():
+    """Where each tool keeps the cache its cleaner empties, for size estimates."""
+    home = os.path.expanduser("~")
+    cache = xdg_cache_home()
+    cargo = os.environ.get("CARGO_HOME") or os.path.join(home, ".cargo")
+    gopath = (os.environ.get("GOPATH") or os.path.join(home, "go")).split(":")[0]
+    return {
+        "pip": [os.environ.get("PIP_CACHE_DIR") or os.path.join(cache, "pip")],
+        "npm": [os.path.join(os.environ.get("npm_config_cache") or os.path.join(home, ".npm"), "_cacache")],
+        "yarn": [os.path.join(cache, "yarn")],
+        "bun": [os.path.join(home, ".bun", "install", "cache")],
+        "cargo": [os.path.join(cargo, "registry"), os.path.join(cargo, "git")],
+        "go": [os.environ.get("GOMODCACHE") or os.path.join(gopath, "pkg", "mod")],
+        "composer": [os.environ.get("COMPOSER_CACHE_DIR") or os.path.join(cache, "composer")],
+        "gradle": [os.path.join(home, ".gradle", "caches")],
+        "ccache": [os.environ.get("CCACHE_DIR") or os.path.join(cache, "ccache"), os.path.join(home, ".ccache")],
+        "nuget": [os.path.join(home, ".nuget", "packages"), os.path.join(cache, "NuGetPackages")],
+    }
+
+def prune_cache(name, label, budget, force=False):
+    """Evicts the least recently used entries of a cache until it fits `budget` (see archclean.prune)."""
+    roots = cache_dirs()[name]
+    entries = index_cache(name, roots)
+    victims = select_victims(entries, budget)
+    kept = sum(entry.size for entry in entries) - sum(entry.size for entry in victims)
+    if not victims:
+        tracker.add("Language", label, "Cleaned", f"Within budget ({decimal(kept)} kept)")
+        return
+
+    size = sum(entry.size for entry in victims)
+    if confirm_action(f"[bold yellow]Do you want to prune {len(victims)} least recently used of {len(entries)} entries from the {label} cache ({decimal(size)}), keeping {decimal(kept)}?[/bold yellow]", force):
+        console.print(f"[blue]Pruning {label} cache...[/blue]")
+        started = time.monotonic()
+        removed, failed = remove_entries(victims)
+        for root in roots:
+            forget_usage(root)
+        # The index already sized every entry, so the cache is not walked again
+        freed = sum(entry.size for entry in removed)
+        seconds = time.monotonic() - started
+        if failed:
+            tracker.add("Language", label, "Failed", f"Pruned {len(removed)} entries, {len(failed)} failed", freed=freed, seconds=seconds)
+        else:
+            tracker.add("Language", label, "Cleaned", f"Pruned {len(removed)} LRU entries, {decimal(kept)} kept", freed=freed, seconds=seconds)
+    else:
+        tracker.add("Language", label, "Skipped", "User declined")
+
+def clean_python_cache(force=False, budget=None):
     if check_binary("python") or check_binary("python3"):
         if check_binary("pip"):
-            if confirm_action("[bold yellow]Do you want to clean the pip cache? (pip cache purge)[/bold yellow]", force):
+            if budget is not None:
+                prune_cache("pip", "Python (pip)", budget, force)
+            elif confirm_action(f"[bold yellow]Do you want to clean the pip cache{size_hint(cache_dirs()['pip'])}? (pip cache purge)[/bold yellow]", force):
                 console.print("[blue]Cleaning pip cache...[/blue]")
+                reclaim = Reclaim(cache_dirs()["pip"])
                 if run_command("pip", ["cache", "purge"]):
-                    tracker.add("Language", "Python (pip)", "Cleaned", "Cache purged")
+                    tracker.add("Language", "Python (pip)", "Cleaned", "Cache purged", **reclaim.finish())
                 else:
-                    tracker.add("Language", "Python (pip)", "Failed", "Command failed")
+                    tracker.add("Language", "Python (pip)", "Failed", "Command failed", **reclaim.finish())
             else:
                 tracker.add("Language", "Python (pip)", "Skipped", "User declined")
 
-def clean_node_cache(force=False):
+def clean_node_cache(force=False, budget=None):
     if check_binary("node"):
         if check_binary("npm"):
-            if confirm_action("[bold yellow]Do you want to clean the npm cache? (npm cache clean --force)[/bold yellow]", force):
+            if budget is not None:
+                prune_cache("npm", "Node (npm)", budget, force)
+            elif confirm_action(f"[bold yellow]Do you want to clean the npm cache{size_hint(cache_dirs()['npm'])}? (npm cache clean --force)[/bold yellow]", force):
                 console.print("[blue]Cleaning npm cache...[/blue]")
+                reclaim = Reclaim(cache_dirs()["npm"])
                 if run_command("npm", ["cache", "clean", "--force"]):
-                    tracker.add("Language", "Node (npm)", "Cleaned", "Cache cleaned")
+                    tracker.add("Language", "Node (npm)", "Cleaned", "Cache cleaned", **reclaim.finish())
                 else:
-                    tracker.add("Language", "Node (npm)", "Failed", "Command failed")
+                    tracker.add("Language", "Node (npm)", "Failed", "Command failed", **reclaim.finish())
             else:
                 tracker.add("Language", "Node (npm)", "Skipped", "User declined")
         
         if check_binary("yarn"):
-            if confirm_action("[bold yellow]Do you want to clean the yarn cache? (yarn cache clean)[/bold yellow]", force):
+            if confirm_action(f"[bold yellow]Do you want to clean the yarn cache{size_hint(cache_dirs()['yarn'])}? (yarn cache clean)[/bold yellow]", force):
                  console.print("[blue]Cleaning yarn cache...[/blue]")
+                 reclaim = Reclaim(cache_dirs()["yarn"])
                  if run_command("yarn", ["cache", "clean"]):
-                     tracker.add("Language", "Node (yarn)", "Cleaned", "Cache cleaned")
+                     tracker.add("Language", "Node (yarn)", "Cleaned", "Cache cleaned", **reclaim.finish())
                  else:
-                     tracker.add("Language", "Node (yarn)", "Failed", "Command failed")
+                     tracker.add("Language", "Node (yarn)", "Failed", "Command failed", **reclaim.finish())
             else:
                 tracker.add("Language", "Node (yarn)", "Skipped", "User declined")
 
-def clean_rust_cache(force=False):
+def clean_rust_cache(force=False, background=False, budget=None):
     if check_binary("rustc") or check_binary("cargo"):
-        if check_binary("cargo-cache"):
-            if confirm_action("[bold yellow]Do you want to clean the Cargo cache using cargo-cache?[/bold yellow]", force):
+        if budget is not None:
+            prune_cache("cargo", "Rust (Cargo)", budget, force)
+        elif check_binary("cargo-cache"):
+            if confirm_action(f"[bold yellow]Do you want to clean the Cargo cache{size_hint(cache_dirs()['cargo'])} using cargo-cache?[/bold yellow]", force):
                 console.print("[blue]Cleaning Cargo cache...[/blue]")
+                reclaim = Reclaim(cache_dirs()["cargo"])
                 if run_command("cargo-cache", ["--remove-dir", "all"]):
-                    tracker.add("Language", "Rust (cargo-cache)", "Cleaned", "All caches removed")
+                    tracker.add("Language", "Rust (cargo-cache)", "Cleaned", "All caches removed", **reclaim.finish())
                 else:
-                    tracker.add("Language", "Rust (cargo-cache)", "Failed", "Command failed")
+                    tracker.add("Language", "Rust (cargo-cache)", "Failed", "Command failed", **reclaim.finish())
             else:
                 tracker.add("Language", "Rust (cargo-cache)", "Skipped", "User declined")
         else:
-            if confirm_action("[bold yellow]Do you want to manually clear Cargo registry & index caches? (~/.cargo/registry and ~/.cargo/git)[/bold yellow]", force):
+            if confirm_action(f"[bold yellow]Do you want to manually clear Cargo registry & index caches{size_hint(cache_dirs()['cargo'])}? (~/.cargo/registry and ~/.cargo/git)[/bold yellow]", force):
                 console.print("[blue]Clearing Cargo caches...[/blue]")
-                import shutil
                 from pathlib import Path
                 cargo_home = Path.home() / ".cargo"
                 success = True
+                reclaim = Reclaim(cache_dirs()["cargo"])
                 for folder in ["registry", "git"]:
                     target = cargo_home / folder
                     if target.exists():
                         try:
-                            shutil.rmtree(target)
+                            remove_tree(target, background)
                             console.print(f"[green]Cleared {target}[/green]")
                         except Exception as e:
                             console.print(f"[red]Error clearing {target}: {e}[/red]")
                             success = False
                 
-                if success:
-                    tracker.add("Language", "Rust (Manual)", "Cleaned", "Registry/Git cleared")
+                measured = reclaim.finish()
+                if success and background:
+                    tracker.add("Language", "Rust (Manual)", "Pending", "Registry/Git moved aside, deleting in background", **measured)
+                elif success:
+                    tracker.add("Language", "Rust (Manual)", "Cleaned", "Registry/Git cleared", **measured)
                 else:
-                    tracker.add("Language", "Rust (Manual)", "Failed", "Some errors occurred")
+                    tracker.add("Language", "Rust (Manual)", "Failed", "Some errors occurred", **measured)
             else:
                 tracker.add("Language", "Rust", "Skipped", "User declined")
 
-def clean_go_cache(force=False):
+def clean_go_cache(force=False, budget=None):
     if check_binary("go"):
-        if confirm_action("[bold yellow]Do you want to clean the go module cache? (go clean -modcache)[/bold yellow]", force):
+        if budget is not None:
+            prune_cache("go", "Go", budget, force)
+        elif confirm_action(f"[bold yellow]Do you want to clean the go module cache{size_hint(cache_dirs()['go'])}? (go clean -modcache)[/bold yellow]", force):
             console.print("[blue]Cleaning go module cache...[/blue]")
+            reclaim = Reclaim(cache_dirs()["go"])
             if run_command("go", ["clean", "-modcache"]):
-                tracker.add("Language", "Go", "Cleaned", "Module cache cleared")
+                tracker.add("Language", "Go", "Cleaned", "Module cache cleared", **reclaim.finish())
             else:
-                tracker.add("Language", "Go", "Failed", "Command failed")
+                tracker.add("Language", "Go", "Failed", "Command failed", **reclaim.finish())
         else:
             tracker.add("Language", "Go", "Skipped", "User declined")
 
 def clean_php_cache(force=False):
     if check_binary("php"):
         if check_binary("composer"):
-            if confirm_action("[bold yellow]Do you want to clean the Composer cache? (composer clear-cache)[/bold yellow]", force):
+            if confirm_action(f"[bold yellow]Do you want to clean the Composer cache{size_hint(cache_dirs()['composer'])}? (composer clear-cache)[/bold yellow]", force):
                 console.print("[blue]Cleaning Composer cache...[/blue]")
+                reclaim = Reclaim(cache_dirs()["composer"])
                 if run_command("composer", ["clear-cache"]):
-                    tracker.add("Language", "PHP (Composer)", "Cleaned", "Cache cleared")
+                    tracker.add("Language", "PHP (Composer)", "Cleaned", "Cache cleared", **reclaim.finish())
                 else:
-                    tracker.add("Language", "PHP (Composer)", "Failed", "Command failed")
+                    tracker.add("Language", "PHP (Composer)", "Failed", "Command failed", **reclaim.finish())
             else:
                 tracker.add("Language", "PHP (Composer)", "Skipped", "User declined")
 
@@ -101,88 +172,168 @@ def clean_ruby_cache(force=False):
         if check_binary("gem"):
             if confirm_action("[bold yellow]Do you want to clean old Ruby gems? (gem cleanup)[/bold yellow]", force):
                 console.print("[blue]Cleaning Ruby gems...[/blue]")
+                # Gems may live in the system or the user gem dir, so watch free space
+                reclaim = Reclaim(mount=os.path.expanduser("~"))
                 if run_command("gem", ["cleanup"]):
-                    tracker.add("Language", "Ruby (Gems)", "Cleaned", "Cleanup run")
+                    tracker.add("Language", "Ruby (Gems)", "Cleaned", "Cleanup run", **reclaim.finish())
                 else:
-                    tracker.add("Language", "Ruby (Gems)", "Failed", "Command failed")
+                    tracker.add("Language", "Ruby (Gems)", "Failed", "Command failed", **reclaim.finish())
             else:
                 tracker.add("Language", "Ruby (Gems)", "Skipped", "User declined")
 
-def clean_java_cache(force=False):
+def clean_java_cache(force=False, background=False):
     if check_binary("java"):
         if check_binary("gradle"):
-            if confirm_action("[bold yellow]Do you want to clean the global Gradle cache? (~/.gradle/caches)[/bold yellow]", force):
+            if confirm_action(f"[bold yellow]Do you want to clean the global Gradle cache{size_hint(cache_dirs()['gradle'])}? (~/.gradle/caches)[/bold yellow]", force):
                 console.print("[blue]Cleaning Gradle cache...[/blue]")
-                import shutil
                 from pathlib import Path
                 gradle_cache = Path.home() / ".gradle" / "caches"
                 if gradle_cache.exists():
+                     reclaim = Reclaim(cache_dirs()["gradle"])
                      try:
-                        run_command("rm", ["-rf", str(gradle_cache)])
-                        console.print("[green]Gradle cache cleaned.[/green]")
-                        tracker.add("Language", "Java (Gradle)", "Cleaned", "Caches removed")
+                        if background:
+                            bury(gradle_cache)
+                            start_reaper()
+                            console.print("[green]Gradle cache moved aside, deleting in the background.[/green]")
+                            tracker.add("Language", "Java (Gradle)", "Pending", "Deleting in background", **reclaim.finish())
+                        else:
+                            run_command("rm", ["-rf", str(gradle_cache)])
+                            console.print("[green]Gradle cache cleaned.[/green]")
+                            tracker.add("Language", "Java (Gradle)", "Cleaned", "Caches removed", **reclaim.finish())
                      except Exception as e:
                         console.print(f"[red]Error cleaning Gradle cache: {e}[/red]")
-                        tracker.add("Language", "Java (Gradle)", "Failed", str(e))
+                        tracker.add("Language", "Java (Gradle)", "Failed", str(e), **reclaim.finish())
                 else:
                     tracker.add("Language", "Java (Gradle)", "Cleaned", "Already empty")
             else:
                 tracker.add("Language", "Java (Gradle)", "Skipped", "User declined")
 
-def clean_bun_cache(force=False):
+def clean_bun_cache(force=False, background=False):
     if check_binary("bun"):
-        if confirm_action("[bold yellow]Do you want to clean the Bun cache? (~/.bun/install/cache)[/bold yellow]", force):
+        if confirm_action(f"[bold yellow]Do you want to clean the Bun cache{size_hint(cache_dirs()['bun'])}? (~/.bun/install/cache)[/bold yellow]", force):
             console.print("[blue]Cleaning Bun cache...[/blue]")
-            import shutil
             from pathlib import Path
             bun_cache = Path.home() / ".bun" / "install" / "cache"
             if bun_cache.exists():
+                reclaim = Reclaim(cache_dirs()["bun"])
                 try:
-                    shutil.rmtree(bun_cache)
-                    console.print("[green]Bun cache cleaned.[/green]")
-                    tracker.add("Language", "Bun", "Cleaned", "Cache directory removed")
+                    if remove_tree(bun_cache, background):
+                        console.print("[green]Bun cache moved aside, deleting in the background.[/green]")
+                        tracker.add("Language", "Bun", "Pending", "Deleting in background", **reclaim.finish())
+                    else:
+                        console.print("[green]Bun cache cleaned.[/green]")
+                        tracker.add("Language", "Bun", "Cleaned", "Cache directory removed", **reclaim.finish())
                 except Exception as e:
                     console.print(f"[red]Error cleaning Bun cache: {e}[/red]")
-                    tracker.add("Language", "Bun", "Failed", str(e))
+                    tracker.add("Language", "Bun", "Failed", str(e), **reclaim.finish())
             else:
                  tracker.add("Language", "Bun", "Cleaned", "Already empty")
         else:
             tracker.add("Language", "Bun", "Skipped", "User declined")
 
-def clean_docker_cache(force=False):
+DOCKER_PRUNE_ORDER = ("Containers", "Images", "Build Cache", "Volumes")
+
+def _docker_what(kind, all_images):
+    return {
+        "Containers": "stopped containers",
+        "Images": "unused images" if all_images else "dangling images",
+        "Build Cache": "unused build cache" if all_images else "dangling build cache",
+        "Volumes": "unused anonymous volumes",
+    }[kind]
+
+def show_docker_usage(usage):
+    table = Table(title="Docker disk usage")
+    table.add_column("Type", style="cyan")
+    table.add_column("Count", justify="right")
+    table.add_column("Size", justify="right")
+    table.add_column("Reclaimable", justify="right", style="bold green")
+    for item in usage:
+        table.add_row(item.kind, str(item.count), decimal(item.total), decimal(item.reclaimable))
+    console.print(table)
+
+def clean_docker_cache(force=False, until=None, all_images=False):
+    """Prunes Docker objects through the Engine API, one kind at a time.
+
+    `until` (e.g. "24h") spares objects created more recently and
+    `all_images` also removes tagged images nothing uses. Volumes hold data,
+    so they are only pruned when asked interactively. Without access to the
+    daemon socket this falls back to `docker system prune`.
+    """
+    if not (check_binary("docker") or docker_api.available()):
+        return
+    try:
+        usage = {item.kind: item for item in docker_api.system_df(dangling_only=not all_images)}
+    except (docker_api.DockerError, OSError) as e:
+        if check_binary("docker"):
+            console.print(f"[dim]Docker API not available ({e}); using the docker CLI.[/dim]")
+            clean_docker_cli(force)
+        else:
+            tracker.add("System", "Docker", "Failed", str(e))
+        return
+
+    show_docker_usage(usage.values())
+    if not any(item.reclaimable for item in usage.values()):
+        tracker.add("System", "Docker", "Cleaned", "Nothing to reclaim")
+        return
+
+    for kind in DOCKER_PRUNE_ORDER:
+        reclaimable = usage[kind].reclaimable
+        if not reclaimable:
+            continue
+        what = _docker_what(kind, all_images)
+        if kind == "Volumes" and force:
+            tracker.add("System", f"Docker ({kind})", "Skipped", f"{decimal(reclaimable)} in {what} kept; volumes hold data")
+            continue
+        if not confirm_action(f"[bold yellow]Do you want to prune {what} ({decimal(reclaimable)} reclaimable)?[/bold yellow]", force):
+            tracker.add("System", f"Docker ({kind})", "Skipped", "User declined")
+            continue
+        console.print(f"[blue]Pruning {what}...[/blue]")
+        started = time.monotonic()
+        try:
+            freed = docker_api.prune(kind, until=until, dangling_only=not all_images)
+            tracker.add("System", f"Docker ({kind})", "Cleaned", f"Pruned {what}", freed=freed, seconds=time.monotonic() - started)
+        except (docker_api.DockerError, OSError) as e:
+            console.print(f"[red]Error pruning {what}: {e}[/red]")
+            tracker.add("System", f"Docker ({kind})", "Failed", str(e), seconds=time.monotonic() - started)
+
+def clean_docker_cli(force=False):
     if check_binary("docker"):
-        if confirm_action("[bold yellow]Do you want to prune Docker system (containers, networks, images)? (docker system prune)[/bold yellow]", force):
+        if confirm_action("[bold yellow]Do you want to prune stopped containers, unused networks, dangling images and build cache? (docker system prune)[/bold yellow]", force):
             console.print("[blue]Pruning Docker system...[/blue]")
             args = ["system", "prune"]
             if force:
                 args.append("--force")
             
+            # Docker's data root is root-owned, so watch its filesystem's free space
+            reclaim = Reclaim(mount="/var/lib/docker")
             if run_command("docker", args):
-                tracker.add("System", "Docker", "Cleaned", "System pruned")
+                tracker.add("System", "Docker", "Cleaned", "System pruned", **reclaim.finish())
             else:
-                tracker.add("System", "Docker", "Failed", "Command failed")
+                tracker.add("System", "Docker", "Failed", "Command failed", **reclaim.finish())
         else:
              tracker.add("System", "Docker", "Skipped", "User declined")
 
 def clean_ccache(force=False):
     if check_binary("ccache"):
-        if confirm_action("[bold yellow]Do you want to clear the C/C++ compiler cache? (ccache -C)[/bold yellow]", force):
+        if confirm_action(f"[bold yellow]Do you want to clear the C/C++ compiler cache{size_hint(cache_dirs()['ccache'])}? (ccache -C)[/bold yellow]", force):
             console.print("[blue]Clearing ccache...[/blue]")
+            reclaim = Reclaim(cache_dirs()["ccache"])
             if run_command("ccache", ["-C"]):
-                tracker.add("Language", "C/C++ (ccache)", "Cleaned", "Cache cleared")
+                tracker.add("Language", "C/C++ (ccache)", "Cleaned", "Cache cleared", **reclaim.finish())
             else:
-                tracker.add("Language", "C/C++ (ccache)", "Failed", "Command failed")
+                tracker.add("Language", "C/C++ (ccache)", "Failed", "Command failed", **reclaim.finish())
         else:
             tracker.add("Language", "C/C++ (ccache)", "Skipped", "User declined")
 
 def clean_dotnet_cache(force=False):
     if check_binary("dotnet"):
-        if confirm_action("[bold yellow]Do you want to clean local NuGet resources? (dotnet nuget locals all --clear)[/bold yellow]", force):
+        if confirm_action(f"[bold yellow]Do you want to clean local NuGet resources{size_hint(cache_dirs()['nuget'])}? (dotnet nuget locals all --clear)[/bold yellow]", force):
             console.print("[blue]Cleaning NuGet cache...[/blue]")
+            reclaim = Reclaim(cache_dirs()["nuget"])
             if run_command("dotnet", ["nuget", "locals", "all", "--clear"]):
-                 tracker.add("Language", ".NET (NuGet)", "Cleaned", "Locals cleared")
+                 tracker.add("Language", ".NET (NuGet)", "Cleaned", "Locals cleared", **reclaim.finish())
             else:
-                 tracker.add("Language", ".NET (NuGet)", "Failed", "Command failed")
+                 tracker.add("Language", ".NET (NuGet)", "Failed", "Command failed", **reclaim.finish())
         else:
             tracker.add("Language", ".NET (NuGet)", "Skipped", "User declined")
 
@@ -190,15 +341,18 @@ def clean_cpp_cache(force=False):
     if check_binary("gcc") or check_binary("clang") or check_binary("cc"):
         clean_ccache(force)
 
-def clean_language_caches(force=False):
-    clean_python_cache(force)
-    clean_node_cache(force)
-    clean_bun_cache(force)
-    clean_rust_cache(force)
-    clean_go_cache(force)
+def clean_language_caches(force=False, background=False, budget=None, docker_until=None, docker_all_images=False):
+    """Cleans every detected cache; with a prune `budget`, the pip, npm, Cargo and Go caches are pruned instead of purged."""
+    # Size every cache up front, concurrently; the prompts then read the results
+    prefetch_usage([path for paths in cache_dirs().values() for path in paths])
+    clean_python_cache(force, budget)
+    clean_node_cache(force, budget)
+    clean_bun_cache(force, background)
+    clean_rust_cache(force, background, budget)
+    clean_go_cache(force, budget)
     clean_php_cache(force)
     clean_ruby_cache(force)
-    clean_java_cache(force)
+    clean_java_cache(force, background)
     clean_dotnet_cache(force)
     clean_cpp_cache(force)
-    clean_docker_cache(force)
\ No newline at end of file
+    clean_docker_cache(force, until=docker_until, all_images=docker_all_images)
\ No newline at end of file
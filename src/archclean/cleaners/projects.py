@@ -0,0 +1,225 @@
+"""Build artifacts left in source checkouts: node_modules, target/, .venv, ...
+
+The workspace roots are walked by a ParallelWalker. A directory holding a
+marker file (Cargo.toml, package.json, ...) is a project, and the artifact
+directories its kind produces next to the marker are recorded without
+being entered, so a node_modules with 100,000 files costs one directory
+entry rather than a full walk. Only the artifacts found are then sized.
+"""
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from rich.console import Console
+from rich.filesize import decimal
+from rich.prompt import Prompt
+from rich.table import Table
+from archclean.utils import confirm_action, parse_selection
+from archclean.tracker import tracker
+from archclean.rules import load_excludes, load_workspaces
+from archclean.scanner import ParallelWalker
+from archclean.sizing import USAGE_WORKERS
+from archclean.prune import entry_usage
+from archclean.tombstone import remove_tree
+
+console = Console()
+
+PYTHON_ARTIFACTS = (".venv", "venv", ".tox", ".nox", ".pytest_cache", ".mypy_cache", ".ruff_cache")
+# marker file -> (project kind, artifact directories next to it)
+MARKERS = {
+    "Cargo.toml": ("Rust", ("target",)),
+    "package.json": ("Node", ("node_modules", ".next", ".nuxt", ".parcel-cache", ".turbo", ".svelte-kit")),
+    "pyproject.toml": ("Python", PYTHON_ARTIFACTS + ("build",)),
+    "setup.py": ("Python", PYTHON_ARTIFACTS + ("build",)),
+    "requirements.txt": ("Python", PYTHON_ARTIFACTS),
+    "build.gradle": ("Gradle", (".gradle", "build")),
+    "build.gradle.kts": ("Gradle", (".gradle", "build")),
+    "settings.gradle": ("Gradle", (".gradle", "build")),
+    "settings.gradle.kts": ("Gradle", (".gradle", "build")),
+    "pom.xml": ("Maven", ("target",)),
+    "CMakeLists.txt": ("CMake", ("build",)),
+    "pubspec.yaml": ("Dart", (".dart_tool", "build")),
+    "mix.exs": ("Elixir", ("_build", "deps")),
+    "stack.yaml": ("Haskell", (".stack-work",)),
+}
+# Environments are used in place rather than rebuilt, so a forced run never
+# picks them; deleting one by age alone can break a project in daily use
+ENVIRONMENTS = {".venv", "venv"}
+# Artifacts wherever they appear, marker or not
+ANYWHERE = {"__pycache__": "Python"}
+# Version control metadata is never an artifact and never holds one
+SKIPPED = {".git", ".hg", ".svn"}
+STALE_DAYS = 30
+
+# last_used is the newest atime or mtime of anything inside
+Artifact = namedtuple("Artifact", "path project kind size last_used")
+
+
+class ArtifactWalker(ParallelWalker):
+    """Finds artifact directories below several roots at once."""
+
+    def __init__(self, roots, workers=None, cancel=None, exclude=None):
+        super().__init__(roots[0], one_filesystem=False, workers=workers, cancel=cancel, exclude=exclude)
+        self.roots = [os.path.abspath(root) for root in roots]
+        # (path, project dir, kind)
+        self.found = []
+
+    def _visit(self, path, dirs):
+        try:
+            entries = self._scandir(path)
+        except OSError:
+            with self._lock:
+                self.errors += 1
+            return
+
+        artifacts = {}
+        for entry in entries:
+            marker = MARKERS.get(entry.name)
+            if marker is not None and not entry.is_dir(follow_symlinks=False):
+                kind, names = marker
+                for name in names:
+                    artifacts.setdefault(name, kind)
+
+        found = []
+        pruned = 0
+        for entry in entries:
+            try:
+                if not entry.is_dir(follow_symlinks=False) or entry.name in SKIPPED:
+                    continue
+                kind = artifacts.get(entry.name) or ANYWHERE.get(entry.name)
+                if kind is not None:
+                    # Recorded, never entered
+                    found.append((entry.path, path, kind))
+                    continue
+                if self._prune(entry.path, entry.name, entry.stat(follow_symlinks=False)):
+                    pruned += 1
+                    continue
+                dirs.put(entry.path)
+            except OSError:
+                continue
+
+        with self._lock:
+            self.found.extend(found)
+            self.pruned += pruned
+
+    def scan(self, progress=None, interval=0.5):
+        for root in self.roots:
+            try:
+                st = os.stat(root)
+            except OSError:
+                continue
+            self._dir_inodes[(st.st_dev, st.st_ino)] = root
+
+        def tick():
+            if progress:
+                progress(len(self.found))
+
+        roots = [root for root in self.roots if os.path.isdir(root)]
+        if roots:
+            self._walk(roots[0], tick, interval, others=roots[1:])
+        return self.found
+
+
+def find_artifacts(roots, exclude=None):
+    """Returns the Artifacts below `roots`, largest first, each sized concurrently."""
+    found = ArtifactWalker(roots, exclude=exclude).scan()
+
+    def measure(item):
+        path, project, kind = item
+        # Reads count too: an environment installed long ago may be used daily
+        usage = entry_usage(path)
+        if usage is None:
+            return None
+        return Artifact(path, project, kind, usage.size, usage.last_used)
+
+    with ThreadPoolExecutor(max_workers=USAGE_WORKERS) as pool:
+        artifacts = [artifact for artifact in pool.map(measure, found) if artifact is not None and artifact.size]
+    artifacts.sort(key=lambda artifact: artifact.size, reverse=True)
+    return artifacts
+
+
+def idle_days(artifact, now=None):
+    return max(0, ((now or time.time()) - artifact.last_used) / 86400)
+
+
+def show_artifacts(artifacts, stale_days, now=None):
+    total = sum(artifact.size for artifact in artifacts)
+    table = Table(title=f"Build artifacts: {decimal(total)} in {len(artifacts)} directories")
+    table.add_column("#", justify="right", style="dim")
+    table.add_column("Size", justify="right", style="bold")
+    table.add_column("Last Used", style="cyan")
+    table.add_column("Kind", style="green")
+    table.add_column("Path", style="magenta")
+    home = os.path.expanduser("~")
+    for number, artifact in enumerate(artifacts, 1):
+        days = idle_days(artifact, now)
+        when = datetime.fromtimestamp(artifact.last_used).strftime("%Y-%m-%d")
+        style = "bold" if days >= stale_days else "dim"
+        path = artifact.path.replace(home, "~", 1) if artifact.path.startswith(home + "/") else artifact.path
+        table.add_row(str(number), decimal(artifact.size), f"[{style}]{when} ({days:.0f}d)[/{style}]", artifact.kind, path)
+    console.print(table)
+
+
+def choose_artifacts(artifacts, stale_days, force=False):
+    """Asks which artifacts to delete; "old" picks those not used for `stale_days`.
+
+    With force the old ones are taken without asking, except ENVIRONMENTS.
+    """
+    old = [artifact for artifact in artifacts if idle_days(artifact) >= stale_days]
+    if force:
+        return [artifact for artifact in old if os.path.basename(artifact.path) not in ENVIRONMENTS]
+    while True:
+        answer = Prompt.ask(
+            f"[bold yellow]Artifacts to delete (e.g. 1,3-5, old = not used for {stale_days} days, all or none)[/bold yellow]",
+            default="old" if old else "none",
+        )
+        if answer.strip().lower() == "old":
+            return old
+        try:
+            return [artifacts[i] for i in parse_selection(answer, len(artifacts))]
+        except ValueError as e:
+            console.print(f"[red]{e}[/red]")
+
+
+def clean_project_artifacts(force=False, roots=None, stale_days=STALE_DAYS, background=False):
+    roots = roots or load_workspaces()
+    if not roots:
+        tracker.add("Projects", "Build Artifacts", "Not Found", "No workspace directories")
+        return
+
+    console.print(f"[blue]Looking for build artifacts in {', '.join(roots)}...[/blue]")
+    artifacts = find_artifacts(roots, exclude=load_excludes())
+    if not artifacts:
+        tracker.add("Projects", "Build Artifacts", "Cleaned", "None found")
+        return
+
+    show_artifacts(artifacts, stale_days)
+    chosen = choose_artifacts(artifacts, stale_days, force)
+    if not chosen:
+        tracker.add("Projects", "Build Artifacts", "Skipped", f"{decimal(sum(a.size for a in artifacts))} kept")
+        return
+    if not force and len(chosen) > 1 and not confirm_action(
+        f"[bold yellow]Delete {len(chosen)} artifact directories ({decimal(sum(a.size for a in chosen))})?[/bold yellow]"
+    ):
+        tracker.add("Projects", "Build Artifacts", "Skipped", "User declined")
+        return
+
+    # One report line per kind of project
+    results = {}
+    for artifact in chosen:
+        started = time.monotonic()
+        count, freed, failed, seconds = results.get(artifact.kind, (0, 0, 0, 0.0))
+        try:
+            remove_tree(artifact.path, background)
+            count += 1
+            freed += artifact.size
+        except OSError as e:
+            console.print(f"[red]Error removing {artifact.path}: {e}[/red]")
+            failed += 1
+        results[artifact.kind] = (count, freed, failed, seconds + time.monotonic() - started)
+
+    for kind, (count, freed, failed, seconds) in results.items():
+        status = "Failed" if failed else ("Pending" if background else "Cleaned")
+        info = f"Removed {count} dirs" + (f", {failed} failed" if failed else "")
+        tracker.add("Projects", f"{kind} artifacts", status, info, freed=freed, seconds=seconds)
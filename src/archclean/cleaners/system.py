@@ -1,24 +1,37 @@
 import sh
 import click
-import re
+import os
+import time
 from rich.console import Console
 from rich.prompt import Confirm
-from archclean.utils import run_command, confirm_action, check_binary
+from rich.filesize import decimal
+from rich.table import Table
+from archclean.utils import run_command, confirm_action, check_binary, forget_tools, xdg_cache_home
 from archclean.tracker import tracker
+from archclean.sizing import Reclaim, estimate_usage, forget_usage, size_hint
+from archclean.pkgcache import KEEP_VERSIONS, plan_removals
+from archclean.deleter import delete_paths
+from archclean import pacmandb
 
 console = Console()
 
-def clean_pacman_cache(force=False):
+JOURNAL_DIR = "/var/log/journal"
+CACHE_PLAN_ROWS = 15
+
+def pacman_cache_dirs():
     try:
         cache_dirs = sh.Command("pacman-conf")("CacheDir").strip().split('\n')
     except (sh.ErrorReturnCode, sh.CommandNotFound):
         cache_dirs = ["/var/cache/pacman/pkg/"]
+    return [cdir.strip() for cdir in cache_dirs if cdir.strip()]
 
+def find_broken_downloads(cache_dirs):
+    """Directories left in the package cache by interrupted downloads."""
     found_broken = []
     from pathlib import Path
     
     for cdir in cache_dirs:
-        p = Path(cdir.strip())
+        p = Path(cdir)
         if p.exists() and p.is_dir():
             try:
                 for item in p.iterdir():
@@ -26,35 +39,96 @@ def clean_pacman_cache(force=False):
                         found_broken.append(item)
             except PermissionError:
                 pass
+    return found_broken
+
+def show_cache_plan(removals, cached, keep):
+    """Lists the packages losing the most cached bytes, then the total."""
+    per_package = {}
+    for package in removals:
+        versions, size = per_package.get(package.name, ([], 0))
+        per_package[package.name] = (versions + [package.version], size + package.size)
+
+    table = Table(title=f"Pacman cache: keeping the newest {keep} versions of each package")
+    table.add_column("Package", style="cyan")
+    table.add_column("Removed versions", style="magenta")
+    table.add_column("Size", justify="right", style="bold")
+    largest = sorted(per_package.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (versions, size) in largest[:CACHE_PLAN_ROWS]:
+        table.add_row(name, ", ".join(versions), decimal(size))
+    if len(largest) > CACHE_PLAN_ROWS:
+        rest = largest[CACHE_PLAN_ROWS:]
+        table.add_row(f"... {len(rest)} more", "", decimal(sum(size for _, (_, size) in rest)))
+    freed = sum(package.size for package in removals)
+    table.caption = f"{decimal(freed)} of {decimal(cached)} cached, in {sum(len(p.files) for p in removals)} files"
+    console.print(table)
+
+def prune_pacman_cache(cache_dirs, force=False, keep=KEEP_VERSIONS, keep_uninstalled=None):
+    """Deletes all but the newest `keep` versions of each cached package in one privileged batch."""
+    action_name = f"Pacman Cache (keep {keep})"
+    removals, cached = plan_removals(cache_dirs, keep, keep_uninstalled)
+    if not removals:
+        console.print(f"[green]No cached package has more than {keep} versions.[/green]")
+        tracker.add("System", action_name, "Cleaned", "Nothing to remove")
+        return
+
+    show_cache_plan(removals, cached, keep)
+    freed = sum(package.size for package in removals)
+    if not confirm_action(f"[bold yellow]Do you want to remove {len(removals)} old package versions ({decimal(freed)})?[/bold yellow]", force):
+        tracker.add("System", action_name, "Skipped", "User declined")
+        return
+
+    console.print("[blue]Removing old package versions...[/blue]")
+    started = time.monotonic()
+    results = {"freed": 0}
+
+    def on_result(path, ok, reclaimed, error):
+        results["freed"] += reclaimed
+
+    paths = [path for package in removals for path in package.files]
+    deleted, failed = delete_paths(paths, sudo=True, on_result=on_result)
+    for cdir in cache_dirs:
+        forget_usage(cdir)
+    status = "Failed" if failed and not deleted else "Cleaned"
+    info = f"Removed {len(deleted)} files" + (f", {len(failed)} failed" if failed else "")
+    tracker.add("System", action_name, status, info, freed=results["freed"], seconds=time.monotonic() - started)
+
+def clean_pacman_cache(force=False, keep=KEEP_VERSIONS, keep_uninstalled=None):
+    cache_dirs = pacman_cache_dirs()
+    found_broken = find_broken_downloads(cache_dirs)
     
     if found_broken:
-        console.print(f"[bold red]Found {len(found_broken)} broken/partial download directories in Pacman cache.[/bold red]")
+        console.print(f"[bold red]Found {len(found_broken)} broken/partial download directories in Pacman cache{size_hint([str(b) for b in found_broken])}.[/bold red]")
         if confirm_action("[bold yellow]Do you want to remove these broken artifacts first? (Fixes 'Is a directory' errors)[/bold yellow]", force):
             console.print("[blue]Removing broken artifacts...[/blue]")
             success_count = 0
+            reclaim = Reclaim(found_broken)
             for broken in found_broken:
                 if run_command("rm", ["-rf", str(broken)], sudo=True):
                     success_count += 1
-            tracker.add("System", "Broken Downloads", "Cleaned", f"Removed {success_count} dirs")
+            tracker.add("System", "Broken Downloads", "Cleaned", f"Removed {success_count} dirs", **reclaim.finish())
         else:
             tracker.add("System", "Broken Downloads", "Skipped", "User declined")
 
     thorough = False
     if not force:
         thorough = Confirm.ask("[bold yellow]Do you want to perform a thorough Pacman cache clean? (pacman -Scc removes all cached packages)[/bold yellow]", default=False)
-    
-    cmd_flag = "-Scc" if thorough else "-Sc"
+    if not thorough:
+        prune_pacman_cache(cache_dirs, force, keep, keep_uninstalled)
+        return
+
+    cmd_flag = "-Scc"
     action_name = f"Pacman Cache ({cmd_flag})"
+    cached = estimate_usage(cache_dirs)[1]
+    held = f" ({decimal(cached)} cached)" if cached else ""
 
-    if force or confirm_action(f"[bold yellow]Do you want to clean the Pacman cache? (pacman {cmd_flag})[/bold yellow]", force):
+    if confirm_action(f"[bold yellow]Do you want to clean the Pacman cache{held}? (pacman {cmd_flag})[/bold yellow]", force):
         console.print(f"[blue]Cleaning Pacman cache with {cmd_flag}...[/blue]")
         args = [cmd_flag]
-        if force:
-             args.append("--noconfirm")
+        reclaim = Reclaim(cache_dirs)
         if run_command("pacman", args, sudo=True):
-            tracker.add("System", action_name, "Cleaned", "Cache cleared")
+            tracker.add("System", action_name, "Cleaned", "Cache cleared", **reclaim.finish())
         else:
-            tracker.add("System", action_name, "Failed", "Check logs")
+            tracker.add("System", action_name, "Failed", "Check logs", **reclaim.finish())
     else:
         tracker.add("System", action_name, "Skipped", "User declined")
 
@@ -66,60 +140,70 @@ def clean_aur_helper_cache(force=False):
         helper = "yay"
     
     if helper:
-        if confirm_action(f"[bold yellow]Do you want to clean the {helper} cache? ({helper} -Sc)[/bold yellow]", force):
+        helper_cache = os.path.join(xdg_cache_home(), helper)
+        if confirm_action(f"[bold yellow]Do you want to clean the {helper} cache{size_hint(helper_cache)}? ({helper} -Sc)[/bold yellow]", force):
             console.print(f"[blue]Cleaning {helper} cache...[/blue]")
             args = ["-Sc"]
             if force:
                 args.append("--noconfirm")
+            reclaim = Reclaim(helper_cache)
             if run_command(helper, args, sudo=False):
-                tracker.add("System", f"AUR Helper ({helper})", "Cleaned", "Cache cleared")
+                tracker.add("System", f"AUR Helper ({helper})", "Cleaned", "Cache cleared", **reclaim.finish())
             else:
-                tracker.add("System", f"AUR Helper ({helper})", "Failed", "Check logs")
+                tracker.add("System", f"AUR Helper ({helper})", "Failed", "Check logs", **reclaim.finish())
         else:
             tracker.add("System", f"AUR Helper ({helper})", "Skipped", "User declined")
     else:
         tracker.add("System", "AUR Helper", "Not Found", "Neither yay nor paru found")
 
-def remove_orphans(force=False):
-    try:
-        orphans = sh.pacman("-Qtdq", "--color=never", _ok_code=[0, 1])
-    except sh.ErrorReturnCode:
-        orphans = ""
+def find_orphans(db=None):
+    """Packages installed as dependencies that nothing explicitly installed needs any more, directly or not."""
+    return pacmandb.find_orphans(pacmandb.read_local_db(db))
 
-    if not orphans.strip():
-        console.print("[green]No orphan packages found.[/green]")
-        tracker.add("System", "Orphans", "Cleaned", "No orphans found")
-        return
+def show_orphans(orphans):
+    table = Table(title=f"Orphan packages: {decimal(sum(p.size for p in orphans))} installed")
+    table.add_column("Package", style="cyan")
+    table.add_column("Version", style="magenta")
+    table.add_column("Size", justify="right", style="bold")
+    for package in sorted(orphans, key=lambda p: p.size, reverse=True):
+        table.add_row(package.name, package.version, decimal(package.size))
+    console.print(table)
 
-    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-    orphan_list = [ansi_escape.sub('', pkg).strip() for pkg in orphans.strip().split('\n') if ansi_escape.sub('', pkg).strip()]
+def remove_orphans(force=False):
+    orphans = find_orphans()
 
-    count = len(orphan_list)
+    count = len(orphans)
     if count == 0:
         console.print("[green]No orphan packages found.[/green]")
         tracker.add("System", "Orphans", "Cleaned", "No orphans found")
         return
 
-    console.print(f"[bold magenta]Found {count} orphan packages:[/bold magenta] {', '.join(orphan_list)}")
+    show_orphans(orphans)
 
-    if confirm_action("[bold yellow]Do you want to remove these orphans?[/bold yellow]", force):
+    if confirm_action(f"[bold yellow]Do you want to remove these {count} orphans?[/bold yellow]", force):
         console.print("[blue]Removing orphans...[/blue]")
-        args = ["-Rns"] + orphan_list
+        args = ["-Rns"] + [package.name for package in orphans]
         if force:
             args.append("--noconfirm")
+        reclaim = Reclaim(mount="/usr")
         if run_command("pacman", args, sudo=True):
-            tracker.add("System", "Orphans", "Cleaned", f"Removed {count} packages")
+            # Removed packages may have taken tools with them
+            forget_tools()
+            tracker.add("System", "Orphans", "Cleaned", f"Removed {count} packages", **reclaim.finish())
         else:
             tracker.add("System", "Orphans", "Failed", "Removal failed")
     else:
         tracker.add("System", "Orphans", "Skipped", f"{count} orphans kept")
 
 def vacuum_journal(force=False):
-    if confirm_action("[bold yellow]Do you want to vacuum system journals to 2 weeks? (journalctl --vacuum-time=2weeks)[/bold yellow]", force):
+    if confirm_action(f"[bold yellow]Do you want to vacuum system journals{size_hint(JOURNAL_DIR)} to 2 weeks? (journalctl --vacuum-time=2weeks)[/bold yellow]", force):
         console.print("[blue]Vacuuming journals...[/blue]")
+        # Journal files are only readable by root and the journal group
+        reclaim = Reclaim(mount=JOURNAL_DIR)
         if run_command("journalctl", ["--vacuum-time=2weeks"], sudo=True):
-            tracker.add("System", "Journal", "Cleaned", "Vacuumed to 2 weeks")
+            forget_usage(JOURNAL_DIR)
+            tracker.add("System", "Journal", "Cleaned", "Vacuumed to 2 weeks", **reclaim.finish())
         else:
-            tracker.add("System", "Journal", "Failed", "Command failed")
+            tracker.add("System", "Journal", "Failed", "Command failed", **reclaim.finish())
     else:
         tracker.add("System", "Journal", "Skipped", "User declined")
\ No newline at end of file
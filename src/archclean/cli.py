@@ -1,23 +1,60 @@
 import click
+import os
 from rich.console import Console
-from archclean.cleaners import system, home, languages
+from archclean.cleaners import system, home, languages, projects
 from archclean.analyzer import analyze_disk_usage
 from archclean.tracker import tracker
+from archclean.utils import parse_size
+from archclean.throttle import lower_priority
+from archclean.prune import Budget
+from archclean.pkgcache import KEEP_VERSIONS
+from archclean import planner, tombstone
 
 console = Console()
 
 @click.group()
 @click.option('--force', is_flag=True, help="Force actions without confirmation (use with caution).")
+@click.option('--idle', is_flag=True, help="Run at idle I/O priority and lowest CPU priority, so busy machines are not slowed down.")
+@click.option('--background-delete', is_flag=True, help="Move large caches aside instantly and delete them in a detached background process.")
 @click.pass_context
-def cli(ctx, force):
+def cli(ctx, force, idle, background_delete):
     """ArchClean: A CLI tool for cleaning Arch Linux safely."""
     ctx.ensure_object(dict)
     ctx.obj['FORCE'] = force
+    ctx.obj['BACKGROUND'] = background_delete
+    if idle and not lower_priority():
+        console.print("[yellow]Could not set the idle I/O class; running at low CPU priority only.[/yellow]")
+
+def _resume_deletions():
+    # Finish background deletions an earlier run did not get to complete.
+    # Only commands that delete do this; plan and --dry-run change nothing.
+    try:
+        stuck = tombstone.resume()
+    except OSError:
+        return
+    if stuck:
+        console.print(f"[yellow]Background deletion could not remove {len(stuck)} path(s); delete them by hand:[/yellow]")
+        for path in stuck:
+            console.print(f"  {path}")
+
+def _size_option(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        return parse_size(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
 
 @cli.command()
+@click.option('--dry-run', is_flag=True, help="Only show what would be cleaned and how much it would free (same as 'plan').")
+@click.option('--with-projects', is_flag=True, help="Include project build artifacts when running with --force.")
 @click.pass_context
-def full(ctx):
+def full(ctx, dry_run, with_projects):
     """Runs the full interactive cleaning wizard."""
+    if dry_run:
+        planner.plan(with_projects=with_projects)
+        return
+    _resume_deletions()
     force = ctx.obj['FORCE']
     console.print("[bold green]Starting ArchClean Wizard...[/bold green]")
     
@@ -28,10 +65,17 @@ def full(ctx):
     system.vacuum_journal(force)
     
     console.rule("[bold]Home Directory Cleaning[/bold]")
-    home.clean_home(force)
+    home.clean_home(force, background=ctx.obj['BACKGROUND'])
     
     console.rule("[bold]Language & Runtime Caches[/bold]")
-    languages.clean_language_caches(force)
+    languages.clean_language_caches(force, background=ctx.obj['BACKGROUND'])
+    
+    console.rule("[bold]Project Build Artifacts[/bold]")
+    if force and not with_projects:
+        # Checkouts hold work in progress; deleting there unattended is opt-in
+        tracker.add("Projects", "Build Artifacts", "Skipped", "Forced runs need --with-projects")
+    else:
+        projects.clean_project_artifacts(force, background=ctx.obj['BACKGROUND'])
     
     console.rule("[bold]Disk Analysis[/bold]")
     analyze_disk_usage(force)
@@ -40,38 +84,84 @@ def full(ctx):
     tracker.print_summary()
 
 @cli.command()
+@click.option('--json', 'as_json', is_flag=True, help="Print the plan as JSON, e.g. for monitoring.")
+@click.option('--with-projects', is_flag=True, help="Count project build artifacts, as 'full --force --with-projects' would delete them.")
+def plan(as_json, with_projects):
+    """Shows what every cleaner would do and the space it would free, without changing anything."""
+    planner.plan(as_json=as_json, with_projects=with_projects)
+
+@cli.command()
+@click.option('--keep-versions', type=click.IntRange(min=0), default=KEEP_VERSIONS, show_default=True, metavar="N", help="Cached versions of each package to keep in the Pacman cache.")
+@click.option('--keep-uninstalled', type=click.IntRange(min=0), metavar="N", help="Cached versions to keep of packages that are not installed (0 removes them).")
 @click.pass_context
-def system_clean(ctx):
+def system_clean(ctx, keep_versions, keep_uninstalled):
     """Performs only system-level cleaning."""
+    _resume_deletions()
     force = ctx.obj['FORCE']
-    system.clean_pacman_cache(force)
+    system.clean_pacman_cache(force, keep=keep_versions, keep_uninstalled=keep_uninstalled)
     system.clean_aur_helper_cache(force)
     system.remove_orphans(force)
     system.vacuum_journal(force)
     tracker.print_summary()
 
 @cli.command()
+@click.option('--trash-older-than', type=click.IntRange(min=0), metavar="DAYS", help="Only purge Trash items deleted at least this many days ago.")
+@click.option('--trash-target', callback=_size_option, help="Purge the oldest Trash items until this much is freed (e.g. 5G).")
 @click.pass_context
-def home_clean(ctx):
+def home_clean(ctx, trash_older_than, trash_target):
     """Performs only home directory cleaning."""
+    _resume_deletions()
     force = ctx.obj['FORCE']
-    home.clean_home(force)
+    home.clean_home(force, trash_older_than=trash_older_than, trash_target=trash_target, background=ctx.obj['BACKGROUND'])
     tracker.print_summary()
 
 @cli.command()
+@click.option('--prune-to', callback=_size_option, metavar="SIZE", help="Prune the pip, npm, Cargo and Go caches to at most this size each, least recently used first (e.g. 2G).")
+@click.option('--prune-older-than', type=click.IntRange(min=0), metavar="DAYS", help="Prune entries of those caches not used for this many days.")
+@click.option('--docker-until', metavar="AGE", help="Only prune Docker objects created more than this long ago (e.g. 24h).")
+@click.option('--docker-all-images', is_flag=True, help="Also prune tagged Docker images and build cache no container uses.")
 @click.pass_context
-def lang_clean(ctx):
+def lang_clean(ctx, prune_to, prune_older_than, docker_until, docker_all_images):
     """Performs only language cache cleaning."""
+    _resume_deletions()
     force = ctx.obj['FORCE']
-    languages.clean_language_caches(force)
+    budget = None
+    if prune_to is not None or prune_older_than is not None:
+        budget = Budget(prune_to, prune_older_than)
+    languages.clean_language_caches(
+        force, background=ctx.obj['BACKGROUND'], budget=budget,
+        docker_until=docker_until, docker_all_images=docker_all_images,
+    )
     tracker.print_summary()
 
 @cli.command()
+@click.option('--root', 'roots', multiple=True, type=click.Path(file_okay=False), help="Workspace directory to search for projects (default: 'workspaces' in rules.toml, or ~/src, ~/projects, ...). Repeatable.")
+@click.option('--older-than', default=projects.STALE_DAYS, show_default=True, type=click.IntRange(min=0), metavar="DAYS", help="Artifacts not used for this many days count as old; --force deletes only those, keeping virtualenvs.")
 @click.pass_context
-def analyze(ctx):
+def projects_clean(ctx, roots, older_than):
+    """Finds build artifacts (node_modules, target/, .venv, ...) in project checkouts and deletes the chosen ones."""
+    _resume_deletions()
+    force = ctx.obj['FORCE']
+    roots = [os.path.expanduser(root) for root in roots]
+    projects.clean_project_artifacts(force, roots=roots, stale_days=older_than, background=ctx.obj['BACKGROUND'])
+    tracker.print_summary()
+
+@cli.command()
+@click.option('--limit', default=100, show_default=True, type=click.IntRange(min=1), help="Number of largest files to list.")
+@click.option('--min-size', default="0", callback=_size_option, help="Ignore files smaller than this (e.g. 500K, 100M, 1G).")
+@click.option('--exclude', multiple=True, metavar="PATTERN", help="Skip directories by name (node_modules) or path glob (~/VMs, /srv/*). Repeatable.")
+@click.option('--all-mounts', is_flag=True, help="Also scan disk filesystems mounted below the target, walking separate disks concurrently.")
+@click.option('--scan-rate', type=click.IntRange(min=1), help="List at most this many directory entries per second while scanning.")
+@click.option('--delete-rate', callback=_size_option, help="Free at most this much per second when deleting files (e.g. 50M).")
+@click.pass_context
+def analyze(ctx, limit, min_size, exclude, all_mounts, scan_rate, delete_rate):
     """Runs disk usage analysis."""
+    _resume_deletions()
     force = ctx.obj['FORCE']
-    analyze_disk_usage(force)
+    analyze_disk_usage(
+        force, limit=limit, min_size=min_size, exclude=exclude, all_mounts=all_mounts,
+        scan_rate=scan_rate, delete_rate=delete_rate
+    )
 
 if __name__ == '__main__':
     cli()
\ No newline at end of file
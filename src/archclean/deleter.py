@@ -0,0 +1,130 @@
+"""Batched deletion with a single privileged helper for files that need root.
+
+delete_paths() removes what it can in-process and hands everything that
+needs root to one `sudo python -m archclean.deleter` process, instead of
+one `sudo rm` per file. Results are reported per path as they happen.
+A `max_rate` in bytes per second spreads large deletions out over time,
+since freeing many extents at once can stall other I/O on the filesystem.
+"""
+import json
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import threading
+from archclean.sizing import reclaimable_size, tree_usage
+from archclean.throttle import RateLimit
+
+
+def remove_path(path, recursive=False):
+    """Deletes one path and returns the bytes that freed."""
+    st = os.lstat(path)
+    if recursive and stat.S_ISDIR(st.st_mode):
+        reclaim = tree_usage(path)[1]
+        shutil.rmtree(path)
+    else:
+        reclaim = reclaimable_size(st, path)
+        os.remove(path)
+    return reclaim
+
+
+def _elevated_delete(paths, recursive, report, max_rate):
+    cmd = ["sudo", sys.executable, "-m", "archclean.deleter"]
+    if recursive:
+        cmd.append("--recursive")
+    if max_rate:
+        cmd.append(f"--max-rate={max_rate}")
+
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+    # Feed the paths from a thread so a long list cannot deadlock against
+    # the helper's output.
+    def feed():
+        try:
+            proc.stdin.buffer.write(b"\0".join(os.fsencode(p) for p in paths))
+            proc.stdin.close()
+        except OSError:
+            pass
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+
+    reported = set()
+    for line in proc.stdout:
+        path, ok, reclaim, error = json.loads(line)
+        reported.add(path)
+        report(path, ok, reclaim, error)
+    feeder.join()
+    stderr = proc.stderr.read().strip()
+    proc.wait()
+
+    for path in paths:
+        if path not in reported:
+            report(path, False, 0, stderr or f"helper exited with {proc.returncode}")
+
+
+def delete_paths(paths, sudo=False, recursive=False, on_result=None, max_rate=None):
+    """Deletes `paths`, calling on_result(path, ok, reclaimed, error) for each.
+
+    Without sudo, files that fail with a permission error are retried in one
+    batch through the privileged helper. At most `max_rate` bytes are freed
+    per second, if given. Returns (deleted, failed) lists.
+    """
+    deleted = []
+    failed = []
+    limit = RateLimit(max_rate)
+
+    def report(path, ok, reclaim, error):
+        (deleted if ok else failed).append(path)
+        if on_result:
+            on_result(path, ok, reclaim, error)
+
+    elevated = []
+    if sudo and os.geteuid() != 0:
+        elevated = list(paths)
+    else:
+        for path in paths:
+            try:
+                reclaim = remove_path(path, recursive)
+                report(path, True, reclaim, None)
+                limit.wait(reclaim)
+            except PermissionError as e:
+                if os.geteuid() == 0:
+                    report(path, False, 0, e.strerror)
+                else:
+                    elevated.append(path)
+            except OSError as e:
+                report(path, False, 0, e.strerror)
+
+    if elevated:
+        _elevated_delete(elevated, recursive, report, max_rate)
+    return deleted, failed
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="archclean.deleter")
+    parser.add_argument("--recursive", action="store_true")
+    parser.add_argument("--max-rate", type=float, default=None)
+    args = parser.parse_args(argv)
+    limit = RateLimit(args.max_rate)
+
+    # NUL-separated paths on stdin, one JSON result line per path on stdout
+    for raw in sys.stdin.buffer.read().split(b"\0"):
+        if not raw:
+            continue
+        path = os.fsdecode(raw)
+        try:
+            result = [path, True, remove_path(path, args.recursive), None]
+        except OSError as e:
+            result = [path, False, 0, e.strerror]
+        json.dump(result, sys.stdout)
+        sys.stdout.write("\n")
+        sys.stdout.flush()
+        limit.wait(result[2])
+
+
+if __name__ == "__main__":
+    main()
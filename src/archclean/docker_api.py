@@ -0,0 +1,168 @@
+"""A small client for the Docker Engine API on its unix socket.
+
+Talking to the daemon directly gives what the CLI only prints: one
+/system/df call returns the size of every image, container, volume and
+build cache record, and each prune endpoint reports the bytes it freed.
+"""
+import http.client
+import json
+import os
+import socket
+from collections import namedtuple
+from urllib.parse import urlencode
+
+DOCKER_SOCKET = "/var/run/docker.sock"
+TIMEOUT = 60
+# Prunes of large build caches or image sets can take minutes
+PRUNE_TIMEOUT = 600
+# Set by the daemon on volumes created without a name
+ANONYMOUS_LABEL = "com.docker.volume.anonymous"
+
+# kind is one of KINDS; reclaimable counts what a prune could free
+DockerUsage = namedtuple("DockerUsage", "kind count total reclaimable")
+KINDS = ("Images", "Containers", "Volumes", "Build Cache")
+PRUNE_PATHS = {
+    "Images": "/images/prune",
+    "Containers": "/containers/prune",
+    "Volumes": "/volumes/prune",
+    "Build Cache": "/build/prune",
+}
+
+
+class DockerError(Exception):
+    pass
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=TIMEOUT):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+def socket_path():
+    """The daemon socket: $DOCKER_HOST if it is a unix:// address, else the default."""
+    host = os.environ.get("DOCKER_HOST", "")
+    if host.startswith("unix://"):
+        return host[len("unix://"):]
+    return DOCKER_SOCKET
+
+
+def available(path=None):
+    return os.path.exists(path or socket_path())
+
+
+def request(method, path, query=None, sock=None, timeout=TIMEOUT):
+    """Sends one API request and returns the decoded JSON reply.
+
+    Raises DockerError for error replies and OSError when the daemon cannot
+    be reached (no socket, or no permission to use it).
+    """
+    if query:
+        path = f"{path}?{urlencode(query)}"
+    conn = UnixHTTPConnection(sock or socket_path(), timeout=timeout)
+    try:
+        conn.request(method, path, headers={"Host": "docker"})
+        response = conn.getresponse()
+        body = response.read()
+    except http.client.HTTPException as e:
+        raise DockerError(f"bad reply from the Docker daemon: {e}")
+    finally:
+        conn.close()
+    try:
+        data = json.loads(body) if body else None
+    except ValueError:
+        data = None
+    if response.status >= 400:
+        message = data.get("message") if isinstance(data, dict) else body.decode(errors="replace").strip()
+        raise DockerError(message or f"HTTP {response.status}")
+    return data
+
+
+def _positive(value):
+    # The daemon reports -1 for sizes it did not compute
+    return value if isinstance(value, int) and value > 0 else 0
+
+
+def _dangling(image):
+    return not image.get("RepoTags") or image["RepoTags"] == ["<none>:<none>"]
+
+
+def _anonymous(volume):
+    return ANONYMOUS_LABEL in (volume.get("Labels") or {})
+
+
+def summarize_df(df, dangling_only=True):
+    """Turns a /system/df reply into DockerUsage per kind, like `docker system df`.
+
+    Images count as reclaimable when no container uses them (only untagged
+    ones with `dangling_only`), minus layers shared with images that stay.
+    Volumes count only when unused and anonymous, the ones /volumes/prune
+    removes without `all`.
+    """
+    images = df.get("Images") or []
+    containers = df.get("Containers") or []
+    volumes = df.get("Volumes") or []
+    cache = df.get("BuildCache") or []
+
+    unused = [image for image in images if not image.get("Containers")]
+    if dangling_only:
+        unused = [image for image in unused if _dangling(image)]
+    stopped = [c for c in containers if c.get("State") != "running"]
+    orphaned = [v for v in volumes if (v.get("UsageData") or {}).get("RefCount") == 0 and _anonymous(v)]
+    idle_cache = [record for record in cache if not record.get("InUse") and not record.get("Shared")]
+
+    return [
+        DockerUsage(
+            "Images", len(images), _positive(df.get("LayersSize")) or sum(_positive(i.get("Size")) for i in images),
+            sum(_positive(i.get("Size")) - _positive(i.get("SharedSize")) for i in unused),
+        ),
+        DockerUsage(
+            "Containers", len(containers), sum(_positive(c.get("SizeRw")) for c in containers),
+            sum(_positive(c.get("SizeRw")) for c in stopped),
+        ),
+        DockerUsage(
+            "Volumes", len(volumes), sum(_positive((v.get("UsageData") or {}).get("Size")) for v in volumes),
+            sum(_positive((v.get("UsageData") or {}).get("Size")) for v in orphaned),
+        ),
+        DockerUsage(
+            "Build Cache", len(cache), sum(_positive(r.get("Size")) for r in cache),
+            sum(_positive(r.get("Size")) for r in idle_cache),
+        ),
+    ]
+
+
+def system_df(dangling_only=True, sock=None):
+    """Fetches disk usage for everything in one /system/df call."""
+    return summarize_df(request("GET", "/system/df", sock=sock) or {}, dangling_only)
+
+
+def prune(kind, until=None, dangling_only=True, sock=None):
+    """Prunes one kind of object and returns the bytes the daemon reports freed.
+
+    `until` (e.g. "24h") keeps objects created more recently. Without
+    `dangling_only`, images and build cache not used by anything are removed
+    even if tagged. Volumes are filtered by label only, as the API allows, and
+    only anonymous ones are removed.
+    """
+    filters = {}
+    query = {}
+    if until and kind != "Volumes":
+        filters["until"] = [until]
+    if kind == "Images":
+        filters["dangling"] = ["true" if dangling_only else "false"]
+    elif kind == "Build Cache" and not dangling_only:
+        query["all"] = "true"
+    if filters:
+        query["filters"] = json.dumps(filters)
+    reply = request("POST", PRUNE_PATHS[kind], query, sock=sock, timeout=PRUNE_TIMEOUT) or {}
+    return _positive(reply.get("SpaceReclaimed"))
@@ -0,0 +1,407 @@
+"""Parallel duplicate file finder.
+
+Files are narrowed down in three rounds so most of them are never read:
+first by size, then by a hash of their first and last block, and only the
+files that still collide get a full content hash.
+"""
+import errno
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import stat
+import subprocess
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from archclean.scanner import ParallelWalker, DEFAULT_WORKERS, _limiter, _rate_args
+from archclean.sizing import reclaimable_size
+from archclean.throttle import RateLimit
+
+PARTIAL_BLOCK = 64 * 1024
+MMAP_THRESHOLD = 16 * 1024 * 1024
+READ_CHUNK = 1024 * 1024
+
+# <linux/fs.h>: clone all extents of one file into another
+FICLONE = 0x40049409
+
+
+class SizeGroupWalker(ParallelWalker):
+    """Collects regular files grouped by size, one path per inode."""
+
+    def __init__(self, root, min_size=1, one_filesystem=True, workers=None, cancel=None, exclude=None, rate=None):
+        super().__init__(root, one_filesystem=one_filesystem, workers=workers, cancel=cancel, exclude=exclude, rate=rate)
+        self.min_size = min_size
+        self.by_size = {}
+        self._inodes = set()
+
+    def _visit(self, path, dirs):
+        found = []
+        files = 0
+        total = 0
+        errors = 0
+        pruned = 0
+        try:
+            for entry in self._scandir(path):
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        sub_st = None
+                        if self.one_filesystem:
+                            sub_st = entry.stat(follow_symlinks=False)
+                            if sub_st.st_dev != self._root_dev:
+                                continue
+                        if self._prune(entry.path, entry.name, sub_st):
+                            pruned += 1
+                            continue
+                        dirs.put(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        files += 1
+                        total += st.st_size
+                        if st.st_size >= self.min_size:
+                            found.append((st.st_size, entry.path, (st.st_dev, st.st_ino), st.st_nlink))
+                except OSError:
+                    errors += 1
+        except OSError:
+            errors += 1
+
+        with self._lock:
+            for size, file_path, inode, nlink in found:
+                # Hardlinks of one inode already share their data
+                if nlink > 1:
+                    if inode in self._inodes:
+                        continue
+                    self._inodes.add(inode)
+                self.by_size.setdefault(size, []).append(file_path)
+            self.files_seen += files
+            self.bytes_seen += total
+            self.errors += errors
+            self.pruned += pruned
+
+    def scan(self, progress=None, interval=0.5):
+        root_st = os.stat(self.root)
+        self._root_dev = root_st.st_dev
+        self._dir_inodes[(root_st.st_dev, root_st.st_ino)] = self.root
+
+        def tick():
+            if progress:
+                progress("walk", self.files_seen, self.bytes_seen)
+
+        self._walk(self.root, tick, interval)
+        return self.by_size
+
+
+def partial_hash(path, size):
+    """Hashes the first and last PARTIAL_BLOCK bytes of a file."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        digest.update(f.read(PARTIAL_BLOCK))
+        if size > PARTIAL_BLOCK:
+            f.seek(max(PARTIAL_BLOCK, size - PARTIAL_BLOCK))
+            digest.update(f.read(PARTIAL_BLOCK))
+    return digest.digest()
+
+
+def full_hash(path, size):
+    """Hashes a whole file, through mmap for large ones."""
+    digest = hashlib.blake2b()
+    with open(path, "rb") as f:
+        # A file that changed size since the walk is no longer in its group,
+        # and mapping one that shrank to nothing fails
+        if os.fstat(f.fileno()).st_size != size:
+            raise OSError(errno.ESTALE, "file changed since it was listed", path)
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+                for offset in range(0, len(mm), READ_CHUNK):
+                    digest.update(mm[offset:offset + READ_CHUNK])
+        else:
+            while chunk := f.read(READ_CHUNK):
+                digest.update(chunk)
+    return digest.digest()
+
+
+def _regroup(pool, groups, hasher, cancel):
+    """Splits every (size, paths) group by hasher(path, size); keeps collisions."""
+    jobs = [(size, path) for size, paths in groups for path in paths]
+
+    def run(job):
+        size, path = job
+        if cancel and cancel.is_set():
+            return None
+        try:
+            return hasher(path, size)
+        except (OSError, ValueError):
+            return None
+
+    buckets = {}
+    for (size, path), digest in zip(jobs, pool.map(run, jobs)):
+        if digest is not None:
+            buckets.setdefault((size, digest), []).append(path)
+    return [(size, paths) for (size, _), paths in buckets.items() if len(paths) > 1]
+
+
+def find_duplicates(root, min_size=1, one_filesystem=True, workers=None, progress=None, cancel=None, exclude=None, max_rate=None):
+    """Returns [(size, [paths])] groups of identical files, most wasted space first.
+
+    progress(stage, done, total) is called while walking ("walk" with files
+    and bytes seen) and before each hashing round. `max_rate` caps the
+    directory entries listed per second during the walk.
+    """
+    walker = SizeGroupWalker(
+        root, min_size=min_size, one_filesystem=one_filesystem, cancel=cancel, exclude=exclude, rate=_limiter(max_rate),
+    )
+    by_size = walker.scan(progress=progress)
+    groups = [(size, paths) for size, paths in by_size.items() if len(paths) > 1]
+    if progress:
+        progress("walk", walker.files_seen, walker.bytes_seen)
+
+    with ThreadPoolExecutor(max_workers=workers or DEFAULT_WORKERS) as pool:
+        if progress:
+            progress("partial", sum(len(paths) for _, paths in groups), 0)
+        groups = _regroup(pool, groups, partial_hash, cancel)
+
+        # Files that fit in the partial read were already hashed whole
+        small = [(size, paths) for size, paths in groups if size <= PARTIAL_BLOCK]
+        large = [(size, paths) for size, paths in groups if size > PARTIAL_BLOCK]
+        if progress:
+            progress("full", sum(len(paths) for _, paths in large), sum(size * len(paths) for size, paths in large))
+        groups = small + _regroup(pool, large, full_hash, cancel)
+
+    for _, paths in groups:
+        paths.sort()
+    groups.sort(key=lambda group: group[0] * (len(group[1]) - 1), reverse=True)
+    return groups
+
+
+def _copy_metadata(source, target, st):
+    """Gives `target` the owner, mode, times and extended attributes (ACLs included) of `source`."""
+    # Before chmod, since chown drops setuid and setgid bits
+    current = os.stat(target)
+    if (current.st_uid, current.st_gid) != (st.st_uid, st.st_gid):
+        os.chown(target, st.st_uid, st.st_gid)
+    os.chmod(target, st.st_mode & 0o7777)
+    try:
+        names = os.listxattr(source)
+    except OSError:
+        names = []
+    for name in names:
+        try:
+            os.setxattr(target, name, os.getxattr(source, name))
+        except OSError:
+            # security.* and trusted.* need privileges the caller may lack
+            pass
+    os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+def replace_with_link(keep, duplicate, reflink=False):
+    """Atomically replaces `duplicate` with a hardlink or reflink of `keep`.
+
+    The link is created under a temporary name next to the duplicate and then
+    renamed over it, so the duplicate is never missing. A reflink keeps the
+    duplicate's owner, permissions and extended attributes.
+    """
+    directory = os.path.dirname(duplicate)
+    tmp = os.path.join(directory, f".archclean-link-{uuid.uuid4().hex}")
+    try:
+        if reflink:
+            with open(keep, "rb") as src, open(tmp, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            _copy_metadata(duplicate, tmp, os.stat(duplicate))
+        else:
+            os.link(keep, tmp)
+        os.replace(tmp, duplicate)
+    except OSError:
+        if os.path.lexists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def same_content(keep, duplicate, size):
+    """True if both are still regular files of `size` bytes with identical contents."""
+    for path in (keep, duplicate):
+        st = os.lstat(path)
+        if not stat.S_ISREG(st.st_mode) or st.st_size != size:
+            return False
+    # Compared directly rather than through filecmp, whose cache trusts mtimes
+    with open(keep, "rb") as a, open(duplicate, "rb") as b:
+        while True:
+            chunk = a.read(READ_CHUNK)
+            if chunk != b.read(READ_CHUNK):
+                return False
+            if not chunk:
+                return True
+
+
+def apply_duplicate(keep, duplicate, size, mode):
+    """Deletes `duplicate` ("delete") or replaces it with a "hardlink" or "reflink" to `keep`.
+
+    Both files are compared again first, so one edited since the scan is
+    left alone. Returns (reclaimed, apparent) bytes.
+    """
+    if not same_content(keep, duplicate, size):
+        raise OSError(errno.ESTALE, "changed since the scan", duplicate)
+    st = os.lstat(duplicate)
+    reclaim = reclaimable_size(st, duplicate)
+    if mode == "delete":
+        os.remove(duplicate)
+    else:
+        replace_with_link(keep, duplicate, reflink=(mode == "reflink"))
+    return reclaim, st.st_size
+
+
+def _elevated_apply(items, mode, report, max_rate=None):
+    cmd = ["sudo", sys.executable, "-m", "archclean.duplicates", "--apply", mode]
+    cmd.extend(_rate_args(max_rate))
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+    # Fed from a thread so a long list cannot deadlock against the output
+    def feed():
+        try:
+            proc.stdin.write(json.dumps(items))
+            proc.stdin.close()
+        except OSError:
+            pass
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    reported = set()
+    for line in proc.stdout:
+        path, ok, reclaim, apparent, error = json.loads(line)
+        reported.add(path)
+        report(path, ok, reclaim, apparent, error)
+    feeder.join()
+    stderr = proc.stderr.read().strip()
+    proc.wait()
+
+    for _, path, _ in items:
+        if path not in reported:
+            report(path, False, 0, 0, stderr or f"helper exited with {proc.returncode}")
+
+
+def process_duplicates(items, mode, sudo=False, on_result=None, max_rate=None):
+    """Applies `mode` to every (keep, duplicate, size) item, calling
+    on_result(duplicate, ok, reclaimed, apparent, error) for each.
+
+    With `sudo`, files the user cannot change themselves are handled in one
+    batch by a privileged helper rather than one sudo call per file; the
+    rest never go through root. At most `max_rate` bytes are freed per
+    second, if given. Returns (done, failed) lists.
+    """
+    done = []
+    failed = []
+    limit = RateLimit(max_rate)
+
+    def report(path, ok, reclaim, apparent, error):
+        (done if ok else failed).append(path)
+        if on_result:
+            on_result(path, ok, reclaim, apparent, error)
+
+    elevated = []
+    for keep, duplicate, size in items:
+        try:
+            reclaim, apparent = apply_duplicate(keep, duplicate, size, mode)
+            report(duplicate, True, reclaim, apparent, None)
+            limit.wait(reclaim)
+        except PermissionError as e:
+            if sudo and os.geteuid() != 0:
+                elevated.append((keep, duplicate, size))
+            else:
+                report(duplicate, False, 0, 0, e.strerror)
+        except OSError as e:
+            report(duplicate, False, 0, 0, e.strerror)
+
+    if elevated:
+        _elevated_apply(elevated, mode, report, max_rate)
+    return done, failed
+
+
+def _apply_main(mode, max_rate=None):
+    # A JSON list of [keep, duplicate, size] on stdin, one JSON result line per item
+    limit = RateLimit(max_rate)
+    for keep, duplicate, size in json.load(sys.stdin):
+        try:
+            result = [duplicate, True, *apply_duplicate(keep, duplicate, size, mode), None]
+        except OSError as e:
+            result = [duplicate, False, 0, 0, e.strerror]
+        json.dump(result, sys.stdout)
+        sys.stdout.write("\n")
+        sys.stdout.flush()
+        limit.wait(result[2])
+
+
+def _elevated_find(root, min_size, one_filesystem, progress, cancel, exclude, max_rate):
+    cmd = ["sudo", sys.executable, "-m", "archclean.duplicates", root, "--min-size", str(min_size)]
+    if not one_filesystem:
+        cmd.append("--cross-devices")
+    cmd.extend(f"--exclude={pattern}" for pattern in exclude or ())
+    cmd.extend(_rate_args(max_rate))
+
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    groups = []
+    try:
+        for line in proc.stdout:
+            if cancel and cancel.is_set():
+                proc.terminate()
+                break
+            data = json.loads(line)
+            if "groups" in data:
+                groups = [(size, paths) for size, paths in data["groups"]]
+            elif progress:
+                progress(data["stage"], data["done"], data["total"])
+    finally:
+        stderr = proc.stderr.read()
+        proc.wait()
+
+    if proc.returncode != 0 and not (cancel and cancel.is_set()):
+        raise Exception(f"Scan failed: {stderr.strip()}")
+    return groups
+
+
+def scan_duplicates(root, sudo=False, min_size=1, one_filesystem=True, progress=None, cancel=None, exclude=None, max_rate=None):
+    """Like find_duplicates, running as root through sudo when asked to."""
+    if sudo and os.geteuid() != 0:
+        return _elevated_find(root, min_size, one_filesystem, progress, cancel, exclude, max_rate)
+    return find_duplicates(
+        root, min_size=min_size, one_filesystem=one_filesystem, progress=progress, cancel=cancel, exclude=exclude,
+        max_rate=max_rate,
+    )
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="archclean.duplicates")
+    parser.add_argument("root", nargs="?")
+    parser.add_argument("--apply", choices=["delete", "hardlink", "reflink"])
+    parser.add_argument("--min-size", type=int, default=1)
+    parser.add_argument("--cross-devices", action="store_true")
+    parser.add_argument("--exclude", action="append", default=[])
+    parser.add_argument("--max-rate", type=float, default=None)
+    args = parser.parse_args(argv)
+    if args.apply:
+        # With --apply, --max-rate is in bytes freed per second
+        _apply_main(args.apply, args.max_rate)
+        return
+    if args.root is None:
+        parser.error("root is required")
+
+    lock = threading.Lock()
+
+    def emit(data):
+        with lock:
+            json.dump(data, sys.stdout)
+            sys.stdout.write("\n")
+            sys.stdout.flush()
+
+    groups = find_duplicates(
+        args.root, min_size=args.min_size, one_filesystem=not args.cross_devices, exclude=args.exclude,
+        max_rate=args.max_rate, progress=lambda stage, done, total: emit({"stage": stage, "done": done, "total": total}),
+    )
+    emit({"groups": groups})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Mounted filesystems from /proc/self/mountinfo, grouped by physical disk.
+
+A scan with -xdev only covers one filesystem. To cover /home, /var and data
+disks too, the analyzer scans every real block-device filesystem under the
+target, one scanner per disk, so separate disks are walked concurrently
+while partitions of the same disk are walked one after another.
+"""
+import os
+import re
+from collections import namedtuple
+from archclean.rules import Pruner
+
+MOUNTINFO = "/proc/self/mountinfo"
+
+# Block-backed filesystems that are read-only images rather than user data
+IMAGE_FSTYPES = {"squashfs", "iso9660", "udf", "erofs"}
+
+Mount = namedtuple("Mount", "mount_id parent dev root mount_point fstype source")
+DeviceGroup = namedtuple("DeviceGroup", "device rotational mount_points")
+
+
+def _unescape(field):
+    # mountinfo escapes space, tab, newline and backslash as \ooo
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), field)
+
+
+def parse_mountinfo(text):
+    """Parses mountinfo text into Mount tuples, in mount order."""
+    mounts = []
+    for line in text.splitlines():
+        if " - " not in line:
+            continue
+        head, tail = line.split(" - ", 1)
+        fields = head.split()
+        rest = tail.split()
+        if len(fields) < 5 or len(rest) < 2:
+            continue
+        mounts.append(Mount(
+            int(fields[0]), int(fields[1]), fields[2], _unescape(fields[3]),
+            _unescape(fields[4]), rest[0], _unescape(rest[1]),
+        ))
+    return mounts
+
+
+def read_mounts(path=MOUNTINFO):
+    try:
+        with open(path) as f:
+            return parse_mountinfo(f.read())
+    except OSError:
+        return []
+
+
+def block_mounts(mounts):
+    """Keeps real block-device filesystems, each mounted tree only once.
+
+    Later mounts over the same mount point hide earlier ones, and bind mounts
+    of a directory already inside another kept mount of the same filesystem
+    are dropped, since walking them would count the same files twice.
+    """
+    visible = {}
+    for mount in mounts:
+        visible[mount.mount_point] = mount
+
+    kept = []
+    for mount in sorted(visible.values(), key=lambda m: (len(m.root), m.mount_point)):
+        if not mount.source.startswith("/dev/") or mount.fstype in IMAGE_FSTYPES:
+            continue
+        if any(k.dev == mount.dev and _within(mount.root, k.root) for k in kept):
+            continue
+        kept.append(mount)
+    return sorted(kept, key=lambda m: m.mount_point)
+
+
+def _within(path, parent):
+    return parent == "/" or path == parent or path.startswith(parent + "/")
+
+
+def disk_of(source, sys_block="/sys/class/block"):
+    """Returns the disk a block device lives on ("nvme0n1" for /dev/nvme0n1p2).
+
+    Device-mapper and md devices (LVM, LUKS, RAID) are followed through
+    their slaves/ down to the disk below; one spanning several devices is
+    its own group.
+    """
+    name = os.path.basename(os.path.realpath(source))
+    seen = set()
+    while name not in seen:
+        seen.add(name)
+        sys_path = os.path.join(sys_block, name)
+        try:
+            slaves = os.listdir(os.path.join(sys_path, "slaves"))
+        except OSError:
+            slaves = []
+        if len(slaves) == 1:
+            name = slaves[0]
+            continue
+        if os.path.exists(os.path.join(sys_path, "partition")):
+            return os.path.basename(os.path.dirname(os.path.realpath(sys_path)))
+        break
+    return name
+
+
+def is_rotational(disk, sys_block="/sys/class/block"):
+    try:
+        with open(os.path.join(sys_block, disk, "queue", "rotational")) as f:
+            return f.read().strip() == "1"
+    except OSError:
+        return False
+
+
+def _excluded(mount_point, target, prune):
+    # A mount is skipped when the walk from target would prune it or any directory above it
+    path = mount_point
+    while path != target and path != "/":
+        if prune(path, os.path.basename(path)):
+            return True
+        path = os.path.dirname(path)
+    return False
+
+
+def device_groups(target, mounts=None, exclude=None):
+    """Returns DeviceGroups covering `target` and every block mount below it.
+
+    The first mount point of the first group is `target` itself, scanned on
+    whatever filesystem holds it. Mounts inside directories matching the
+    `exclude` patterns (see rules.Pruner), such as snapper's .snapshots
+    subvolumes, are left out.
+    """
+    target = os.path.abspath(target)
+    mounts = block_mounts(read_mounts() if mounts is None else mounts)
+    prune = Pruner(exclude) if exclude else None
+
+    holder = None
+    below = []
+    for mount in mounts:
+        if mount.mount_point != target and _within(mount.mount_point, target):
+            if prune is None or not _excluded(mount.mount_point, target, prune):
+                below.append(mount)
+        elif _within(target, mount.mount_point):
+            if holder is None or len(mount.mount_point) > len(holder.mount_point):
+                holder = mount
+
+    groups = {}
+    order = []
+    for point, source in [(target, holder.source if holder else target)] + [(m.mount_point, m.source) for m in below]:
+        disk = disk_of(source) if source.startswith("/dev/") else source
+        if disk not in groups:
+            groups[disk] = []
+            order.append(disk)
+        groups[disk].append(point)
+    return [DeviceGroup(disk, is_rotational(disk), groups[disk]) for disk in order]
@@ -0,0 +1,112 @@
+"""Reads pacman's local package database without running pacman.
+
+Every installed package has a directory in /var/lib/pacman/local holding a
+`desc` file of %SECTION% blocks: name, version, installed size, install
+reason, dependencies, optional dependencies and what it provides. Parsing
+those gives the whole dependency graph in memory, so orphans can be found
+transitively in one pass instead of repeating `pacman -Qtdq` until nothing
+new turns up.
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from archclean.sizing import USAGE_WORKERS
+
+LOCAL_DB = "/var/lib/pacman/local"
+
+# reason is EXPLICIT or DEPENDENCY; size is the installed size in bytes;
+# depends, optdepends and provides are bare names, without versions
+LocalPackage = namedtuple("LocalPackage", "name version reason size depends optdepends provides")
+EXPLICIT = 0
+DEPENDENCY = 1
+
+
+def dependency_name(dep):
+    """Strips the version constraint or description: "glibc>=2.38" and "python: plugins" name glibc and python."""
+    dep = dep.split(":", 1)[0]
+    for i, char in enumerate(dep):
+        if char in "<>=":
+            return dep[:i].strip()
+    return dep.strip()
+
+
+def parse_desc(text):
+    """Splits a desc file into {section: [lines]}."""
+    sections = {}
+    current = None
+    for line in text.splitlines():
+        if line.startswith("%") and line.endswith("%") and len(line) > 2:
+            current = sections.setdefault(line[1:-1], [])
+        elif line and current is not None:
+            current.append(line)
+    return sections
+
+
+def package_from_desc(text):
+    sections = parse_desc(text)
+    if not sections.get("NAME"):
+        return None
+    try:
+        size = int((sections.get("SIZE") or ["0"])[0])
+    except ValueError:
+        size = 0
+    # No %REASON% means installed explicitly
+    reason = DEPENDENCY if (sections.get("REASON") or ["0"])[0] == "1" else EXPLICIT
+    return LocalPackage(
+        sections["NAME"][0], (sections.get("VERSION") or [""])[0], reason, size,
+        tuple(dependency_name(dep) for dep in sections.get("DEPENDS", ())),
+        tuple(dependency_name(dep) for dep in sections.get("OPTDEPENDS", ())),
+        tuple(dependency_name(dep) for dep in sections.get("PROVIDES", ())),
+    )
+
+
+def _read_package(path):
+    try:
+        with open(os.path.join(path, "desc"), encoding="utf-8", errors="replace") as f:
+            return package_from_desc(f.read())
+    except OSError:
+        return None
+
+
+def read_local_db(db=None):
+    """Returns {name: LocalPackage} for every installed package; empty if the database cannot be read."""
+    db = db or LOCAL_DB
+    try:
+        with os.scandir(db) as it:
+            paths = [entry.path for entry in it if entry.is_dir(follow_symlinks=False)]
+    except OSError:
+        return {}
+    with ThreadPoolExecutor(max_workers=USAGE_WORKERS) as pool:
+        return {package.name: package for package in pool.map(_read_package, paths) if package is not None}
+
+
+def find_orphans(packages, keep_optional=True):
+    """Returns the packages nothing explicitly installed still needs, directly or not.
+
+    Everything reachable from an explicitly installed package through its
+    dependencies (and optional dependencies with `keep_optional`, as
+    `pacman -Qtd` treats them) is needed; a dependency satisfied by a
+    provider keeps every installed provider. The rest, including cycles of
+    packages that only need each other, are orphans, sorted by name.
+    """
+    providers = {}
+    for package in packages.values():
+        providers.setdefault(package.name, []).append(package.name)
+        for provided in package.provides:
+            providers.setdefault(provided, []).append(package.name)
+
+    needed = set()
+    stack = [name for name, package in packages.items() if package.reason == EXPLICIT]
+    while stack:
+        name = stack.pop()
+        if name in needed:
+            continue
+        needed.add(name)
+        package = packages[name]
+        deps = package.depends + package.optdepends if keep_optional else package.depends
+        for dep in deps:
+            # A package of that name satisfies it before any provider does
+            for provider in [dep] if dep in packages else providers.get(dep, ()):
+                if provider not in needed:
+                    stack.append(provider)
+    return [packages[name] for name in sorted(packages) if name not in needed]
@@ -0,0 +1,187 @@
+"""Version retention for the pacman package cache, like paccache.
+
+`pacman -Sc` keeps every cached version of an installed package and
+`pacman -Scc` keeps none. Here the cache directories are listed once, each
+file name is split into name, version and architecture, and the versions
+of every package are ordered with pacman's own vercmp rules, so the newest
+few can be kept as rollback targets while everything older goes in one
+batched privileged delete.
+"""
+import functools
+import os
+from collections import namedtuple
+from archclean.pacmandb import read_local_db
+from archclean.sizing import allocated_size
+
+KEEP_VERSIONS = 3
+# What follows ".pkg.tar"; ".part" files are unfinished downloads
+COMPRESSIONS = {"", ".gz", ".bz2", ".xz", ".zst", ".lz4", ".lzo", ".lrz", ".lz", ".Z"}
+
+# files holds every copy of this version (one per cache dir) and their signatures
+CachedPackage = namedtuple("CachedPackage", "name version arch files size")
+
+
+def parse_package_filename(filename):
+    """Splits "name-version-release-arch.pkg.tar.zst" into (name, version-release, arch).
+
+    Signatures parse like their package. Returns None for anything else.
+    """
+    if filename.endswith(".sig"):
+        filename = filename[:-4]
+    base, sep, ext = filename.partition(".pkg.tar")
+    if not sep or ext not in COMPRESSIONS:
+        return None
+    parts = base.rsplit("-", 3)
+    if len(parts) != 4 or not all(parts):
+        return None
+    name, version, release, arch = parts
+    return name, f"{version}-{release}", arch
+
+
+def _isdigit(char):
+    return "0" <= char <= "9"
+
+
+def _isalpha(char):
+    return "a" <= char <= "z" or "A" <= char <= "Z"
+
+
+def _isalnum(char):
+    return _isdigit(char) or _isalpha(char)
+
+
+def rpmvercmp(a, b):
+    """Compares two version strings segment by segment, as libalpm does."""
+    if a == b:
+        return 0
+    one = two = 0
+    ptr1 = ptr2 = 0
+    while one < len(a) and two < len(b):
+        while one < len(a) and not _isalnum(a[one]):
+            one += 1
+        while two < len(b) and not _isalnum(b[two]):
+            two += 1
+        if one >= len(a) or two >= len(b):
+            break
+        # Different separator lengths decide on their own
+        if one - ptr1 != two - ptr2:
+            return -1 if one - ptr1 < two - ptr2 else 1
+
+        ptr1, ptr2 = one, two
+        isnum = _isdigit(a[ptr1])
+        same_kind = _isdigit if isnum else _isalpha
+        while ptr1 < len(a) and same_kind(a[ptr1]):
+            ptr1 += 1
+        while ptr2 < len(b) and same_kind(b[ptr2]):
+            ptr2 += 1
+
+        # A numeric segment is newer than an alpha one
+        if two == ptr2:
+            return 1 if isnum else -1
+
+        seg1, seg2 = a[one:ptr1], b[two:ptr2]
+        if isnum:
+            seg1, seg2 = seg1.lstrip("0"), seg2.lstrip("0")
+            if len(seg1) != len(seg2):
+                return 1 if len(seg1) > len(seg2) else -1
+        if seg1 != seg2:
+            return -1 if seg1 < seg2 else 1
+        one, two = ptr1, ptr2
+
+    rest1, rest2 = a[one:], b[two:]
+    if not rest1 and not rest2:
+        return 0
+    # A trailing alpha segment ("1.0beta") is older than nothing at all ("1.0")
+    if (not rest1 and not _isalpha(rest2[0])) or (rest1 and _isalpha(rest1[0])):
+        return -1
+    return 1
+
+
+def _parse_evr(evr):
+    epoch, sep, rest = evr.partition(":")
+    if not sep or not (epoch.isdigit() or not epoch):
+        epoch, rest = "0", evr
+    epoch = epoch or "0"
+    version, sep, release = rest.rpartition("-")
+    if not sep:
+        return epoch, rest, None
+    return epoch, version, release
+
+
+@functools.lru_cache(maxsize=65536)
+def vercmp(a, b):
+    """pacman's vercmp: -1, 0 or 1 as "[epoch:]version[-release]" a is older, equal or newer than b."""
+    if a == b:
+        return 0
+    epoch1, version1, release1 = _parse_evr(a)
+    epoch2, version2, release2 = _parse_evr(b)
+    result = rpmvercmp(epoch1, epoch2)
+    if result == 0:
+        result = rpmvercmp(version1, version2)
+        if result == 0 and release1 is not None and release2 is not None:
+            result = rpmvercmp(release1, release2)
+    return result
+
+
+def scan_cache(cache_dirs):
+    """Lists the cached packages in `cache_dirs`, one CachedPackage per name, version and arch."""
+    found = {}
+    for cdir in cache_dirs:
+        try:
+            with os.scandir(cdir) as it:
+                for entry in it:
+                    parsed = parse_package_filename(entry.name)
+                    if parsed is None:
+                        continue
+                    try:
+                        if not entry.is_file(follow_symlinks=False):
+                            continue
+                        size = allocated_size(entry.stat(follow_symlinks=False))
+                    except OSError:
+                        continue
+                    files, total = found.get(parsed, ((), 0))
+                    found[parsed] = (files + (entry.path,), total + size)
+        except OSError:
+            continue
+    return [CachedPackage(name, version, arch, files, size) for (name, version, arch), (files, size) in found.items()]
+
+
+def installed_packages():
+    """Maps installed package names to their version, from the local package database."""
+    return {name: package.version for name, package in read_local_db().items()}
+
+
+def select_removals(packages, keep=KEEP_VERSIONS, installed=None, keep_uninstalled=None):
+    """Returns the CachedPackages to delete, keeping the newest `keep` versions of each.
+
+    Packages missing from `installed` (a name -> version dict) keep only
+    `keep_uninstalled` versions when that is given. The installed version
+    itself is never selected, even after a downgrade.
+    """
+    installed = installed or {}
+    groups = {}
+    for package in packages:
+        groups.setdefault((package.name, package.arch), []).append(package)
+
+    order = functools.cmp_to_key(vercmp)
+    removals = []
+    for (name, _), versions in groups.items():
+        limit = keep
+        # Without a package list nothing can be told apart as uninstalled
+        if keep_uninstalled is not None and installed and name not in installed:
+            limit = keep_uninstalled
+        if len(versions) <= limit:
+            continue
+        versions.sort(key=lambda package: order(package.version), reverse=True)
+        current = installed.get(name)
+        removals.extend(package for package in versions[limit:] if package.version != current)
+    return removals
+
+
+def plan_removals(cache_dirs, keep=KEEP_VERSIONS, keep_uninstalled=None, installed=None):
+    """Scans `cache_dirs` and selects what to delete; returns (removals, cached bytes)."""
+    packages = scan_cache(cache_dirs)
+    if installed is None:
+        installed = installed_packages()
+    removals = select_removals(packages, keep, installed, keep_uninstalled)
+    return removals, sum(package.size for package in packages)
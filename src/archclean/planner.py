@@ -0,0 +1,248 @@
+"""Dry run: what a cleanup would do and roughly how much it would free.
+
+Every detector only looks: binary checks, read-only pacman queries and
+cache sizing. They run concurrently, so the plan takes about as long as the
+slowest one (usually sizing the largest cache) rather than the sum of all.
+"""
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from rich.console import Console
+from rich.filesize import decimal
+from rich.table import Table
+from archclean.utils import check_binary, run_command, xdg_cache_home
+from archclean.sizing import estimate_usage, prefetch_usage
+from archclean.cleaners import home, languages, projects, system
+from archclean import docker_api, pkgcache
+from archclean.rules import load_excludes, load_workspaces
+
+console = Console()
+
+# estimate is in bytes, or None when it cannot be known without running the action
+PlanItem = namedtuple("PlanItem", "category action command estimate note")
+
+JOURNAL_KEEP_DAYS = 14
+
+# (action, runtimes (any of), tool, cache_dirs() key, command), in cleaning order
+LANGUAGE_ACTIONS = [
+    ("Python (pip)", ("python", "python3"), "pip", "pip", "pip cache purge"),
+    ("Node (npm)", ("node",), "npm", "npm", "npm cache clean --force"),
+    ("Node (yarn)", ("node",), "yarn", "yarn", "yarn cache clean"),
+    ("Bun", ("bun",), "bun", "bun", "rm -rf ~/.bun/install/cache"),
+    ("Go", ("go",), "go", "go", "go clean -modcache"),
+    ("PHP (Composer)", ("php",), "composer", "composer", "composer clear-cache"),
+    ("Java (Gradle)", ("java",), "gradle", "gradle", "rm -rf ~/.gradle/caches"),
+    (".NET (NuGet)", ("dotnet",), "dotnet", "nuget", "dotnet nuget locals all --clear"),
+    ("C/C++ (ccache)", ("gcc", "clang", "cc"), "ccache", "ccache", "ccache -C"),
+]
+
+SIZE_UNITS = {
+    "B": 1, "KiB": 1024, "MiB": 1024**2, "GiB": 1024**3, "TiB": 1024**4,
+    "kB": 1000, "KB": 1000, "MB": 1000**2, "GB": 1000**3, "TB": 1000**4,
+}
+
+
+def parse_human_size(text):
+    """Parses "1.50 MiB" (pacman) or "1.5GB" (docker) into bytes; None if malformed."""
+    text = text.strip()
+    for unit in sorted(SIZE_UNITS, key=len, reverse=True):
+        if text.endswith(unit):
+            try:
+                return int(float(text[:-len(unit)].strip()) * SIZE_UNITS[unit])
+            except ValueError:
+                return None
+    return None
+
+
+def plan_pacman():
+    items = []
+    cache_dirs = system.pacman_cache_dirs()
+    broken = [str(path) for path in system.find_broken_downloads(cache_dirs)]
+    if broken:
+        items.append(PlanItem(
+            "System", "Broken Downloads", "sudo rm -rf <dirs>", estimate_usage(broken)[1], f"{len(broken)} dirs",
+        ))
+    if check_binary("pacman"):
+        removals, cached = pkgcache.plan_removals(cache_dirs)
+        items.append(PlanItem(
+            "System", f"Pacman Cache (keep {pkgcache.KEEP_VERSIONS})", "sudo rm <old package versions>",
+            sum(package.size for package in removals), f"{len(removals)} old versions; {decimal(cached)} cached in total",
+        ))
+    return items
+
+
+def plan_aur_helper():
+    for helper in ("paru", "yay"):
+        if check_binary(helper):
+            cache = os.path.join(xdg_cache_home(), helper)
+            return [PlanItem("System", f"AUR Helper ({helper})", f"{helper} -Sc", estimate_usage(cache)[1], "")]
+    return []
+
+
+def plan_orphans():
+    orphans = system.find_orphans()
+    if not orphans:
+        return []
+    return [PlanItem(
+        "System", "Orphans", "sudo pacman -Rns <orphans>", sum(package.size for package in orphans),
+        f"{len(orphans)} packages",
+    )]
+
+
+def _old_journal_size(journal_dir, days, now=None):
+    """Allocated bytes of archived journal files last written more than `days` ago."""
+    cutoff = (now or time.time()) - days * 86400
+    total = 0
+    try:
+        with os.scandir(journal_dir) as machines:
+            for machine in machines:
+                if not machine.is_dir(follow_symlinks=False):
+                    continue
+                try:
+                    with os.scandir(machine.path) as it:
+                        for entry in it:
+                            if not entry.name.endswith(".journal~") and "@" not in entry.name:
+                                continue
+                            st = entry.stat(follow_symlinks=False)
+                            if st.st_mtime < cutoff:
+                                total += st.st_blocks * 512
+                except OSError:
+                    continue
+    except OSError:
+        return None
+    return total
+
+
+def plan_journal():
+    estimate = _old_journal_size(system.JOURNAL_DIR, JOURNAL_KEEP_DAYS)
+    return [PlanItem(
+        "System", "Journal", "sudo journalctl --vacuum-time=2weeks", estimate,
+        "" if estimate is not None else "journal not readable",
+    )]
+
+
+def plan_home():
+    base = home.get_home_dir()
+    thumbnails = base / ".cache" / "thumbnails"
+    trash = base / ".local" / "share" / "Trash"
+    prefetch_usage([str(thumbnails), str(trash)])
+    items = [PlanItem("Home", "Thumbnails", "rm -rf ~/.cache/thumbnails", estimate_usage(thumbnails)[1], "")]
+    entries = home.read_app_caches()
+    if entries:
+        largest = ", ".join(entry.app for entry in entries[:3])
+        items.append(PlanItem(
+            "Home", "App Caches", "rm -rf <chosen ~/.cache entries>", sum(entry.size for entry in entries),
+            f"{len(entries)} entries if all are chosen; largest: {largest}",
+        ))
+    items.append(PlanItem("Home", "Trash", "purge Trash", estimate_usage(trash)[1], ""))
+    return items
+
+
+def plan_languages():
+    dirs = languages.cache_dirs()
+    prefetch_usage([path for paths in dirs.values() for path in paths])
+    items = []
+    for action, runtimes, tool, key, command in LANGUAGE_ACTIONS:
+        if any(check_binary(runtime) for runtime in runtimes) and check_binary(tool):
+            items.append(PlanItem("Language", action, command, estimate_usage(dirs[key])[1], ""))
+    if check_binary("rustc") or check_binary("cargo"):
+        command = "cargo-cache --remove-dir all" if check_binary("cargo-cache") else "rm -rf ~/.cargo/registry ~/.cargo/git"
+        items.append(PlanItem("Language", "Rust", command, estimate_usage(dirs["cargo"])[1], ""))
+    if check_binary("ruby") and check_binary("gem"):
+        items.append(PlanItem("Language", "Ruby (Gems)", "gem cleanup", None, "old gem versions"))
+    return items
+
+
+def plan_docker():
+    if docker_api.available():
+        try:
+            # Volumes are left out: a forced run keeps them
+            usage = [item for item in docker_api.system_df() if item.kind != "Volumes"]
+            return [PlanItem(
+                "System", "Docker", "prune containers, dangling images, build cache",
+                sum(item.reclaimable for item in usage),
+                ", ".join(f"{item.kind}: {decimal(item.reclaimable)}" for item in usage if item.reclaimable),
+            )]
+        except (docker_api.DockerError, OSError):
+            pass
+    if not check_binary("docker"):
+        return []
+    output = run_command("docker", ["system", "df", "--format", "{{.Reclaimable}}"], capture=True)
+    if output is None:
+        return [PlanItem("System", "Docker", "docker system prune", None, "daemon not reachable")]
+    # Lines look like "1.2GB (40%)"
+    estimate = sum(parse_human_size(line.split("(")[0]) or 0 for line in output.splitlines() if line.strip())
+    return [PlanItem("System", "Docker", "docker system prune", estimate, "")]
+
+
+def plan_projects():
+    roots = load_workspaces()
+    if not roots:
+        return []
+    artifacts = projects.find_artifacts(roots, exclude=load_excludes())
+    if not artifacts:
+        return []
+    old = projects.choose_artifacts(artifacts, projects.STALE_DAYS, force=True)
+    return [PlanItem(
+        "Projects", "Build Artifacts", "rm -rf <old artifact dirs>", sum(artifact.size for artifact in old),
+        f"{len(old)} of {len(artifacts)} not used for {projects.STALE_DAYS} days",
+    )]
+
+
+def _projects_skipped():
+    # full --force leaves project checkouts alone unless --with-projects is given
+    return [PlanItem("Projects", "Build Artifacts", "", None, "Forced runs need --with-projects")]
+
+
+DETECTORS = [plan_pacman, plan_aur_helper, plan_orphans, plan_journal, plan_home, plan_languages, plan_projects, plan_docker]
+
+
+def build_plan(detectors=None, with_projects=False):
+    """Runs every detector concurrently; returns their PlanItems in cleaning order.
+
+    Project artifacts only count toward the total `with_projects`, as that
+    is the only way a forced run cleans them.
+    """
+    detectors = detectors or DETECTORS
+    if not with_projects:
+        detectors = [_projects_skipped if detector is plan_projects else detector for detector in detectors]
+
+    def run(detector):
+        try:
+            return detector()
+        except Exception as e:
+            return [PlanItem("Planner", detector.__name__.removeprefix("plan_"), "", None, f"detection failed: {e}")]
+
+    with ThreadPoolExecutor(max_workers=len(detectors)) as pool:
+        return [item for items in pool.map(run, detectors) for item in items]
+
+
+def print_plan(items, seconds=None):
+    table = Table(title="ArchClean Plan (nothing was changed)", show_footer=True)
+    table.add_column("Category", style="cyan", no_wrap=True, footer="Total")
+    table.add_column("Action", style="magenta")
+    table.add_column("Command", style="dim")
+    table.add_column(
+        "Estimate", justify="right", style="bold",
+        footer=decimal(sum(item.estimate for item in items if item.estimate is not None)),
+    )
+    table.add_column("Notes", style="yellow")
+    for item in items:
+        estimate = decimal(item.estimate) if item.estimate is not None else "?"
+        table.add_row(item.category, item.action, item.command, estimate, item.note)
+    if seconds is not None:
+        table.caption = f"Planned in {seconds:.1f}s"
+    console.print(table)
+
+
+def plan(as_json=False, with_projects=False):
+    started = time.monotonic()
+    items = build_plan(with_projects=with_projects)
+    seconds = time.monotonic() - started
+    if as_json:
+        print(json.dumps({"seconds": round(seconds, 2), "actions": [item._asdict() for item in items]}))
+    else:
+        print_plan(items, seconds)
+    return items
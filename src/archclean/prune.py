@@ -0,0 +1,168 @@
+"""Least-recently-used pruning of package caches.
+
+Purging a whole cache makes the next build download and unpack everything
+again. Pruning instead splits a cache into the units its tool fetches (one
+crate, one module version, one HTTP response), dates each by the last time
+it was read or written, and evicts the oldest units until the cache fits a
+size and/or age budget, so what recent builds used stays warm.
+"""
+import glob
+import os
+import stat
+import shutil
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from archclean.sizing import USAGE_WORKERS, allocated_size
+
+# last_used is a timestamp; size is in allocated bytes
+PruneEntry = namedtuple("PruneEntry", "path last_used size")
+# Either limit may be None; entries older than max_age_days go first, then the
+# least recently used until at most max_size bytes remain
+Budget = namedtuple("Budget", "max_size max_age_days")
+
+
+def _files(root):
+    found = []
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        found.append(entry.path)
+        except OSError:
+            continue
+    return found
+
+
+def _globs(root, *patterns):
+    return [path for pattern in patterns for path in glob.glob(os.path.join(glob.escape(root), pattern))]
+
+
+def pip_units(root):
+    # One file per cached HTTP response or built wheel
+    return _files(root)
+
+
+def npm_units(root):
+    # Content blobs; index entries pointing at an evicted blob are treated as misses
+    return _files(os.path.join(root, "content-v2"))
+
+
+def cargo_units(root):
+    # The index itself is not versioned data, so it is always kept
+    if os.path.basename(root) == "git":
+        return _globs(root, "checkouts/*/*", "db/*")
+    return _globs(root, "cache/*/*.crate", "src/*/*")
+
+
+def go_units(root):
+    """Extracted module versions (dirs named path@version) and their download files."""
+    found = []
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if not entry.is_dir(follow_symlinks=False):
+                        if os.path.basename(os.path.dirname(entry.path)) == "@v":
+                            found.append(entry.path)
+                    elif "@" in entry.name and entry.name != "@v":
+                        found.append(entry.path)
+                    else:
+                        stack.append(entry.path)
+        except OSError:
+            continue
+    return found
+
+
+UNITS = {"pip": pip_units, "npm": npm_units, "cargo": cargo_units, "go": go_units}
+
+
+def entry_usage(path, atime=True):
+    """Returns a PruneEntry for a file or directory tree.
+
+    A unit counts as used when any file in it was last read or written, so
+    atime is taken into account where the mount updates it (relatime does,
+    at most once a day) and mtime covers noatime mounts. With atime=False,
+    last_used is when anything in it was last written.
+    """
+    last_used = 0
+    size = 0
+    stack = [path]
+    try:
+        root_st = os.lstat(path)
+    except OSError:
+        return None
+    if not stat.S_ISDIR(root_st.st_mode):
+        return PruneEntry(path, max(root_st.st_atime if atime else 0, root_st.st_mtime), allocated_size(root_st))
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if stat.S_ISDIR(st.st_mode):
+                        stack.append(entry.path)
+                    else:
+                        last_used = max(last_used, st.st_atime if atime else 0, st.st_mtime)
+                        size += allocated_size(st)
+        except OSError:
+            continue
+    return PruneEntry(path, last_used or root_st.st_mtime, size)
+
+
+def index_cache(name, roots):
+    """Lists the units of cache `name` ("pip", "npm", "cargo" or "go") below `roots`, sized concurrently."""
+    units = [path for root in roots if os.path.isdir(root) for path in UNITS[name](root)]
+    with ThreadPoolExecutor(max_workers=USAGE_WORKERS) as pool:
+        return [entry for entry in pool.map(entry_usage, units) if entry is not None]
+
+
+def select_victims(entries, budget, now=None):
+    """Returns the entries to evict under `budget`, least recently used first."""
+    entries = sorted(entries, key=lambda entry: entry.last_used)
+    evicted = 0
+    if budget.max_age_days is not None:
+        cutoff = (now or time.time()) - budget.max_age_days * 86400
+        while evicted < len(entries) and entries[evicted].last_used < cutoff:
+            evicted += 1
+    if budget.max_size is not None:
+        total = sum(entry.size for entry in entries[evicted:])
+        while evicted < len(entries) and total > budget.max_size:
+            total -= entries[evicted].size
+            evicted += 1
+    return entries[:evicted]
+
+
+def _retry_writable(func, path, exc):
+    # Go extracts modules read-only; a directory needs u+w before its entries can go
+    parent = os.path.dirname(path)
+    os.chmod(parent, stat.S_IMODE(os.lstat(parent).st_mode) | stat.S_IWUSR | stat.S_IXUSR)
+    func(path)
+
+
+def rmtree_writable(path):
+    """shutil.rmtree that makes read-only directories writable when it has to."""
+    shutil.rmtree(path, onexc=_retry_writable)
+
+
+def remove_entries(entries):
+    """Deletes the evicted entries; returns (removed, failed) lists."""
+    removed = []
+    failed = []
+    for entry in entries:
+        try:
+            if os.path.isdir(entry.path) and not os.path.islink(entry.path):
+                rmtree_writable(entry.path)
+            else:
+                os.unlink(entry.path)
+            removed.append(entry)
+        except OSError:
+            failed.append(entry)
+    return removed, failed
@@ -0,0 +1,289 @@
+"""Path classification and scan exclusions, configurable through rules.toml.
+
+Both are read from $XDG_CONFIG_HOME/archclean/rules.toml, for example:
+
+    exclude = ["node_modules", "~/VMs", "/srv/backup/*"]
+
+    [[rule]]
+    category = "VM-Image"
+    color = "magenta"
+    glob = "*.qcow2"
+
+    [[rule]]
+    category = "Build"
+    color = "blue"
+    description = "Build Artifacts (Rebuildable)"
+    regex = "/(target|node_modules|__pycache__)/"
+
+Each rule has one of `prefix` (a directory and everything below it), `glob`
+(matched against the file name, or the whole path if it contains a slash;
+`*` stays within one path component and `**` crosses them) or `regex`
+(searched anywhere in the path). User rules are tried in file order before
+the built-in Cache/User defaults, and the first match wins. Paths matching
+nothing are System files.
+
+Rules are compiled once into plain string tests wherever possible (see
+_compile_group), so classifying a path is usually a couple of str method
+calls rather than a regex match per rule.
+
+`exclude` lists directories the scanners never walk, on top of the built-in
+DEFAULT_EXCLUDES (see Pruner). `workspaces` lists the directories holding
+source checkouts that the project artifact cleaner looks through, instead of
+the existing ones of DEFAULT_WORKSPACES.
+"""
+import os
+import re
+import tomllib
+from rich.console import Console
+from archclean.utils import xdg_config_dir
+
+console = Console()
+
+DEFAULT_RULES = [
+    {"category": "Cache", "color": "yellow", "description": "Cache/Logs (Review)", "regex": r"/\.cache/"},
+    {"category": "Cache", "color": "yellow", "prefix": "/var/cache"},
+    {"category": "Cache", "color": "yellow", "prefix": "/var/tmp"},
+    {"category": "Cache", "color": "yellow", "prefix": "/var/log"},
+    {"category": "Cache", "color": "yellow", "prefix": "/tmp"},
+    {"category": "User", "color": "green", "description": "User Data (Safe)", "prefix": "/home"},
+]
+FALLBACK = ("System", "red")
+FALLBACK_DESCRIPTION = "System Files (Caution)"
+KINDS = ("prefix", "glob", "regex")
+
+DEFAULT_EXCLUDES = [
+    # snapper/btrfs snapshots repeat the whole subvolume they snapshot
+    ".snapshots",
+    # Pseudo filesystems, also when bind mounted into a chroot on the same device
+    "/proc", "/sys", "/dev", "/run",
+    # Container layers repeat image contents and are managed by their engine
+    "/var/lib/docker/overlay2",
+    "/var/lib/docker/btrfs",
+    "/var/lib/containers/storage/overlay",
+    "~/.local/share/containers/storage/overlay",
+]
+
+DEFAULT_WORKSPACES = ["~/src", "~/projects", "~/code", "~/dev", "~/workspace", "~/repos", "~/git"]
+
+
+def rules_path():
+    return os.path.join(xdg_config_dir(), "rules.toml")
+
+
+def glob_to_regex(pattern):
+    """Translates a path glob; unlike fnmatch, `*` and `?` do not match "/"."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end < 0:
+                out.append(r"\[")
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def _literal(regex):
+    """Returns the plain string a regex matches if it has no operators, else None."""
+    text = re.sub(r"\\([^\w\s])", r"\1", regex)
+    if re.search(r"[.^$*+?{}\[\]|()\\]", re.sub(r"\\[^\w\s]", "", regex)):
+        return None
+    return text
+
+
+def _compile_group(rules):
+    """Builds one test for consecutive rules that share a category.
+
+    Prefixes become a single str.startswith, operator-free regexes substring
+    checks, "*.ext" globs a single str.endswith, and everything else one
+    combined regex, so most rule sets never run the regex engine at all.
+    """
+    prefixes = []
+    exact = set()
+    literals = []
+    suffixes = []
+    patterns = []
+    for rule in rules:
+        if "prefix" in rule:
+            prefix = rule["prefix"].rstrip("/")
+            prefixes.append(prefix + "/")
+            exact.add(prefix)
+        elif "glob" in rule:
+            glob = rule["glob"]
+            if "/" in glob:
+                patterns.append(glob_to_regex(glob) + r"\Z")
+            elif glob.startswith("*") and not re.search(r"[*?\[]", glob[1:]):
+                suffixes.append(glob[1:])
+            else:
+                patterns.append("(?:.*/)?" + glob_to_regex(glob) + r"\Z")
+        else:
+            literal = _literal(rule["regex"])
+            if literal is not None:
+                literals.append(literal)
+            else:
+                # Searched, not matched: anything may come before it
+                patterns.append(".*(?:" + rule["regex"] + ")")
+
+    prefixes = tuple(prefixes)
+    suffixes = tuple(suffixes)
+    match = re.compile("|".join(patterns), re.DOTALL).match if patterns else None
+
+    def test(path):
+        if prefixes and (path.startswith(prefixes) or path in exact):
+            return True
+        for literal in literals:
+            if literal in path:
+                return True
+        if suffixes and path.endswith(suffixes):
+            return True
+        return match is not None and match(path) is not None
+    return test
+
+
+class Classifier:
+    """Maps paths to (category, color).
+
+    Consecutive rules with the same category only need one test, since it
+    does not matter which of them matched; classifying a path runs one test
+    per group until one matches.
+    """
+
+    def __init__(self, rules):
+        groups = []
+        for i, rule in enumerate(rules):
+            kinds = [kind for kind in KINDS if kind in rule]
+            if "category" not in rule or len(kinds) != 1:
+                raise ValueError(f"rule {i + 1} needs a category and exactly one of {', '.join(KINDS)}")
+            if "regex" in rule:
+                try:
+                    re.compile(rule["regex"])
+                except re.error as e:
+                    raise ValueError(f"rule {i + 1} has an invalid regex: {e}")
+            result = (rule["category"], rule.get("color", "white"))
+            if groups and groups[-1][1] == result:
+                groups[-1][0].append(rule)
+            else:
+                groups.append(([rule], result))
+
+        self.rules = [result for _, result in groups]
+        self._tests = [(_compile_group(group), result) for group, result in groups]
+
+        self._descriptions = {}
+        for rule in rules:
+            self._descriptions.setdefault(rule["category"], (rule.get("color", "white"), rule.get("description")))
+        self._descriptions.setdefault(FALLBACK[0], (FALLBACK[1], FALLBACK_DESCRIPTION))
+        self.width = max(len(category) for category in self._descriptions)
+
+    def classify(self, path):
+        """Returns (category, color) for a path."""
+        for test, result in self._tests:
+            if test(path):
+                return result
+        return FALLBACK
+
+    def legend(self):
+        """Returns (category, color, description) for every category, in rule order."""
+        return [
+            (category, color, description or category)
+            for category, (color, description) in self._descriptions.items()
+        ]
+
+
+class Pruner:
+    """Decides which directories a scan skips.
+
+    A pattern without a slash is a glob on the directory name (".snapshots",
+    "node_modules"); one with a slash is a glob on the absolute path, with
+    "~" expanded. Literal patterns are set lookups; the rest share one regex.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._names = set()
+        self._paths = set()
+        name_patterns = []
+        path_patterns = []
+        for pattern in self.patterns:
+            if "/" in pattern:
+                pattern = os.path.expanduser(pattern).rstrip("/") or "/"
+                literal, target = self._paths, path_patterns
+            else:
+                literal, target = self._names, name_patterns
+            if re.search(r"[*?\[]", pattern):
+                target.append(glob_to_regex(pattern) + r"\Z")
+            else:
+                literal.add(pattern)
+        self._match_name = re.compile("|".join(name_patterns), re.DOTALL).match if name_patterns else None
+        self._match_path = re.compile("|".join(path_patterns), re.DOTALL).match if path_patterns else None
+
+    def __call__(self, path, name):
+        """True if the directory at `path` (named `name`) must not be walked."""
+        if name in self._names or path in self._paths:
+            return True
+        if self._match_name is not None and self._match_name(name):
+            return True
+        return self._match_path is not None and self._match_path(path) is not None
+
+
+def _read_config(path):
+    try:
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    except FileNotFoundError:
+        pass
+    except (OSError, tomllib.TOMLDecodeError) as e:
+        console.print(f"[bold yellow]Warning:[/bold yellow] Ignoring {path}: {e}")
+    return {}
+
+
+def load_rules(path=None):
+    """Builds the Classifier from the user's rules.toml plus the defaults.
+
+    A missing file gives the defaults; a broken one is reported and ignored.
+    """
+    path = path or rules_path()
+    try:
+        return Classifier(_read_config(path).get("rule", []) + DEFAULT_RULES)
+    except (ValueError, TypeError, AttributeError) as e:
+        console.print(f"[bold yellow]Warning:[/bold yellow] Ignoring rules in {path}: {e}")
+    return Classifier(DEFAULT_RULES)
+
+
+def load_excludes(extra=(), path=None):
+    """Returns the exclude patterns: defaults, then rules.toml, then `extra`.
+
+    "~" is expanded here, so the list means the same to a root helper.
+    """
+    config = _read_config(path or rules_path()).get("exclude", [])
+    if not isinstance(config, list) or not all(isinstance(p, str) for p in config):
+        console.print("[bold yellow]Warning:[/bold yellow] Ignoring exclude in rules.toml: expected a list of strings")
+        config = []
+    return [os.path.expanduser(pattern) for pattern in DEFAULT_EXCLUDES + config + list(extra)]
+
+
+def load_workspaces(path=None):
+    """Returns the workspace roots from rules.toml, or the existing default ones."""
+    config = _read_config(path or rules_path()).get("workspaces")
+    if config is not None and not (isinstance(config, list) and all(isinstance(p, str) for p in config)):
+        console.print("[bold yellow]Warning:[/bold yellow] Ignoring workspaces in rules.toml: expected a list of strings")
+        config = None
+    if config is None:
+        config = [root for root in DEFAULT_WORKSPACES if os.path.isdir(os.path.expanduser(root))]
+    return [os.path.expanduser(root) for root in config]
@@ -0,0 +1,152 @@
+"""On-disk index of a previous scan, used to make rescans incremental.
+
+For every directory the index records its inode and mtime together with the
+sizes of the files directly inside it. A directory whose inode and mtime are
+unchanged has had no entries added, removed or renamed, so a rescan can take
+the names of its files from the index and stat them by path instead of
+listing the directory. Their sizes are still read again, since a file can
+grow in place without touching its directory.
+
+Paths are stored as bytes so names that are not valid UTF-8 survive the trip.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from archclean.utils import xdg_cache_dir
+
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path BLOB PRIMARY KEY,
+    parent BLOB,
+    ino INTEGER,
+    mtime_ns INTEGER,
+    file_count INTEGER,
+    file_bytes INTEGER
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs(parent);
+CREATE TABLE IF NOT EXISTS files (
+    dir BLOB,
+    name BLOB,
+    size INTEGER,
+    reclaim INTEGER,
+    PRIMARY KEY (dir, name)
+);
+CREATE INDEX IF NOT EXISTS files_size ON files(size);
+"""
+
+# Directories modified this close to the scan may still change within the
+# same mtime tick, so they are recorded as unknown and listed again next time.
+RACY_WINDOW_NS = 2 * 10**9
+
+
+def index_path_for(root):
+    digest = hashlib.sha1(os.fsencode(os.path.abspath(root))).hexdigest()[:16]
+    return os.path.join(xdg_cache_dir(), f"scan-{digest}.sqlite3")
+
+
+def _subtree_range(path):
+    # Every path below `path` sorts between "path/" and "path0" ("0" follows "/").
+    return path + b"/", path + b"0"
+
+
+class ScanIndex:
+    def __init__(self, root, db_path=None):
+        self.root = os.path.abspath(root)
+        self.db_path = db_path or index_path_for(self.root)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._conn.executescript("DROP TABLE IF EXISTS dirs; DROP TABLE IF EXISTS files;")
+            self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self._conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def load_dirs(self):
+        """Returns ({path: (ino, mtime_ns, file_count, file_bytes)}, {parent: [subdirs]})."""
+        known = {}
+        children = {}
+        with self._lock:
+            rows = self._conn.execute("SELECT path, parent, ino, mtime_ns, file_count, file_bytes FROM dirs").fetchall()
+        for path, parent, ino, mtime_ns, count, total in rows:
+            path = os.fsdecode(path)
+            known[path] = (ino, mtime_ns, count, total)
+            if parent is not None:
+                children.setdefault(os.fsdecode(parent), []).append(path)
+        return known, children
+
+    def dir_files(self, path, min_size=-1):
+        """Returns [(size, path, reclaim)] for recorded files in `path` larger than min_size."""
+        key = os.fsencode(path)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, size, reclaim FROM files WHERE dir = ? AND size > ?", (key, min_size)
+            ).fetchall()
+        return [(size, os.path.join(path, os.fsdecode(name)), reclaim) for name, size, reclaim in rows]
+
+    def record(self, updates, removed, scan_started_ns):
+        """Stores freshly listed directories and drops vanished subtrees.
+
+        `updates` holds (path, stat, file_count, file_bytes, [(name, size, reclaim)])
+        tuples; `removed` holds directories that no longer exist. A stat of
+        None records a directory that was not listed: it stays a child of its
+        parent but never matches, so it is listed once a scan walks it.
+        """
+        with self._lock, self._conn:
+            for path in removed:
+                key = os.fsencode(path)
+                low, high = _subtree_range(key)
+                self._conn.execute("DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (key, low, high))
+                self._conn.execute("DELETE FROM files WHERE dir = ? OR (dir >= ? AND dir < ?)", (key, low, high))
+
+            for path, st, count, total, files in updates:
+                key = os.fsencode(path)
+                parent = None if path == self.root else os.fsencode(os.path.dirname(path))
+                ino = st.st_ino if st is not None else None
+                mtime_ns = st.st_mtime_ns if st is not None else -1
+                if mtime_ns >= scan_started_ns - RACY_WINDOW_NS:
+                    mtime_ns = -1
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, parent, ino, mtime_ns, count, total),
+                )
+                self._conn.execute("DELETE FROM files WHERE dir = ?", (key,))
+                self._conn.executemany(
+                    "INSERT INTO files VALUES (?, ?, ?, ?)",
+                    ((key, os.fsencode(name), size, reclaim) for name, size, reclaim in files),
+                )
+
+    def forget(self, paths):
+        """Drops deleted files and marks their directories for relisting."""
+        with self._lock, self._conn:
+            for path in paths:
+                parent, name = os.path.split(path)
+                key = os.fsencode(parent)
+                self._conn.execute("DELETE FROM files WHERE dir = ? AND name = ?", (key, os.fsencode(name)))
+                self._conn.execute("UPDATE dirs SET mtime_ns = -1 WHERE path = ?", (key,))
+
+    def top(self, limit, min_size=0):
+        """Returns the `limit` largest recorded files of at least min_size bytes as [(size, path, reclaim)]."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT dir, name, size, reclaim FROM files WHERE size >= ? ORDER BY size DESC LIMIT ?",
+                (min_size, limit),
+            ).fetchall()
+        return [
+            (size, os.path.join(os.fsdecode(d), os.fsdecode(name)), reclaim)
+            for d, name, size, reclaim in rows
+        ]
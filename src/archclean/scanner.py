@@ -0,0 +1,874 @@
+"""In-process parallel scanners for the disk usage analyzer."""
+import heapq
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from archclean.mounts import device_groups
+from archclean.rules import Pruner
+from archclean.scan_index import ScanIndex
+from archclean.sizing import InodeSet, allocated_size, reclaimable_size, shared_bytes
+from archclean.throttle import RateLimit
+
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# Parallel walks help SSDs but mostly add seeks on a spinning disk
+ROTATIONAL_WORKERS = 4
+
+DAY_NS = 86400 * 10**9
+# Upper bounds in days of the age ranges used by the stale file finder
+AGE_BUCKETS = (30, 180)
+
+
+class ParallelWalker:
+    """Walks a tree with os.scandir across a pool of threads.
+
+    Subclasses implement _visit(item, dirs), which lists one directory and
+    puts the subdirectories it wants walked onto the `dirs` queue, checking
+    each against _prune() first so excluded subtrees are never entered.
+    Directories are listed through _scandir(), which holds the workers to the
+    `rate` RateLimit on directory entries per second, if one is given.
+    """
+
+    def __init__(self, root, one_filesystem=True, workers=None, cancel=None, exclude=None, rate=None):
+        self.root = os.path.abspath(root)
+        self.one_filesystem = one_filesystem
+        self.workers = workers or DEFAULT_WORKERS
+        self.exclude = Pruner(exclude) if exclude else None
+        self.rate = rate
+
+        self.files_seen = 0
+        self.bytes_seen = 0
+        self.errors = 0
+        self.pruned = 0
+
+        self._lock = threading.Lock()
+        self._root_dev = None
+        self._dir_inodes = {}
+        self._cancelled = cancel or threading.Event()
+
+    def _prune(self, path, name, st=None):
+        """True if the subdirectory at `path` should not be walked."""
+        if self.exclude is not None and self.exclude(path, name):
+            return True
+        if st is not None:
+            # Directories cannot be hardlinked, so a second path to an inode
+            # is a bind mount of a directory that is already being walked.
+            key = (st.st_dev, st.st_ino)
+            if self._dir_inodes.setdefault(key, path) != path:
+                return True
+        return False
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _scandir(self, path):
+        """Lists a directory, then waits until its entries fit under the rate limit."""
+        with os.scandir(path) as it:
+            entries = list(it)
+        if self.rate is not None:
+            self.rate.wait(len(entries), self._cancelled)
+        return entries
+
+    def _visit(self, item, dirs):
+        raise NotImplementedError
+
+    def _worker(self, dirs):
+        while True:
+            item = dirs.get()
+            if item is None:
+                dirs.task_done()
+                return
+            try:
+                if not self._cancelled.is_set():
+                    self._visit(item, dirs)
+            finally:
+                dirs.task_done()
+
+    def _walk(self, first, tick=None, interval=0.5, others=()):
+        """Walks from `first` (and `others`, concurrently), calling tick() every `interval` seconds until done."""
+        dirs = queue.Queue()
+        dirs.put(first)
+        for item in others:
+            dirs.put(item)
+        threads = [
+            threading.Thread(target=self._worker, args=(dirs,), daemon=True)
+            for _ in range(self.workers)
+        ]
+        for t in threads:
+            t.start()
+
+        done = threading.Event()
+        threading.Thread(target=lambda: (dirs.join(), done.set()), daemon=True).start()
+        while not done.wait(interval):
+            if tick:
+                tick()
+
+        for _ in threads:
+            dirs.put(None)
+        for t in threads:
+            t.join()
+
+
+class TopFilesScanner(ParallelWalker):
+    """Keeps the `limit` largest regular files of at least `min_size` bytes under root.
+
+    Only those files are kept, in a bounded min-heap, so memory stays
+    constant no matter how many files the tree holds.
+
+    With a ScanIndex, directories whose inode and mtime match the previous
+    scan are not listed again; their files come from the index and are
+    stat'ed by path, as are their subdirectories. Newly listed directories,
+    and reused ones whose files changed size, are written back.
+    Subdirectories that are not walked (excluded, or on another filesystem)
+    are recorded without contents, so a later scan that does walk them finds
+    them even when their parent is reused. With `refresh`, every directory is
+    listed again and the index rewritten from what was found.
+    """
+
+    def __init__(self, root, limit=100, one_filesystem=True, workers=None, cancel=None, index=None, min_size=0, exclude=None, rate=None, refresh=False):
+        super().__init__(root, one_filesystem=one_filesystem, workers=workers, cancel=cancel, exclude=exclude, rate=rate)
+        self.limit = limit
+
+        self._heap = []
+        # Files must be larger than the floor; it rises once the heap is full
+        self._floor = min_size - 1
+
+        self.index = index
+        self.refresh = refresh
+        self._known = {}
+        self._children = {}
+        self._updates = []
+        self._removed = []
+
+    def _offer(self, found):
+        with self._lock:
+            heap = self._heap
+            for item in found:
+                if len(heap) < self.limit:
+                    heapq.heappush(heap, item)
+                elif item[0] > heap[0][0]:
+                    heapq.heapreplace(heap, item)
+            if len(heap) >= self.limit:
+                self._floor = heap[0][0]
+
+    def _scan_dir(self, path, st, dirs):
+        if self.index is not None:
+            known = self._known.get(path)
+            if known is not None and st is not None and known[:2] == (st.st_ino, st.st_mtime_ns):
+                self._reuse_dir(path, st, dirs)
+                return
+
+        found = []
+        listed = []
+        subdirs = set()
+        skipped = []
+        files = 0
+        total = 0
+        errors = 0
+        pruned = 0
+        floor = self._floor
+        track = self.index is not None
+        try:
+            for entry in self._scandir(path):
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        sub_st = None
+                        if self.one_filesystem or track:
+                            sub_st = entry.stat(follow_symlinks=False)
+                        if track:
+                            subdirs.add(entry.path)
+                        if self.one_filesystem and sub_st.st_dev != self._root_dev:
+                            skipped.append(entry.path)
+                            continue
+                        if self._prune(entry.path, entry.name, sub_st):
+                            skipped.append(entry.path)
+                            pruned += 1
+                            continue
+                        dirs.put((entry.path, sub_st))
+                    elif entry.is_file(follow_symlinks=False):
+                        st_file = entry.stat(follow_symlinks=False)
+                        size = st_file.st_size
+                        reclaim = reclaimable_size(st_file)
+                        files += 1
+                        total += size
+                        if size > floor:
+                            found.append((size, entry.path, reclaim))
+                        if track:
+                            listed.append((entry.name, size, reclaim))
+                except OSError:
+                    errors += 1
+        except OSError:
+            errors += 1
+            track = False
+
+        if found:
+            self._offer(found)
+        with self._lock:
+            self.files_seen += files
+            self.bytes_seen += total
+            self.errors += errors
+            self.pruned += pruned
+            if track and st is not None:
+                self._updates.append((path, st, files, total, listed))
+                self._removed.extend(p for p in self._children.get(path, ()) if p not in subdirs)
+                self._record_skipped(skipped)
+
+    def _record_skipped(self, paths):
+        """Keeps subdirectories that were not walked in the index as empty children.
+
+        Whatever was indexed below them goes, so excluded files are not
+        served from the index. Called with the lock held.
+        """
+        for sub in paths:
+            known = self._known.get(sub)
+            if known is not None and known[0] is None and not self._children.get(sub):
+                continue
+            self._removed.append(sub)
+            self._updates.append((sub, None, 0, 0, []))
+
+    def _reuse_dir(self, path, st, dirs):
+        errors = 0
+        skipped = []
+        pruned = 0
+        for sub in self._children.get(path, ()):
+            try:
+                sub_st = os.stat(sub, follow_symlinks=False)
+            except OSError:
+                errors += 1
+                continue
+            if self.one_filesystem and sub_st.st_dev != self._root_dev:
+                skipped.append(sub)
+                continue
+            if self._prune(sub, os.path.basename(sub), sub_st):
+                skipped.append(sub)
+                pruned += 1
+                continue
+            dirs.put((sub, sub_st))
+
+        # Files growing in place (logs, VM images) leave the directory mtime
+        # alone, so every indexed file is stat'ed again; that still skips the
+        # listing and is far cheaper than a walk.
+        found = []
+        listed = []
+        files = 0
+        total = 0
+        changed = False
+        floor = self._floor
+        for indexed_size, file_path, indexed_reclaim in self.index.dir_files(path):
+            try:
+                st_file = os.stat(file_path, follow_symlinks=False)
+            except OSError:
+                errors += 1
+                changed = True
+                continue
+            size = st_file.st_size
+            reclaim = reclaimable_size(st_file)
+            changed = changed or (size, reclaim) != (indexed_size, indexed_reclaim)
+            files += 1
+            total += size
+            if size > floor:
+                found.append((size, file_path, reclaim))
+            listed.append((os.path.basename(file_path), size, reclaim))
+
+        if found:
+            self._offer(found)
+        with self._lock:
+            self.files_seen += files
+            self.bytes_seen += total
+            self.errors += errors
+            self.pruned += pruned
+            if changed:
+                self._updates.append((path, st, files, total, listed))
+            self._record_skipped(skipped)
+
+    def _flush_index(self, started_ns):
+        if self.index is None:
+            return
+        with self._lock:
+            updates, self._updates = self._updates, []
+            removed, self._removed = self._removed, []
+        if updates or removed:
+            self.index.record(updates, removed, started_ns)
+
+    def _visit(self, item, dirs):
+        self._scan_dir(item[0], item[1], dirs)
+
+    def scan(self, progress=None, interval=0.5):
+        """Runs the scan and returns [(size, path, reclaimable), ...] sorted largest first.
+
+        `reclaimable` is what deleting the file would free: allocated blocks,
+        nothing for files with other hardlinks, and for the final result
+        without extents shared with reflinks or snapshots.
+
+        If given, progress(top, files_seen, bytes_seen, pruned) is called
+        every `interval` seconds with a snapshot of the current top-N, and
+        once more when the walk has finished or was cancelled.
+        """
+        started_ns = time.time_ns()
+        root_st = os.stat(self.root)
+        self._root_dev = root_st.st_dev
+        self._dir_inodes[(root_st.st_dev, root_st.st_ino)] = self.root
+        if self.index is not None:
+            self._known, self._children = self.index.load_dirs()
+            if self.refresh:
+                # Children are still needed to drop subtrees that are gone
+                self._known = {}
+
+        def tick():
+            self._flush_index(started_ns)
+            if progress:
+                progress(self.results(), self.files_seen, self.bytes_seen, self.pruned)
+
+        self._walk((self.root, root_st), tick, interval)
+        self._flush_index(started_ns)
+
+        # FIEMAP is too costly for every file, so shared extents are only
+        # looked up for the files that made the final top-N.
+        top = [
+            (size, path, max(0, reclaim - shared_bytes(path)) if reclaim else 0)
+            for size, path, reclaim in self.results()
+        ]
+        if progress:
+            progress(top, self.files_seen, self.bytes_seen, self.pruned)
+        return top
+
+    def results(self):
+        with self._lock:
+            return sorted(self._heap, reverse=True)
+
+
+class StaleFilesScanner(TopFilesScanner):
+    """Keeps the `limit` largest files nobody has touched for `min_age_days`.
+
+    A file's age is the time since its last access or modification,
+    whichever is later, read from the same stat the walk already does, so
+    the age filter costs no extra pass. Each directory also tallies the bytes
+    of its files in the AGE_BUCKETS age ranges.
+    """
+
+    def __init__(self, root, min_age_days=30, limit=1000, one_filesystem=True, workers=None, cancel=None, min_size=0, exclude=None, rate=None, now=None):
+        super().__init__(
+            root, limit=limit, one_filesystem=one_filesystem, workers=workers,
+            cancel=cancel, min_size=min_size, exclude=exclude, rate=rate,
+        )
+        self.min_age_days = min_age_days
+        self.now_ns = now or time.time_ns()
+        self.buckets = [0] * (len(AGE_BUCKETS) + 1)
+        self.dir_buckets = {}
+
+    def _scan_dir(self, path, st, dirs):
+        found = []
+        buckets = [0] * len(self.buckets)
+        files = 0
+        total = 0
+        errors = 0
+        pruned = 0
+        floor = self._floor
+        cutoff = self.now_ns - self.min_age_days * DAY_NS
+        try:
+            for entry in self._scandir(path):
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        sub_st = None
+                        if self.one_filesystem:
+                            sub_st = entry.stat(follow_symlinks=False)
+                            if sub_st.st_dev != self._root_dev:
+                                continue
+                        if self._prune(entry.path, entry.name, sub_st):
+                            pruned += 1
+                            continue
+                        dirs.put((entry.path, sub_st))
+                    elif entry.is_file(follow_symlinks=False):
+                        st_file = entry.stat(follow_symlinks=False)
+                        size = st_file.st_size
+                        touched = max(st_file.st_atime_ns, st_file.st_mtime_ns)
+                        files += 1
+                        total += size
+                        buckets[age_bucket(self.now_ns - touched)] += size
+                        if touched <= cutoff and size > floor:
+                            age_days = (self.now_ns - touched) // DAY_NS
+                            found.append((size, entry.path, reclaimable_size(st_file), age_days))
+                except OSError:
+                    errors += 1
+        except OSError:
+            errors += 1
+
+        if found:
+            self._offer(found)
+        with self._lock:
+            self.files_seen += files
+            self.bytes_seen += total
+            self.errors += errors
+            self.pruned += pruned
+            if files:
+                self.dir_buckets[path] = buckets
+                for i, size in enumerate(buckets):
+                    self.buckets[i] += size
+
+    def scan(self, progress=None, interval=0.5):
+        """Returns [(size, path, reclaimable, age_days), ...] sorted largest first.
+
+        progress(top, files_seen, bytes_seen, pruned) works as in
+        TopFilesScanner.scan.
+        """
+        root_st = os.stat(self.root)
+        self._root_dev = root_st.st_dev
+        self._dir_inodes[(root_st.st_dev, root_st.st_ino)] = self.root
+
+        def tick():
+            if progress:
+                progress(self.results(), self.files_seen, self.bytes_seen, self.pruned)
+
+        self._walk((self.root, root_st), tick, interval)
+        top = [
+            (size, path, max(0, reclaim - shared_bytes(path)) if reclaim else 0, age)
+            for size, path, reclaim, age in self.results()
+        ]
+        if progress:
+            progress(top, self.files_seen, self.bytes_seen, self.pruned)
+        return top
+
+    def stalest_dirs(self, limit=20):
+        """Returns [(path, buckets)] for the directories holding the most bytes in the oldest bucket."""
+        with self._lock:
+            return heapq.nlargest(limit, self.dir_buckets.items(), key=lambda item: (item[1][-1], item[0]))
+
+
+def age_bucket(age_ns):
+    """Index into AGE_BUCKETS ranges for an age; the last one is open-ended."""
+    for i, days in enumerate(AGE_BUCKETS):
+        if age_ns < days * DAY_NS:
+            return i
+    return len(AGE_BUCKETS)
+
+
+class DirNode:
+    """One directory in a DirTreeScanner result; files are only counted."""
+
+    __slots__ = ("name", "parent", "size", "files", "reclaim", "children")
+
+    def __init__(self, name, parent=None, size=0, files=0, reclaim=0):
+        self.name = name
+        self.parent = parent
+        self.size = size
+        self.files = files
+        self.reclaim = reclaim
+        self.children = []
+
+    @property
+    def path(self):
+        parts = []
+        node = self
+        while node is not None:
+            parts.append(node.name)
+            node = node.parent
+        return os.path.join(*reversed(parts))
+
+    @property
+    def own_size(self):
+        return self.size - sum(child.size for child in self.children)
+
+    def detach(self):
+        """Removes this subtree and subtracts its totals from every ancestor."""
+        node = self.parent
+        while node is not None:
+            node.size -= self.size
+            node.files -= self.files
+            node.reclaim -= self.reclaim
+            node = node.parent
+        if self.parent is not None:
+            self.parent.children.remove(self)
+            self.parent = None
+
+
+class DirTreeScanner(ParallelWalker):
+    """Computes recursive directory sizes (like du) in a single walk.
+
+    Only directories get a node; files are folded into their directory's
+    totals, so memory grows with the number of directories.
+
+    Hardlinked files count once. Their blocks are reclaimable (and credited
+    to the directory where the first link was found) only if every link lies
+    inside the scanned tree.
+    """
+
+    def __init__(self, root, one_filesystem=True, workers=None, cancel=None, exclude=None, rate=None):
+        super().__init__(root, one_filesystem=one_filesystem, workers=workers, cancel=cancel, exclude=exclude, rate=rate)
+        self._nodes = []
+        self._links = InodeSet()
+
+    def _visit(self, node, dirs):
+        subdirs = []
+        files = 0
+        total = 0
+        reclaim = 0
+        errors = 0
+        pruned = 0
+        try:
+            for entry in self._scandir(node.path):
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        sub_st = None
+                        if self.one_filesystem:
+                            sub_st = entry.stat(follow_symlinks=False)
+                            if sub_st.st_dev != self._root_dev:
+                                continue
+                        if self._prune(entry.path, entry.name, sub_st):
+                            pruned += 1
+                            continue
+                        subdirs.append(DirNode(entry.name, node))
+                    elif entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        files += 1
+                        if st.st_nlink > 1:
+                            if self._links.add(st, owner=node) == 1:
+                                total += st.st_size
+                        else:
+                            total += st.st_size
+                            reclaim += allocated_size(st)
+                except OSError:
+                    errors += 1
+        except OSError:
+            errors += 1
+
+        node.size = total
+        node.files = files
+        node.reclaim = reclaim
+        node.children = subdirs
+        with self._lock:
+            # Children are registered before they are queued, so every node
+            # sits after its parent in _nodes.
+            self._nodes.extend(subdirs)
+            self.files_seen += files
+            self.bytes_seen += total
+            self.errors += errors
+            self.pruned += pruned
+        for child in subdirs:
+            dirs.put(child)
+
+    def scan(self, progress=None, interval=0.5):
+        """Runs the walk and returns the root DirNode with rolled-up totals.
+
+        progress(files_seen, bytes_seen, pruned) is called every `interval`
+        seconds and once when the walk is done.
+        """
+        root_st = os.stat(self.root)
+        self._root_dev = root_st.st_dev
+        self._dir_inodes[(root_st.st_dev, root_st.st_ino)] = self.root
+        root = DirNode(self.root)
+        self._nodes = [root]
+
+        def tick():
+            if progress:
+                progress(self.files_seen, self.bytes_seen, self.pruned)
+
+        self._walk(root, tick, interval)
+        tick()
+
+        for owner, allocated in self._links.complete():
+            owner.reclaim += allocated
+        for node in reversed(self._nodes):
+            if node.parent is not None:
+                node.parent.size += node.size
+                node.parent.files += node.files
+                node.parent.reclaim += node.reclaim
+        for node in self._nodes:
+            node.children.sort(key=lambda child: child.size, reverse=True)
+        return root
+
+    def nodes(self):
+        return self._nodes
+
+
+def _exclude_args(exclude):
+    return [f"--exclude={pattern}" for pattern in exclude or ()]
+
+
+def _rate_args(max_rate):
+    max_rate = getattr(max_rate, "rate", max_rate)
+    return [f"--max-rate={max_rate}"] if max_rate else []
+
+
+def _limiter(max_rate):
+    """Turns an entries-per-second number into a RateLimit; passes RateLimits through."""
+    if max_rate is None or isinstance(max_rate, RateLimit):
+        return max_rate
+    return RateLimit(max_rate)
+
+
+def _elevated_scan(root, limit, min_size, one_filesystem, progress, interval, cancel, use_index, exclude, workers, max_rate=None, extra_args=(), summary=None, refresh=False):
+    """Runs the scanner as root through sudo and reads its JSON snapshots.
+
+    Lines without a "top" snapshot are stored into the `summary` dict.
+    """
+    cmd = [
+        "sudo", sys.executable, "-m", "archclean.scanner", root,
+        "--limit", str(limit), "--min-size", str(min_size), "--interval", str(interval),
+    ]
+    if workers:
+        cmd.append(f"--workers={workers}")
+    if not one_filesystem:
+        cmd.append("--cross-devices")
+    if use_index:
+        cmd.append("--index")
+        if refresh:
+            cmd.append("--refresh")
+    cmd.extend(_exclude_args(exclude))
+    cmd.extend(_rate_args(max_rate))
+    cmd.extend(extra_args)
+
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    top = []
+    try:
+        for line in proc.stdout:
+            if cancel and cancel.is_set():
+                proc.terminate()
+                break
+            data = json.loads(line)
+            if "top" not in data:
+                if summary is not None:
+                    summary.update(data)
+                continue
+            top = [tuple(entry) for entry in data["top"]]
+            if progress:
+                progress(top, data["files"], data["bytes"], data.get("pruned", 0))
+    finally:
+        stderr = proc.stderr.read()
+        proc.wait()
+
+    if proc.returncode != 0 and not (cancel and cancel.is_set()):
+        raise Exception(f"Scan failed: {stderr.strip()}")
+    return top
+
+
+def scan_largest(root, limit=100, sudo=False, one_filesystem=True, progress=None, interval=0.5, cancel=None, use_index=False, min_size=0, exclude=None, workers=None, max_rate=None, refresh=False):
+    """Returns the `limit` largest files under root as [(size, path, reclaimable), ...].
+
+    Files smaller than `min_size` bytes are left out, and directories
+    matching the `exclude` patterns (see rules.Pruner) are not walked.
+    `max_rate` caps the directory entries listed per second; it is either a
+    number or a throttle.RateLimit shared with other scans.
+
+    With sudo the walk runs in a root helper process, since an unprivileged
+    scandir cannot read every directory. Setting the `cancel` event stops the
+    walk early and returns what was found so far. With use_index the scan is
+    incremental against the ScanIndex kept for root; `refresh` lists every
+    directory again but still writes the result to the index.
+    """
+    if sudo and os.geteuid() != 0:
+        return _elevated_scan(root, limit, min_size, one_filesystem, progress, interval, cancel, use_index, exclude, workers, max_rate, refresh=refresh)
+    index = ScanIndex(root) if use_index else None
+    try:
+        scanner = TopFilesScanner(
+            root, limit=limit, one_filesystem=one_filesystem, workers=workers, cancel=cancel,
+            index=index, min_size=min_size, exclude=exclude, rate=_limiter(max_rate), refresh=refresh,
+        )
+        return scanner.scan(progress=progress, interval=interval)
+    finally:
+        if index is not None:
+            index.close()
+
+
+def scan_largest_mounts(root, limit=100, sudo=False, progress=None, interval=0.5, cancel=None, use_index=False, min_size=0, exclude=None, groups=None, max_rate=None, refresh=False):
+    """Like scan_largest, across every block-device filesystem mounted under root.
+
+    Each disk in `groups` (mounts.device_groups(root, exclude=exclude) by
+    default) gets its own thread, which scans that disk's mount points one at
+    a time with scan_largest, so different disks are walked concurrently.
+    Spinning disks get fewer walker threads to limit seeking. progress(top,
+    files_seen, bytes_seen, pruned) receives the merged view of all of them.
+    `max_rate` is shared by all disks.
+    """
+    if groups is None:
+        groups = device_groups(root, exclude=exclude)
+    cancel = cancel or threading.Event()
+    if sudo and os.geteuid() != 0 and max_rate:
+        # Root helpers cannot share one limiter, so each disk gets a share
+        max_rate = getattr(max_rate, "rate", max_rate) / max(1, len(groups))
+    else:
+        max_rate = _limiter(max_rate)
+    snapshots = {}
+    lock = threading.Lock()
+
+    def merged():
+        with lock:
+            snaps = list(snapshots.values())
+        top = heapq.nlargest(limit, (entry for snap in snaps for entry in snap[0]))
+        return (top, *(sum(snap[i] for snap in snaps) for i in (1, 2, 3)))
+
+    def scan_device(group):
+        workers = ROTATIONAL_WORKERS if group.rotational else None
+        for point in group.mount_points:
+            if cancel.is_set():
+                return
+
+            def on_progress(top, files_seen, bytes_seen, pruned, point=point):
+                with lock:
+                    snapshots[point] = (top, files_seen, bytes_seen, pruned)
+
+            scan_largest(
+                point, limit, sudo=sudo, progress=on_progress, interval=interval, cancel=cancel,
+                use_index=use_index, min_size=min_size, exclude=exclude, workers=workers, max_rate=max_rate,
+                refresh=refresh,
+            )
+
+    errors = []
+
+    def run(group):
+        try:
+            scan_device(group)
+        except Exception as e:
+            errors.append(e)
+            cancel.set()
+
+    threads = [threading.Thread(target=run, args=(group,), daemon=True) for group in groups]
+    for t in threads:
+        t.start()
+    done = threading.Event()
+    threading.Thread(target=lambda: ([t.join() for t in threads], done.set()), daemon=True).start()
+    while not done.wait(interval):
+        if progress:
+            progress(*merged())
+
+    if errors:
+        raise errors[0]
+    result = merged()
+    if progress:
+        progress(*result)
+    return result[0]
+
+
+def scan_stale(root, min_age_days=30, limit=1000, sudo=False, one_filesystem=True, progress=None, interval=0.5, cancel=None, min_size=0, exclude=None, max_rate=None):
+    """Finds the largest files untouched for at least `min_age_days`.
+
+    Returns (top, buckets, dirs): top as [(size, path, reclaimable, age_days)],
+    buckets as the bytes of all files per AGE_BUCKETS range and dirs as
+    StaleFilesScanner.stalest_dirs().
+    """
+    if sudo and os.geteuid() != 0:
+        summary = {}
+        top = _elevated_scan(
+            root, limit, min_size, one_filesystem, progress, interval, cancel, False, exclude, None, max_rate,
+            extra_args=[f"--stale={min_age_days}"], summary=summary,
+        )
+        buckets = summary.get("buckets", [0] * (len(AGE_BUCKETS) + 1))
+        return top, buckets, [tuple(entry) for entry in summary.get("dirs", [])]
+    scanner = StaleFilesScanner(
+        root, min_age_days=min_age_days, limit=limit, one_filesystem=one_filesystem,
+        cancel=cancel, min_size=min_size, exclude=exclude, rate=_limiter(max_rate),
+    )
+    top = scanner.scan(progress=progress, interval=interval)
+    return top, scanner.buckets, scanner.stalest_dirs()
+
+
+def _elevated_tree(root, one_filesystem, progress, interval, cancel, exclude, max_rate):
+    """Runs DirTreeScanner as root and rebuilds the tree from its output."""
+    cmd = ["sudo", sys.executable, "-m", "archclean.scanner", root, "--tree", "--interval", str(interval)]
+    if not one_filesystem:
+        cmd.append("--cross-devices")
+    cmd.extend(_exclude_args(exclude))
+    cmd.extend(_rate_args(max_rate))
+
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    nodes = []
+    try:
+        for line in proc.stdout:
+            if cancel and cancel.is_set():
+                proc.terminate()
+                break
+            data = json.loads(line)
+            if isinstance(data, dict):
+                if progress:
+                    progress(data["files"], data["bytes"], data.get("pruned", 0))
+                continue
+            parent, size, files, reclaim, name = data
+            node = DirNode(name, nodes[parent] if parent >= 0 else None, size, files, reclaim)
+            if node.parent is not None:
+                node.parent.children.append(node)
+            nodes.append(node)
+    finally:
+        stderr = proc.stderr.read()
+        proc.wait()
+
+    if proc.returncode != 0 and not (cancel and cancel.is_set()):
+        raise Exception(f"Scan failed: {stderr.strip()}")
+    for node in nodes:
+        node.children.sort(key=lambda child: child.size, reverse=True)
+    return nodes[0] if nodes else DirNode(os.path.abspath(root))
+
+
+def scan_tree(root, sudo=False, one_filesystem=True, progress=None, interval=0.5, cancel=None, exclude=None, max_rate=None):
+    """Returns the root DirNode of a du-style walk of root."""
+    if sudo and os.geteuid() != 0:
+        return _elevated_tree(root, one_filesystem, progress, interval, cancel, exclude, max_rate)
+    scanner = DirTreeScanner(root, one_filesystem=one_filesystem, cancel=cancel, exclude=exclude, rate=_limiter(max_rate))
+    return scanner.scan(progress=progress, interval=interval)
+
+
+def _emit_tree(args):
+    # Progress dicts first, then one [parent_index, size, files, reclaim, name]
+    # row per directory, parents before children.
+    def emit(files, total, pruned):
+        json.dump({"files": files, "bytes": total, "pruned": pruned}, sys.stdout)
+        sys.stdout.write("\n")
+        sys.stdout.flush()
+
+    scanner = DirTreeScanner(args.root, one_filesystem=not args.cross_devices, exclude=args.exclude, rate=_limiter(args.max_rate))
+    scanner.scan(progress=emit, interval=args.interval)
+    ids = {}
+    for i, node in enumerate(scanner.nodes()):
+        ids[id(node)] = i
+        parent = ids[id(node.parent)] if node.parent is not None else -1
+        json.dump([parent, node.size, node.files, node.reclaim, node.name], sys.stdout)
+        sys.stdout.write("\n")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="archclean.scanner")
+    parser.add_argument("root")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--min-size", type=int, default=0)
+    parser.add_argument("--cross-devices", action="store_true")
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--index", action="store_true")
+    parser.add_argument("--refresh", action="store_true")
+    parser.add_argument("--tree", action="store_true")
+    parser.add_argument("--exclude", action="append", default=[])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--stale", type=int, default=None, metavar="DAYS")
+    parser.add_argument("--max-rate", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    if args.tree:
+        _emit_tree(args)
+        return
+
+    def emit(top, files, total, pruned):
+        json.dump({"files": files, "bytes": total, "pruned": pruned, "top": top}, sys.stdout)
+        sys.stdout.write("\n")
+        sys.stdout.flush()
+
+    if args.stale is not None:
+        _, buckets, dirs = scan_stale(
+            args.root, min_age_days=args.stale, limit=args.limit, min_size=args.min_size,
+            one_filesystem=not args.cross_devices, progress=emit, interval=args.interval, exclude=args.exclude,
+            max_rate=args.max_rate,
+        )
+        json.dump({"buckets": buckets, "dirs": dirs}, sys.stdout)
+        sys.stdout.write("\n")
+        return
+
+    scan_largest(
+        args.root, limit=args.limit, min_size=args.min_size, one_filesystem=not args.cross_devices,
+        progress=emit, interval=args.interval, use_index=args.index, exclude=args.exclude,
+        workers=args.workers, max_rate=args.max_rate, refresh=args.refresh,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""Disk space accounting that reflects what a deletion actually frees.
+
+st_size is the apparent size of a file. What deleting it gives back is
+smaller when the file is sparse (fewer blocks than its length), hardlinked
+(other names keep the inode alive) or shares extents with reflinked copies
+or snapshots (the blocks stay in use by the other owner).
+"""
+import fcntl
+import os
+import stat
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from rich.filesize import decimal
+
+# <linux/fiemap.h>
+FS_IOC_FIEMAP = 0xC020660B
+FIEMAP_MAX_OFFSET = 0xFFFFFFFFFFFFFFFF
+FIEMAP_EXTENT_LAST = 0x1
+FIEMAP_EXTENT_SHARED = 0x2000
+_FIEMAP_HEADER = struct.Struct("=QQLLLL")
+_FIEMAP_EXTENT = struct.Struct("=QQQQQLLLL")
+_FIEMAP_BATCH = 64
+
+USAGE_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+# Long enough to span a run of prompts, short enough to never show old sizes
+USAGE_CACHE_SECONDS = 30
+
+
+def allocated_size(st):
+    """Bytes actually allocated to a file (st_blocks is in 512 byte units)."""
+    return st.st_blocks * 512
+
+
+def shared_bytes(path):
+    """Returns how many allocated bytes of `path` are shared with other files.
+
+    Uses the FIEMAP ioctl; filesystems without shared extents (ext4) or
+    files that cannot be opened report 0.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_NOFOLLOW | os.O_NONBLOCK | os.O_CLOEXEC)
+    except OSError:
+        return 0
+
+    shared = 0
+    start = 0
+    try:
+        while True:
+            buf = bytearray(_FIEMAP_HEADER.size + _FIEMAP_BATCH * _FIEMAP_EXTENT.size)
+            _FIEMAP_HEADER.pack_into(buf, 0, start, FIEMAP_MAX_OFFSET - start, 0, 0, _FIEMAP_BATCH, 0)
+            fcntl.ioctl(fd, FS_IOC_FIEMAP, buf)
+            mapped = _FIEMAP_HEADER.unpack_from(buf)[3]
+            if mapped == 0:
+                break
+
+            last = False
+            for i in range(mapped):
+                extent = _FIEMAP_EXTENT.unpack_from(buf, _FIEMAP_HEADER.size + i * _FIEMAP_EXTENT.size)
+                logical, length, flags = extent[0], extent[2], extent[5]
+                if flags & FIEMAP_EXTENT_SHARED:
+                    shared += length
+                last = flags & FIEMAP_EXTENT_LAST
+            if last:
+                break
+            start = logical + length
+    except OSError:
+        return 0
+    finally:
+        os.close(fd)
+    return shared
+
+
+def reclaimable_size(st, path=None):
+    """Bytes freed by deleting this one name of a file.
+
+    Nothing is freed while other hardlinks remain. If `path` is given, extents
+    shared with reflinked copies or snapshots are not counted either.
+    """
+    if st.st_nlink > 1:
+        return 0
+    allocated = allocated_size(st)
+    if path is not None and allocated and stat.S_ISREG(st.st_mode):
+        allocated -= min(allocated, shared_bytes(path))
+    return allocated
+
+
+class InodeSet:
+    """Compact set of (st_dev, st_ino) pairs for files with several links.
+
+    Files with a single link can never be seen twice and are not stored, so
+    the set only grows with the number of hardlinked inodes. Each inode also
+    tallies its links, since it is only reclaimable once every link is
+    inside the set of paths being deleted.
+    """
+
+    def __init__(self):
+        self._links = {}
+        self._lock = threading.Lock()
+
+    def add(self, st, owner=None):
+        """Records one link; returns how many links of its inode were seen."""
+        key = (st.st_dev, st.st_ino)
+        with self._lock:
+            entry = self._links.get(key)
+            if entry is None:
+                entry = self._links[key] = [0, st.st_nlink, allocated_size(st), owner]
+            entry[0] += 1
+            return entry[0]
+
+    def __len__(self):
+        return len(self._links)
+
+    def complete(self):
+        """Yields (owner, allocated bytes) for inodes whose links were all seen."""
+        for seen, nlink, allocated, owner in self._links.values():
+            if seen >= nlink:
+                yield owner, allocated
+
+
+def _walk_usage(roots, links):
+    """Adds up (apparent, reclaimable) below `roots` on one thread.
+
+    Entries are told apart by is_dir(), which uses the d_type scandir already
+    returned, so directories are never stat'ed; only files are.
+    """
+    apparent = 0
+    reclaimable = 0
+    stack = list(roots)
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                            continue
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if st.st_nlink > 1:
+                        seen = links.add(st)
+                        if seen == 1:
+                            apparent += st.st_size
+                        if seen == st.st_nlink:
+                            reclaimable += allocated_size(st)
+                    else:
+                        apparent += st.st_size
+                        reclaimable += allocated_size(st)
+        except OSError:
+            continue
+    return apparent, reclaimable
+
+
+def tree_usage(path, workers=1):
+    """Returns (apparent, reclaimable) bytes for everything under `path`.
+
+    Hardlinks are counted once, and only when all their links are inside the
+    tree; sparse files count their allocated blocks. With several `workers`
+    the subdirectories of `path` are walked concurrently, which pays off for
+    wide trees such as package caches.
+    """
+    links = InodeSet()
+    if workers <= 1:
+        return _walk_usage([path], links)
+
+    subdirs = []
+    files = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    (subdirs if entry.is_dir(follow_symlinks=False) else files).append(entry.path)
+                except OSError:
+                    continue
+    except OSError:
+        return 0, 0
+
+    # Top-level files are one shallow "tree" of their own; links is shared,
+    # so hardlinks between subtrees still count once.
+    apparent = 0
+    reclaimable = 0
+    for file_path in files:
+        try:
+            st = os.lstat(file_path)
+        except OSError:
+            continue
+        if st.st_nlink > 1:
+            seen = links.add(st)
+            if seen == 1:
+                apparent += st.st_size
+            if seen == st.st_nlink:
+                reclaimable += allocated_size(st)
+        else:
+            apparent += st.st_size
+            reclaimable += allocated_size(st)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for sub_apparent, sub_reclaimable in pool.map(lambda sub: _walk_usage([sub], links), subdirs):
+            apparent += sub_apparent
+            reclaimable += sub_reclaimable
+    return apparent, reclaimable
+
+
+def is_empty(path):
+    """True if there is no file anywhere below `path` (or `path` does not exist).
+
+    Stops at the first file found, so a full directory costs one scandir
+    rather than a walk of the whole tree.
+    """
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    try:
+                        if not entry.is_dir(follow_symlinks=False):
+                            return False
+                    except OSError:
+                        return False
+                    stack.append(entry.path)
+        except OSError:
+            continue
+    return True
+
+
+_usage_cache = {}
+_usage_lock = threading.Lock()
+
+
+def estimate_usage(paths, max_age=USAGE_CACHE_SECONDS):
+    """Returns (apparent, reclaimable) bytes summed over `paths`.
+
+    Missing paths count as 0. Results are reused for `max_age` seconds, so a
+    cleaner can show a size in its prompt right after prefetch_usage() or a
+    dry run computed it. Call forget_usage() after deleting something.
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    now = time.monotonic()
+    apparent = 0
+    reclaimable = 0
+    for path in paths:
+        key = os.path.abspath(os.path.expanduser(path))
+        with _usage_lock:
+            cached = _usage_cache.get(key)
+        if cached is None or now - cached[0] > max_age:
+            cached = (time.monotonic(), tree_usage(key, workers=USAGE_WORKERS) if os.path.isdir(key) else _file_usage(key))
+            with _usage_lock:
+                _usage_cache[key] = cached
+        apparent += cached[1][0]
+        reclaimable += cached[1][1]
+    return apparent, reclaimable
+
+
+def _file_usage(path):
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return 0, 0
+    return st.st_size, reclaimable_size(st)
+
+
+def prefetch_usage(paths):
+    """Fills the estimate_usage() cache for all `paths` at once, one thread each."""
+    with ThreadPoolExecutor(max_workers=max(1, min(len(paths), USAGE_WORKERS))) as pool:
+        list(pool.map(estimate_usage, paths))
+
+
+def forget_usage(path=None):
+    """Drops cached estimates that include `path`, or all of them.
+
+    That is the estimates for `path`, for anything inside it and for the
+    directories containing it.
+    """
+    with _usage_lock:
+        if path is None:
+            _usage_cache.clear()
+            return
+        key = os.path.abspath(os.path.expanduser(path))
+        for cached in list(_usage_cache):
+            if cached == key or cached.startswith(key.rstrip("/") + "/") or key.startswith(cached.rstrip("/") + "/"):
+                del _usage_cache[cached]
+
+
+def size_hint(paths):
+    """Returns " (1.2 GB)" for the reclaimable size of `paths`, or "" if it is nothing."""
+    reclaimable = estimate_usage(paths)[1]
+    return f" ({decimal(reclaimable)})" if reclaimable else ""
+
+
+def free_space(path):
+    """Bytes available to unprivileged users on the filesystem holding `path`."""
+    while path and not os.path.exists(path):
+        path = os.path.dirname(path)
+    try:
+        st = os.statvfs(path or "/")
+    except OSError:
+        return None
+    return st.f_bavail * st.f_frsize
+
+
+class Reclaim:
+    """Measures what one cleaning step frees and how long it takes.
+
+    Created right before the step, it sizes `paths` (usually straight from
+    the estimate_usage cache the prompt filled). finish() sizes them again
+    and returns the difference as keyword arguments for tracker.add().
+    Steps whose target cannot be sized, such as root-owned stores behind a
+    package tool, pass `mount` instead and are measured by the change in
+    free space of that filesystem, which other writers can blur.
+    """
+
+    def __init__(self, paths=(), mount=None):
+        if isinstance(paths, (str, os.PathLike)):
+            paths = [paths]
+        self.paths = [os.fspath(path) for path in paths]
+        self.mount = mount
+        self.started = time.monotonic()
+        self.before = estimate_usage(self.paths)[1] if self.paths else None
+        self.free_before = free_space(mount) if mount else None
+
+    def finish(self):
+        seconds = time.monotonic() - self.started
+        freed = None
+        if self.paths:
+            for path in self.paths:
+                forget_usage(path)
+            freed = max(0, self.before - estimate_usage(self.paths, max_age=0)[1])
+        elif self.free_before is not None:
+            free_after = free_space(self.mount)
+            if free_after is not None:
+                freed = max(0, free_after - self.free_before)
+        return {"freed": freed, "seconds": seconds}
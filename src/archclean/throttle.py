@@ -0,0 +1,83 @@
+"""Keeping scans and deletions out of the way of other work on the machine.
+
+lower_priority() moves the process to the idle I/O class and the lowest CPU
+priority. Threads and child processes started afterwards inherit both, so
+calling it once before anything starts covers the scan and delete workers,
+the sudo root helpers and the package tools the cleaners run.
+
+RateLimit caps how fast a scan lists directory entries or a deletion frees
+bytes, for disks where even idle-class I/O is felt.
+"""
+import ctypes
+import os
+import platform
+import threading
+import time
+
+# ioprio_set(2) has no libc wrapper, so it is called by syscall number
+IOPRIO_SET = {
+    "x86_64": 251,
+    "i386": 289,
+    "i686": 289,
+    "aarch64": 30,
+    "armv7l": 314,
+    "riscv64": 30,
+    "ppc64le": 273,
+}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+IDLE_NICE = 19
+
+
+def set_idle_io():
+    """Puts the calling thread in the idle I/O class; False if that is not possible."""
+    number = IOPRIO_SET.get(platform.machine())
+    if number is None:
+        return False
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.syscall(number, IOPRIO_WHO_PROCESS, 0, IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT) == 0
+    except (OSError, AttributeError):
+        return False
+
+
+def lower_priority():
+    """Runs the caller at idle I/O class and nice 19 from now on.
+
+    Unprivileged processes cannot raise their priority again, so this is a
+    one-way switch. Returns False if only the CPU priority could be lowered.
+    """
+    try:
+        os.setpriority(os.PRIO_PROCESS, 0, max(IDLE_NICE, os.getpriority(os.PRIO_PROCESS, 0)))
+    except OSError:
+        pass
+    return set_idle_io()
+
+
+class RateLimit:
+    """Token bucket shared by all threads of one scan or deletion.
+
+    wait(amount) blocks until `amount` more units fit under `rate` per
+    second. Up to `burst` seconds' worth may go through at once, so short
+    runs are not slowed down at all. A rate of None or 0 never waits.
+    """
+
+    def __init__(self, rate, burst=1.0):
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self, amount, cancel=None):
+        if not self.rate or amount <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._next = max(self._next, now) + amount / self.rate
+            delay = self._next - now - self.burst
+        if delay > 0:
+            if cancel is not None:
+                cancel.wait(delay)
+            else:
+                time.sleep(delay)
@@ -0,0 +1,197 @@
+"""Deleting large trees in the background.
+
+bury() renames a directory into a tombstone on the same filesystem, which is
+atomic and instant, so the cleaners can carry on right away. A detached
+reaper process (python -m archclean.tombstone) then unlinks the tombstones
+at idle priority; it is not tied to the CLI and keeps going after it exits.
+
+Tombstones are listed in $XDG_CACHE_HOME/archclean/tombstones.pending until
+they are gone. Any left over because the machine shut down mid-way are
+picked up by resume() on the next run. One the reaper cannot delete moves to
+tombstones.failed instead, so it is reported rather than retried forever.
+"""
+import errno
+import fcntl
+import os
+import shutil
+import subprocess
+import sys
+import uuid
+from archclean.utils import xdg_cache_dir
+from archclean.throttle import lower_priority
+from archclean.prune import rmtree_writable
+
+PREFIX = ".archclean-tombstone-"
+
+
+def tombstone_root():
+    return os.path.join(xdg_cache_dir(), "tombstones")
+
+
+def _pending_path():
+    return os.path.join(xdg_cache_dir(), "tombstones.pending")
+
+
+def _failed_path():
+    return os.path.join(xdg_cache_dir(), "tombstones.failed")
+
+
+def _lock_path():
+    return os.path.join(xdg_cache_dir(), "tombstones.lock")
+
+
+def _update_list(list_path, change):
+    """Rewrites the list at `list_path` as change(list) under an exclusive lock."""
+    os.makedirs(xdg_cache_dir(), exist_ok=True)
+    with open(list_path, "a+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        paths = [line.rstrip("\n") for line in f if line.strip()]
+        updated = change(list(paths))
+        if updated != paths:
+            f.seek(0)
+            f.truncate()
+            f.writelines(path + "\n" for path in updated)
+        return updated
+
+
+def _update_pending(change):
+    return _update_list(_pending_path(), change)
+
+
+def failed():
+    """Returns the tombstones the reaper gave up on that still exist."""
+    return _update_list(_failed_path(), lambda paths: [path for path in paths if os.path.lexists(path)])
+
+
+def pending():
+    """Returns the tombstones still waiting to be deleted."""
+    paths = _update_pending(lambda paths: paths)
+    # Tombstones renamed just before a crash, before they were listed
+    try:
+        given_up = set(failed())
+        with os.scandir(tombstone_root()) as it:
+            paths += [entry.path for entry in it if entry.path not in paths and entry.path not in given_up]
+    except OSError:
+        pass
+    return paths
+
+
+def bury(path):
+    """Atomically moves `path` out of the way and returns its tombstone.
+
+    The tombstone goes to tombstone_root() when that is on the same
+    filesystem, otherwise next to `path`, since rename cannot cross
+    filesystems.
+    """
+    path = os.path.abspath(os.fspath(path))
+    name = PREFIX + uuid.uuid4().hex
+    candidates = [os.path.dirname(path)]
+    try:
+        os.makedirs(tombstone_root(), exist_ok=True)
+        if os.stat(tombstone_root()).st_dev == os.lstat(path).st_dev:
+            candidates.insert(0, tombstone_root())
+    except OSError:
+        pass
+
+    for directory in candidates:
+        tombstone = os.path.join(directory, name)
+        try:
+            os.rename(path, tombstone)
+            break
+        except OSError as e:
+            # Bind mounts share st_dev but still refuse cross-mount renames
+            if e.errno != errno.EXDEV or directory == candidates[-1]:
+                raise
+    _update_pending(lambda paths: paths + [tombstone])
+    return tombstone
+
+
+def _reaper_running():
+    os.makedirs(xdg_cache_dir(), exist_ok=True)
+    with open(_lock_path(), "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        return False
+
+
+def start_reaper():
+    """Starts the detached reaper unless one is already running."""
+    if _reaper_running():
+        return
+    subprocess.Popen(
+        [sys.executable, "-m", "archclean.tombstone"],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True, close_fds=True,
+    )
+
+
+def remove_tree(path, background=False):
+    """Deletes the directory at `path`; True if that continues in the background."""
+    if background:
+        bury(path)
+        start_reaper()
+        return True
+    shutil.rmtree(path)
+    return False
+
+
+def resume():
+    """Restarts the reaper for tombstones left over from an earlier run.
+
+    Returns the tombstones an earlier reaper could not delete.
+    """
+    if pending():
+        start_reaper()
+    return failed()
+
+
+def _unlink(path):
+    """Deletes the tombstone at `path`; False if some of it is still there."""
+    try:
+        if os.path.isdir(path) and not os.path.islink(path):
+            rmtree_writable(path)
+        else:
+            os.unlink(path)
+    except OSError:
+        pass
+    return not os.path.lexists(path)
+
+
+def reap(done=None):
+    """Deletes every pending tombstone; returns how many were handled.
+
+    Each tombstone gets one attempt per run (tracked in `done`). One that
+    cannot be deleted is moved to the failed list, so later runs report it
+    instead of starting a reaper for it again.
+    """
+    done = set() if done is None else done
+    while paths := [path for path in pending() if path not in done]:
+        for path in paths:
+            if not _unlink(path):
+                _update_list(_failed_path(), lambda current, path=path: current + [path] if path not in current else current)
+            _update_pending(lambda current, path=path: [p for p in current if p != path])
+            done.add(path)
+    return len(done)
+
+
+def main():
+    lower_priority()
+    done = set()
+    while True:
+        with open(_lock_path(), "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+            reap(done)
+        # Something buried while this reaper was finishing could not start
+        # another one, so look once more after letting go of the lock.
+        if all(path in done for path in pending()):
+            return
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from rich.table import Table
 from rich.console import Console
+from rich.filesize import decimal
 
 console = Console()
 
@@ -7,14 +8,25 @@ class Tracker:
     def __init__(self):
         self.records = []
 
-    def add(self, category, action, status, info=""):
+    def add(self, category, action, status, info="", freed=None, seconds=None):
+        """Records one action; `freed` bytes and `seconds` are None when not measured."""
         self.records.append({
             "Category": category,
             "Action": action,
             "Status": status,
-            "Info": info
+            "Info": info,
+            "Freed": freed,
+            "Seconds": seconds,
         })
 
+    def totals(self):
+        """Returns {category: bytes freed} over the measured records, in report order."""
+        totals = {}
+        for r in self.records:
+            if r["Freed"] is not None:
+                totals[r["Category"]] = totals.get(r["Category"], 0) + r["Freed"]
+        return totals
+
     def print_summary(self):
         if not self.records:
             return
@@ -24,11 +36,15 @@ class Tracker:
         table.add_column("Action", style="magenta")
         table.add_column("Status", style="green")
         table.add_column("Details", style="yellow")
+        table.add_column("Freed", justify="right", style="bold")
+        table.add_column("Time", justify="right", style="dim")
 
         for r in self.records:
             status_style = "green"
             if r["Status"] in ["Skipped", "Not Found"]:
                 status_style = "dim"
+            elif r["Status"] == "Pending":
+                status_style = "yellow"
             elif r["Status"] == "Failed":
                 status_style = "bold red"
             
@@ -36,10 +52,21 @@ class Tracker:
                 r["Category"], 
                 r["Action"], 
                 f"[{status_style}]{r['Status']}[/{status_style}]", 
-                r["Info"]
+                r["Info"],
+                decimal(r["Freed"]) if r["Freed"] is not None else "",
+                f"{r['Seconds']:.1f}s" if r["Seconds"] is not None else "",
             )
 
         console.print("\n")
         console.print(table)
 
-tracker = Tracker()
\ No newline at end of file
+        totals = self.totals()
+        if totals:
+            summary = Table(title="Space Reclaimed", show_footer=True)
+            summary.add_column("Category", style="cyan", footer="Total")
+            summary.add_column("Freed", justify="right", style="bold green", footer=decimal(sum(totals.values())))
+            for category, freed in totals.items():
+                summary.add_row(category, decimal(freed))
+            console.print(summary)
+
+tracker = Tracker()
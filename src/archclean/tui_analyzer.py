@@ -1,31 +1,46 @@
 from textual.app import App, ComposeResult
-from textual.widgets import Header, Footer, SelectionList, Button, Label, LoadingIndicator, Static
+from textual.widgets import Header, Footer, SelectionList, Button, Label, LoadingIndicator, Static, Tree
 from textual.containers import Container, Horizontal, Vertical
+from textual.widgets.selection_list import Selection
+from textual.widgets.option_list import Option, OptionDoesNotExist
+from textual.geometry import Size
+from textual.visual import visualize
 from textual.screen import Screen
 from textual.worker import Worker
 from textual import work
 from rich.text import Text
 import sh
 import os
-import subprocess
+import threading
+import time
+import heapq
+import itertools
 from pathlib import Path
-from archclean.utils import run_command
+from archclean.scanner import scan_largest, scan_largest_mounts, scan_stale, scan_tree, AGE_BUCKETS
+from archclean.mounts import device_groups
+from archclean.scan_index import ScanIndex
+from archclean.duplicates import scan_duplicates, process_duplicates
+from archclean.deleter import delete_paths
+from archclean.rules import load_rules
 from rich.filesize import decimal
 
 class ResultScreen(Screen):
     BINDINGS = [("escape", "dismiss", "Close")]
     
-    def __init__(self, count, size, failed):
+    def __init__(self, count, size, failed, noun="Files", apparent_size=None):
         super().__init__()
         self.count = count
+        self.noun = noun
         self.reclaimed_size = size
+        self.apparent_size = apparent_size
         self.failed = failed
 
     def compose(self) -> ComposeResult:
         yield Container(
             Label("Deletion Complete", classes="title"),
-            Label(f"Files Deleted: {self.count}"),
+            Label(f"{self.noun} Deleted: {self.count}"),
             Label(f"Space Reclaimed: {decimal(self.reclaimed_size)}"),
+            Label(f"Apparent Size: {decimal(self.apparent_size)}") if self.apparent_size is not None else Label(""),
             Label(f"Failed: {self.failed}") if self.failed > 0 else Label(""),
             Button("OK", variant="primary", id="btn-ok"),
             classes="modal"
@@ -34,6 +49,91 @@ class ResultScreen(Screen):
     def on_button_pressed(self, event: Button.Pressed) -> None:
         self.dismiss()
 
+def file_label(size_bytes, path, reclaim, classifier, age_days=None):
+    """Builds the Rich Text label for one file row."""
+    human_size = decimal(size_bytes)
+    path_obj = Path(path)
+    category, style_color = classifier.classify(path)
+    
+    # Build Rich Text Label
+    # Format: SIZE  RECLAIMABLE  [CATEGORY]  /path/to/ FILE
+    text = Text(no_wrap=True, overflow="ellipsis")
+    text.append(f"{human_size:>10} ", style="bold white")
+    text.append(f"{decimal(reclaim):>10} ", style="dim white" if reclaim < size_bytes else "white")
+    text.append(f"[{category:^{classifier.width}}] ", style=f"bold {style_color}")
+    if age_days is not None:
+        text.append(f"{age_days:>6,}d ", style="bold magenta")
+    
+    # Path formatting: dim directory, bold filename
+    parent = str(path_obj.parent)
+    if parent == ".": parent = ""
+    else: parent += "/"
+    
+    text.append(parent, style=f"dim {style_color}")
+    text.append(path_obj.name, style=f"bold {style_color}")
+    return text
+
+
+class FileRow(Selection):
+    """A file in the results whose label is only built when it is drawn.
+
+    `entry` is the scanner's result tuple, starting with (size, path,
+    reclaimable); `label(*entry)` builds the prompt.
+    """
+
+    def __init__(self, entry, label, initial_state=False):
+        # Selection.__init__ would convert the prompt right away
+        Option.__init__(self, None)
+        self._value = entry[1]
+        self._initial_state = initial_state
+        self.entry = entry
+        self.label = label
+
+    @property
+    def size(self):
+        return self.entry[0]
+
+    @property
+    def reclaim(self):
+        return self.entry[2]
+
+    @property
+    def prompt(self):
+        return self.label(*self.entry)
+
+
+class LazySelectionList(SelectionList):
+    """SelectionList for single-line rows that only renders what is on screen.
+
+    The stock list measures every option when it is added and keeps each
+    option's rendered label for good. Here every row is one line high, so
+    nothing is measured, and labels only live in the bounded render cache.
+    """
+
+    def _get_visual(self, option):
+        return visualize(self, option.prompt, markup=self._markup)
+
+    def _update_lines(self) -> None:
+        if not self.scrollable_content_region:
+            return
+
+        line_cache = self._line_cache
+        lines = line_cache.lines
+        for index in range(len(lines), len(self.options)):
+            line_cache.index_to_line[index] = index
+            line_cache.heights[index] = 1
+            lines.append((index, 0))
+
+        width = self.scrollable_content_region.width - self._get_left_gutter_width()
+        virtual_size = Size(width, len(lines))
+        if virtual_size != self.virtual_size:
+            self.virtual_size = virtual_size
+            self._scroll_update(virtual_size)
+
+    def get_content_height(self, container, viewport, width):
+        return len(self.options)
+
+
 class LargeFilesApp(App):
     CSS = """
     Screen {
@@ -88,15 +188,32 @@ class LargeFilesApp(App):
     BINDINGS = [
         ("q", "quit", "Quit"),
         ("d", "delete_selected", "Delete Selected"),
-        ("r", "refresh", "Refresh")
+        ("r", "refresh", "Refresh"),
+        ("c", "cancel_scan", "Stop Scan")
     ]
 
-    def __init__(self, target_path="/", limit=100, sudo=False):
+    # Snapshots shown while a large scan runs are cut to this many rows; the
+    # full result is loaded once the scan finishes.
+    LIVE_ROWS = 1000
+
+    def __init__(self, target_path="/", limit=100, sudo=False, min_size=0, exclude=None, all_mounts=False, scan_rate=None, delete_rate=None):
         super().__init__()
         self.target_path = target_path
         self.limit = limit
+        self.min_size = min_size
+        self.exclude = exclude
+        self.all_mounts = all_mounts
+        self.scan_rate = scan_rate  # Directory entries per second
+        self.delete_rate = delete_rate  # Bytes freed per second
+        self.index_roots = [target_path]  # One scan index per scanned mount
         self.sudo = sudo
-        self.files_map = {}  # Map value to (path, size)
+        self.classifier = load_rules()
+        self.files_map = {}  # Map path to (size, reclaimable)
+        self.deleted_paths = set()
+        self.deleting = set()
+        self.scan_cancel = None
+        self.scanning = False
+        self.refresh_index = False  # Set by refresh to relist every directory once
         
         # Session Stats
         self.total_deleted_count = 0
@@ -104,10 +221,10 @@ class LargeFilesApp(App):
 
     def compose(self) -> ComposeResult:
         yield Header()
-        yield Static("Legend: [bold green]User Data[/] (Safe) | [bold yellow]Cache/Logs[/] (Review) | [bold red]System Files[/] (Caution)", id="legend")
+        yield Static(self.legend_text(), id="legend")
         yield Container(
             LoadingIndicator(id="loading"),
-            SelectionList(id="file-list", classes="hidden"),
+            LazySelectionList(id="file-list", classes="hidden"),
             id="list-container"
         )
         yield Label("", id="status")
@@ -121,150 +238,721 @@ class LargeFilesApp(App):
     def on_mount(self) -> None:
         self.scan_files()
 
+    def legend_text(self):
+        legend = " | ".join(f"[bold {color}]{description}[/]" for _, color, description in self.classifier.legend())
+        return f"Columns: Size | Reclaimable (allocated, not shared)\nLegend: {legend}"
+
+    def row_label(self, size_bytes, path, reclaim):
+        return file_label(size_bytes, path, reclaim, self.classifier)
+
+    def build_items(self, top, selected=()):
+        items = []
+        for entry in top:
+            size_bytes, path, reclaim = entry[:3]
+            if path in self.deleted_paths:
+                continue
+            # Labels are built by the row itself once it scrolls into view
+            items.append(FileRow(entry, self.row_label, path in selected))
+            self.files_map[path] = (size_bytes, reclaim)
+        return items
+
     @work(exclusive=True, thread=True)
     def scan_files(self) -> None:
-        self.query_one("#status", Label).update(f"Scanning {self.target_path} for top {self.limit} large files...")
+        cancel = threading.Event()
+        self.scan_cancel = cancel
+        self.scanning = True
+        self.deleted_paths = set()
+        refresh = self.refresh_index
+        self.refresh_index = False
+        where = self.target_path
+        groups = None
+        if self.all_mounts:
+            groups = device_groups(self.target_path, exclude=self.exclude)
+            self.index_roots = [point for group in groups for point in group.mount_points]
+            where = f"{self.target_path} ({len(self.index_roots)} filesystems on {len(groups)} disks)"
+        self.call_from_thread(self.query_one("#status", Label).update, f"Scanning {where} for top {self.limit} large files...")
         self.call_from_thread(self.query_one("#loading").remove_class, "hidden")
         self.call_from_thread(self.query_one("#file-list").add_class, "hidden")
         
-        try:
-            # find <path> -xdev -type f -printf "%s %p\n" | sort -rn | head -n <limit>
-            # 2>/dev/null to silence permission denied errors if not sudo
-            cmd_str = f"find {self.target_path} -xdev -type f -printf '%s %p\n' 2>/dev/null | sort -rn | head -n {self.limit}"
-            
-            if self.sudo:
-                cmd_str = f"sudo {cmd_str}"
-
-            # Run the command using subprocess
-            result = subprocess.run(
-                cmd_str, 
-                shell=True, 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.PIPE, 
-                text=True
-            )
+        last_top = None
+        last_counts = (0, 0, 0)
 
-            if result.returncode != 0:
-                 raise Exception(f"Scan failed: {result.stderr}")
-
-            output = result.stdout
-            
-            items = []
-            self.files_map = {}
-            
-            for line in output.strip().split('\n'):
-                if not line: continue
-                parts = line.split(' ', 1)
-                if len(parts) != 2: continue
-                
-                try:
-                    size_bytes = int(parts[0])
-                    path = parts[1]
-                except ValueError:
-                    continue
-                
-                human_size = decimal(size_bytes)
-                path_obj = Path(path)
-                
-                # Determine category and style
-                str_path = str(path)
-                
-                # Check for cache/temp locations first, regardless of root
-                # This covers ~/.cache, /var/cache, etc.
-                if "/.cache" in str_path or str_path.startswith(("/var/cache", "/tmp", "/var/tmp", "/var/log")):
-                    style_color = "yellow"
-                    category = "Cache"
-                elif str_path.startswith("/home"):
-                    style_color = "green"
-                    category = "User"
-                else:
-                    style_color = "red"
-                    category = "System"
-                
-                # Build Rich Text Label
-                # Format: SIZE  [CATEGORY]  /path/to/ FILE
-                text = Text()
-                text.append(f"{human_size:>10} ", style="bold white")
-                text.append(f"[{category:^6}] ", style=f"bold {style_color}")
-                
-                # Path formatting: dim directory, bold filename
-                parent = str(path_obj.parent)
-                if parent == ".": parent = ""
-                else: parent += "/"
-                
-                text.append(parent, style=f"dim {style_color}")
-                text.append(path_obj.name, style=f"bold {style_color}")
-                
-                # Use path as the value
-                items.append((text, path))
-                self.files_map[path] = size_bytes
-
-            self.call_from_thread(self.update_list, items)
+        def on_progress(top, files_seen, bytes_seen, pruned):
+            # Called at a fixed cadence by the scanner, so each snapshot is a
+            # single batched hop onto the UI thread.
+            nonlocal last_top, last_counts
+            last_counts = (files_seen, bytes_seen, pruned)
+            if cancel.is_set():
+                return
+            if top == last_top:
+                self.call_from_thread(self.update_status, files_seen, bytes_seen, pruned)
+                return
+            last_top = top
+            self.call_from_thread(self.update_list, top[:self.LIVE_ROWS], files_seen, bytes_seen, pruned)
+
+        try:
+            top = self.run_scan(on_progress, cancel, groups, refresh)
+            if self.scan_cancel is cancel:
+                self.scanning = False
+                self.call_from_thread(self.finish_scan, top, *last_counts, cancel.is_set())
 
         except Exception as e:
+            self.scanning = False
             self.call_from_thread(self.query_one("#status", Label).update, f"Error: {str(e)}")
 
-    def update_list(self, items):
-        self.query_one("#loading").add_class("hidden")
+    def run_scan(self, progress, cancel, groups=None, refresh=False):
+        """Runs the scan in the worker thread and returns the result rows."""
+        if groups is not None:
+            return scan_largest_mounts(
+                self.target_path, self.limit, sudo=self.sudo, min_size=self.min_size,
+                progress=progress, cancel=cancel, use_index=True, exclude=self.exclude, groups=groups,
+                max_rate=self.scan_rate, refresh=refresh
+            )
+        return scan_largest(
+            self.target_path, self.limit, sudo=self.sudo, min_size=self.min_size,
+            progress=progress, cancel=cancel, use_index=True, exclude=self.exclude, max_rate=self.scan_rate,
+            refresh=refresh
+        )
+
+    def update_status(self, files_seen, bytes_seen, pruned=0):
+        self.query_one("#status", Label).update(f"Scanning {self.target_path}... {files_seen:,} files, {decimal(bytes_seen)} seen, {pruned:,} directories pruned (press c to stop)")
+
+    def update_list(self, top, files_seen=None, bytes_seen=None, pruned=0):
         file_list = self.query_one("#file-list", SelectionList)
+        selected = set(file_list.selected)
+        items = self.build_items(top, selected)
+        first_fill = "hidden" in file_list.classes
+        
+        self.query_one("#loading").add_class("hidden")
         file_list.clear_options()
-        for label, value in items:
-            file_list.add_option((label, value))
+        file_list.add_options(items)
         file_list.remove_class("hidden")
-        self.query_one("#status", Label).update(f"Found {len(items)} files.")
-        file_list.focus()
+        
+        if files_seen is not None:
+            self.update_status(files_seen, bytes_seen, pruned)
+        else:
+            self.query_one("#status", Label).update(f"Found {len(items)} files.")
+        if first_fill:
+            file_list.focus()
+
+    def finish_scan(self, top, files_seen, bytes_seen, pruned, cancelled):
+        self.update_list(top)
+        found = len(self.query_one("#file-list", SelectionList).options)
+        state = "Scan stopped" if cancelled else "Scan complete"
+        self.query_one("#status", Label).update(f"{state}: found {found} files ({files_seen:,} files, {decimal(bytes_seen)} scanned, {pruned:,} directories pruned).")
+
+    def action_cancel_scan(self) -> None:
+        if self.scanning and self.scan_cancel:
+            self.scan_cancel.set()
+            self.query_one("#status", Label).update("Stopping scan...")
+
+    def action_refresh(self) -> None:
+        if self.scan_cancel:
+            self.scan_cancel.set()
+        # An explicit refresh lists everything again instead of trusting the
+        # index, and rewrites the index so later refills see what it found
+        self.refresh_index = True
+        self.scan_files()
+
+    def action_quit(self) -> None:
+        if self.scan_cancel:
+            self.scan_cancel.set()
+        self.exit()
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "btn-quit":
-            self.exit()
+            self.action_quit()
         elif event.button.id == "btn-delete":
             self.action_delete_selected()
 
     def action_delete_selected(self) -> None:
         file_list = self.query_one("#file-list", SelectionList)
-        selected = file_list.selected
+        selected = [path for path in file_list.selected if path not in self.deleting]
         
         if not selected:
             self.query_one("#status", Label).update("No files selected.")
             return
         
-        count = 0
-        failed = 0
-        reclaimed_size = 0
-        
-        for path in selected:
-            file_size = self.files_map.get(path, 0)
-            try:
-                # Remove file
-                success = False
-                if self.sudo:
-                    if run_command("rm", ["-f", path], sudo=True):
-                        success = True
-                else:
-                    os.remove(path)
-                    success = True
-                
-                if success:
-                    count += 1
-                    reclaimed_size += file_size
-            except Exception:
-                # Try sudo if failed?
-                if not self.sudo:
-                     if run_command("rm", ["-f", path], sudo=True):
-                         count += 1
-                         reclaimed_size += file_size
-                     else:
-                         failed += 1
-                else:
-                    failed += 1
-        
+        self.deleting.update(selected)
+        batch = {"total": len(selected), "count": 0, "failed": 0, "reclaimed": 0, "apparent": 0, "deleted": []}
+        self.query_one("#status", Label).update(f"Deleting {len(selected)} files...")
+        self.delete_files(selected, batch)
+
+    @work(thread=True, group="delete")
+    def delete_files(self, paths, batch) -> None:
+        pending = []
+        last_flush = time.monotonic()
+
+        def on_result(path, ok, reclaim, error):
+            # Results are handed to the UI in small batches rather than one
+            # call_from_thread per file.
+            nonlocal last_flush
+            pending.append((path, ok, reclaim, error))
+            now = time.monotonic()
+            if now - last_flush >= 0.1:
+                results = pending[:]
+                pending.clear()
+                last_flush = now
+                self.call_from_thread(self.apply_deletions, batch, results)
+
+        delete_paths(paths, sudo=self.sudo, on_result=on_result, max_rate=self.delete_rate)
+        self.call_from_thread(self.apply_deletions, batch, pending[:])
+        self.call_from_thread(self.finish_deletion, batch)
+
+    def apply_deletions(self, batch, results):
+        file_list = self.query_one("#file-list", SelectionList)
+        removed = set()
+        for path, ok, reclaim, error in results:
+            self.deleting.discard(path)
+            if not ok:
+                batch["failed"] += 1
+                continue
+            batch["count"] += 1
+            batch["reclaimed"] += reclaim
+            batch["apparent"] += self.files_map.get(path, (0, 0))[0]
+            batch["deleted"].append(path)
+            # Keep deleted files out of later snapshots
+            self.deleted_paths.add(path)
+            removed.add(path)
+
+        if len(removed) > 16:
+            # Each remove_option renumbers every later row, so a big batch
+            # is cheaper as one reload of what is left.
+            selected = set(file_list.selected)
+            rows = [row.entry for row in file_list.options if row.value not in removed]
+            file_list.clear_options()
+            file_list.add_options(self.build_items(rows, selected))
+        else:
+            for path in removed:
+                try:
+                    file_list.remove_option(path)
+                except OptionDoesNotExist:
+                    pass
+        done = batch["count"] + batch["failed"]
+        self.query_one("#status", Label).update(f"Deleting... {done}/{batch['total']} ({batch['failed']} failed)")
+
+    def finish_deletion(self, batch):
+        count = batch["count"]
+        failed = batch["failed"]
         self.total_deleted_count += count
-        self.total_reclaimed_space += reclaimed_size
+        self.total_reclaimed_space += batch["reclaimed"]
         
         self.query_one("#status", Label).update(f"Deleted {count} files. {failed} failed.")
         
         # Show Result Screen
-        self.push_screen(ResultScreen(count, reclaimed_size, failed))
+        self.push_screen(ResultScreen(count, batch["reclaimed"], failed, apparent_size=batch["apparent"]))
         
-        # Refresh list
-        self.scan_files()
+        # Refill the list from the scan index instead of rescanning the whole
+        # target. While a scan runs it refills the list itself, and the root
+        # helper's index picks the changed directories up on the next refresh.
+        if batch["deleted"] and not self.scanning and not self.sudo:
+            self.refill_from_index(batch["deleted"])
+
+    def refill_from_index(self, deleted):
+        tops = []
+        for root in self.index_roots:
+            with ScanIndex(root) as index:
+                index.forget(deleted)
+                tops.append(index.top(self.limit + len(self.deleted_paths), self.min_size))
+        top = (
+            entry for entry in heapq.merge(*tops, reverse=True)
+            if entry[1] not in self.deleted_paths and os.path.lexists(entry[1])
+        )
+        self.update_list(list(itertools.islice(top, self.limit)))
+
+
+class StaleFilesApp(LargeFilesApp):
+    """Largest files nobody has read or modified for a number of days.
+
+    The age filter runs inside the scan; the legend shows how the scanned
+    bytes split over the AGE_BUCKETS ranges and which directories hold the
+    most long-untouched data.
+    """
+
+    BINDINGS = LargeFilesApp.BINDINGS + [
+        ("o", "select_older", "Select Older"),
+        ("t", "cycle_threshold", "Change Age"),
+    ]
+
+    THRESHOLDS = (30, 90, 180, 365)
+
+    def __init__(self, target_path="/", limit=100, sudo=False, min_size=0, exclude=None, min_age_days=30, scan_rate=None, delete_rate=None):
+        super().__init__(
+            target_path, limit=limit, sudo=sudo, min_size=min_size, exclude=exclude,
+            scan_rate=scan_rate, delete_rate=delete_rate
+        )
+        self.min_age_days = min_age_days
+        self.select_days = max(min_age_days, 180)
+        self.buckets = None
+        self.stale_dirs = []
+
+    def legend_text(self):
+        lines = [
+            f"Columns: Size | Reclaimable | Category | Days since last use, for files unused for {self.min_age_days}+ days",
+            f"[bold]o[/] selects files unused for {self.select_days}+ days, [bold]t[/] changes that age.",
+        ]
+        if self.buckets:
+            bounds = [0, *AGE_BUCKETS]
+            names = [f"{low}-{high}d" for low, high in zip(bounds, AGE_BUCKETS)] + [f"{AGE_BUCKETS[-1]}d+"]
+            lines.append("Scanned bytes by age: " + " | ".join(f"{name}: [bold]{decimal(size)}[/]" for name, size in zip(names, self.buckets)))
+        if self.stale_dirs:
+            lines.append("Most stale data: " + ", ".join(f"{path} ({decimal(ages[-1])})" for path, ages in self.stale_dirs[:3]))
+        return "\n".join(lines)
+
+    def row_label(self, size_bytes, path, reclaim, age_days):
+        return file_label(size_bytes, path, reclaim, self.classifier, age_days)
+
+    def run_scan(self, progress, cancel, groups=None, refresh=False):
+        top, self.buckets, self.stale_dirs = scan_stale(
+            self.target_path, min_age_days=self.min_age_days, limit=self.limit, sudo=self.sudo,
+            min_size=self.min_size, progress=progress, cancel=cancel, exclude=self.exclude, max_rate=self.scan_rate
+        )
+        self.call_from_thread(self.query_one("#legend", Static).update, self.legend_text())
+        return top
+
+    def action_select_older(self) -> None:
+        file_list = self.query_one("#file-list", SelectionList)
+        count = 0
+        for row in file_list.options:
+            if row.entry[3] >= self.select_days:
+                file_list.select(row)
+                count += 1
+        self.query_one("#status", Label).update(f"Selected {count} files unused for {self.select_days}+ days.")
+
+    def action_cycle_threshold(self) -> None:
+        choices = [days for days in self.THRESHOLDS if days >= self.min_age_days] or [self.min_age_days]
+        later = [days for days in choices if days > self.select_days]
+        self.select_days = later[0] if later else choices[0]
+        self.query_one("#legend", Static).update(self.legend_text())
+
+    def refill_from_index(self, deleted):
+        # Stale scans keep no index, so there is nothing to refill from
+        pass
+
+
+class DiskTreeApp(App):
+    """Navigable du-style view of recursive directory sizes."""
+
+    CSS = LargeFilesApp.CSS
+
+    BINDINGS = [
+        ("q", "quit", "Quit"),
+        ("m", "toggle_mark", "Mark"),
+        ("d", "delete_marked", "Delete Marked"),
+        ("r", "refresh", "Refresh"),
+        ("c", "cancel_scan", "Stop Scan")
+    ]
+
+    def __init__(self, target_path="/", sudo=False, exclude=None, scan_rate=None, delete_rate=None):
+        super().__init__()
+        self.target_path = target_path
+        self.sudo = sudo
+        self.exclude = exclude
+        self.scan_rate = scan_rate
+        self.delete_rate = delete_rate  # Bytes freed per second
+        self.marked = {}  # id(DirNode) -> TreeNode
+        self.populated = set()
+        self.deleting = set()  # Paths handed to the delete worker
+        self.scan_cancel = None
+        self.scanning = False
+        
+        # Session Stats
+        self.total_deleted_count = 0
+        self.total_reclaimed_space = 0
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        yield Static("Columns: Size | Reclaimable | Files\nDirectories sorted by size. [bold]Enter[/] expands, [bold]m[/] marks, [bold]d[/] deletes marked directories.", id="legend")
+        yield Container(
+            LoadingIndicator(id="loading"),
+            Tree(self.target_path, id="dir-tree", classes="hidden"),
+            id="list-container"
+        )
+        yield Label("", id="status")
+        yield Horizontal(
+            Button("Delete Marked", variant="error", id="btn-delete"),
+            Button("Quit", variant="primary", id="btn-quit"),
+            id="buttons"
+        )
+        yield Footer()
+
+    def on_mount(self) -> None:
+        self.scan_dirs()
+
+    @work(exclusive=True, thread=True)
+    def scan_dirs(self) -> None:
+        cancel = threading.Event()
+        self.scan_cancel = cancel
+        self.scanning = True
+        self.call_from_thread(self.query_one("#status", Label).update, f"Scanning {self.target_path}...")
+        self.call_from_thread(self.query_one("#loading").remove_class, "hidden")
+        self.call_from_thread(self.query_one("#dir-tree").add_class, "hidden")
+
+        pruned_dirs = 0
+
+        def on_progress(files_seen, bytes_seen, pruned):
+            nonlocal pruned_dirs
+            pruned_dirs = pruned
+            self.call_from_thread(
+                self.query_one("#status", Label).update,
+                f"Scanning {self.target_path}... {files_seen:,} files, {decimal(bytes_seen)} seen, {pruned:,} directories pruned (press c to stop)"
+            )
+
+        try:
+            root = scan_tree(
+                self.target_path, sudo=self.sudo, progress=on_progress, cancel=cancel, exclude=self.exclude,
+                max_rate=self.scan_rate
+            )
+            if self.scan_cancel is cancel:
+                self.scanning = False
+                self.call_from_thread(self.show_tree, root, cancel.is_set(), pruned_dirs)
+        except Exception as e:
+            self.scanning = False
+            self.call_from_thread(self.query_one("#status", Label).update, f"Error: {str(e)}")
+
+    def node_label(self, node):
+        text = Text()
+        text.append(f"{decimal(node.size):>10} ", style="bold white")
+        text.append(f"{decimal(node.reclaim):>10} ", style="dim white" if node.reclaim < node.size else "white")
+        text.append(f"{node.files:>9,} files  ", style="dim")
+        if id(node) in self.marked:
+            text.append("[DEL] ", style="bold red")
+        text.append(node.name if node.parent else node.path, style="bold")
+        return text
+
+    def populate(self, tree_node):
+        node = tree_node.data
+        self.populated.add(id(node))
+        for child in node.children:
+            tree_node.add(self.node_label(child), data=child, allow_expand=bool(child.children))
+        own_size = node.own_size
+        if own_size > 0:
+            tree_node.add_leaf(Text(f"{decimal(own_size):>10}  (files in this directory)", style="dim"))
+
+    def show_tree(self, root, cancelled=False, pruned=0):
+        self.marked = {}
+        self.populated = set()
+        self.query_one("#loading").add_class("hidden")
+        tree = self.query_one("#dir-tree", Tree)
+        tree.reset(self.node_label(root), data=root)
+        self.populate(tree.root)
+        tree.root.expand()
+        tree.remove_class("hidden")
+        tree.focus()
+        state = "Scan stopped" if cancelled else "Scan complete"
+        self.query_one("#status", Label).update(f"{state}: {decimal(root.size)} in {root.files:,} files, {decimal(root.reclaim)} reclaimable, {pruned:,} directories pruned.")
+
+    def on_tree_node_expanded(self, event: Tree.NodeExpanded) -> None:
+        node = event.node
+        if node.data is not None and id(node.data) not in self.populated:
+            self.populate(node)
+
+    def action_toggle_mark(self) -> None:
+        tree_node = self.query_one("#dir-tree", Tree).cursor_node
+        if tree_node is None or tree_node.data is None or tree_node.is_root:
+            return
+        key = id(tree_node.data)
+        if key in self.marked:
+            del self.marked[key]
+        else:
+            self.marked[key] = tree_node
+        tree_node.set_label(self.node_label(tree_node.data))
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        if event.button.id == "btn-quit":
+            self.action_quit()
+        elif event.button.id == "btn-delete":
+            self.action_delete_marked()
+
+    def action_delete_marked(self) -> None:
+        if not self.marked:
+            self.query_one("#status", Label).update("No directories marked.")
+            return
+
+        # Deleting a directory also deletes any marked directory inside it
+        nodes = []
+        for tree_node in self.marked.values():
+            ancestor = tree_node.data.parent
+            while ancestor is not None and id(ancestor) not in self.marked:
+                ancestor = ancestor.parent
+            if ancestor is None:
+                nodes.append(tree_node)
+
+        nodes = [tree_node for tree_node in nodes if tree_node.data.path not in self.deleting]
+        self.marked = {}
+        if not nodes:
+            return
+        self.deleting.update(tree_node.data.path for tree_node in nodes)
+        self.query_one("#status", Label).update(f"Deleting {len(nodes)} directories...")
+        self.delete_dirs(nodes)
+
+    @work(thread=True, group="delete")
+    def delete_dirs(self, nodes) -> None:
+        # One pass in a worker; whatever needs root goes to a single helper
+        results = {}
+
+        def on_result(path, ok, reclaim, error):
+            results[path] = (ok, reclaim)
+
+        delete_paths([tree_node.data.path for tree_node in nodes], sudo=self.sudo, recursive=True, on_result=on_result, max_rate=self.delete_rate)
+        self.call_from_thread(self.finish_deletion, nodes, results)
+
+    def finish_deletion(self, nodes, results):
+        count = 0
+        failed = 0
+        reclaimed_size = 0
+        apparent_size = 0
+
+        for tree_node in nodes:
+            node = tree_node.data
+            self.deleting.discard(node.path)
+            ok, reclaim = results.get(node.path, (False, 0))
+            if not ok:
+                failed += 1
+                continue
+
+            count += 1
+            reclaimed_size += reclaim
+            apparent_size += node.size
+            parent = tree_node.parent
+            node.detach()
+            tree_node.remove()
+            while parent is not None:
+                parent.set_label(self.node_label(parent.data))
+                parent = parent.parent
+
+        self.total_deleted_count += count
+        self.total_reclaimed_space += reclaimed_size
+
+        self.query_one("#status", Label).update(f"Deleted {count} directories. {failed} failed.")
+        self.push_screen(ResultScreen(count, reclaimed_size, failed, noun="Directories", apparent_size=apparent_size))
+
+    def action_cancel_scan(self) -> None:
+        if self.scanning and self.scan_cancel:
+            self.scan_cancel.set()
+            self.query_one("#status", Label).update("Stopping scan...")
+
+    def action_refresh(self) -> None:
+        if self.scan_cancel:
+            self.scan_cancel.set()
+        self.scan_dirs()
+
+    def action_quit(self) -> None:
+        if self.scan_cancel:
+            self.scan_cancel.set()
+        self.exit()
+
+
+class DuplicatesApp(App):
+    """Groups of identical files that can be deleted or turned into links."""
+
+    CSS = LargeFilesApp.CSS
+
+    BINDINGS = [
+        ("q", "quit", "Quit"),
+        ("a", "select_duplicates", "Select Extra Copies"),
+        ("d", "delete_selected", "Delete Selected"),
+        ("h", "hardlink_selected", "Hardlink Selected"),
+        ("l", "reflink_selected", "Reflink Selected"),
+        ("r", "refresh", "Refresh"),
+        ("c", "cancel_scan", "Stop Scan")
+    ]
+
+    def __init__(self, target_path="/", sudo=False, min_size=1024 * 1024, exclude=None, scan_rate=None, delete_rate=None):
+        super().__init__()
+        self.target_path = target_path
+        self.sudo = sudo
+        self.min_size = min_size
+        self.exclude = exclude
+        self.scan_rate = scan_rate
+        self.delete_rate = delete_rate  # Bytes freed per second
+        self.groups = []
+        self.done_paths = set()
+        self.processing = set()  # Paths handed to the worker
+        self.scan_cancel = None
+        self.scanning = False
+        
+        # Session Stats
+        self.total_deleted_count = 0
+        self.total_reclaimed_space = 0
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        yield Static("Each group lists identical files. [bold]a[/] selects all but the first copy; selected files can be deleted ([bold]d[/]) or replaced by a hardlink ([bold]h[/]) or reflink ([bold]l[/]) to an unselected copy.", id="legend")
+        yield Container(
+            LoadingIndicator(id="loading"),
+            SelectionList(id="file-list", classes="hidden"),
+            id="list-container"
+        )
+        yield Label("", id="status")
+        yield Horizontal(
+            Button("Delete Selected", variant="error", id="btn-delete"),
+            Button("Hardlink Selected", variant="warning", id="btn-hardlink"),
+            Button("Quit", variant="primary", id="btn-quit"),
+            id="buttons"
+        )
+        yield Footer()
+
+    def on_mount(self) -> None:
+        self.scan_duplicates()
+
+    @work(exclusive=True, thread=True)
+    def scan_duplicates(self) -> None:
+        cancel = threading.Event()
+        self.scan_cancel = cancel
+        self.scanning = True
+        self.call_from_thread(self.query_one("#status", Label).update, f"Looking for duplicates in {self.target_path}...")
+        self.call_from_thread(self.query_one("#loading").remove_class, "hidden")
+        self.call_from_thread(self.query_one("#file-list").add_class, "hidden")
+
+        def on_progress(stage, done, total):
+            if stage == "walk":
+                message = f"Scanning {self.target_path}... {done:,} files, {decimal(total)} seen"
+            elif stage == "partial":
+                message = f"Comparing first and last blocks of {done:,} same-size files..."
+            else:
+                message = f"Hashing {done:,} candidate files ({decimal(total)})..."
+            self.call_from_thread(self.query_one("#status", Label).update, message + " (press c to stop)")
+
+        try:
+            groups = scan_duplicates(
+                self.target_path, sudo=self.sudo, min_size=self.min_size,
+                progress=on_progress, cancel=cancel, exclude=self.exclude, max_rate=self.scan_rate
+            )
+            if self.scan_cancel is cancel:
+                self.scanning = False
+                self.call_from_thread(self.show_groups, groups, cancel.is_set())
+        except Exception as e:
+            self.scanning = False
+            self.call_from_thread(self.query_one("#status", Label).update, f"Error: {str(e)}")
+
+    def show_groups(self, groups, cancelled=False):
+        self.groups = groups
+        self.done_paths = set()
+        self.update_list()
+        wasted = sum(size * (len(paths) - 1) for size, paths in groups)
+        state = "Scan stopped" if cancelled else "Scan complete"
+        self.query_one("#status", Label).update(f"{state}: {len(groups)} duplicate groups, {decimal(wasted)} in extra copies.")
+
+    def update_list(self):
+        self.query_one("#loading").add_class("hidden")
+        file_list = self.query_one("#file-list", SelectionList)
+        selected = set(file_list.selected)
+        file_list.clear_options()
+        for i, (size, paths) in enumerate(self.groups):
+            paths = [path for path in paths if path not in self.done_paths]
+            if len(paths) < 2:
+                continue
+            header = Text(f"{decimal(size):>10} x {len(paths)} copies", style="bold cyan")
+            file_list.add_option(Selection(header, f"group:{i}", disabled=True))
+            for path in paths:
+                file_list.add_option(Selection(Text(f"    {path}"), path, path in selected))
+        file_list.remove_class("hidden")
+        file_list.focus()
+
+    def action_select_duplicates(self) -> None:
+        file_list = self.query_one("#file-list", SelectionList)
+        for _, paths in self.groups:
+            paths = [path for path in paths if path not in self.done_paths]
+            for path in paths[1:]:
+                file_list.select(path)
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        if event.button.id == "btn-quit":
+            self.action_quit()
+        elif event.button.id == "btn-delete":
+            self.action_delete_selected()
+        elif event.button.id == "btn-hardlink":
+            self.action_hardlink_selected()
+
+    def selected_with_keeper(self):
+        """Returns [(keep, duplicate, size)] for selected files; every group keeps one copy."""
+        selected = set(self.query_one("#file-list", SelectionList).selected)
+        skipped = 0
+        items = []
+        for size, paths in self.groups:
+            paths = [path for path in paths if path not in self.done_paths and path not in self.processing]
+            keepers = [path for path in paths if path not in selected]
+            chosen = [path for path in paths if path in selected]
+            if not chosen:
+                continue
+            if not keepers:
+                skipped += 1
+                continue
+            items.extend((keepers[0], path, size) for path in chosen)
+        return items, skipped
+
+    def process_selected(self, mode):
+        items, skipped = self.selected_with_keeper()
+        if not items:
+            message = "No files selected."
+            if skipped:
+                message = f"Leave at least one copy unselected in each group ({skipped} groups fully selected)."
+            self.query_one("#status", Label).update(message)
+            return
+
+        self.processing.update(duplicate for _, duplicate, _ in items)
+        self.query_one("#status", Label).update(f"Checking and processing {len(items)} files...")
+        self.apply_duplicates(items, mode, skipped)
+
+    @work(thread=True, group="delete")
+    def apply_duplicates(self, items, mode, skipped) -> None:
+        # Every file is compared with its keeper again right before it is
+        # touched; root-owned ones share one privileged helper.
+        results = []
+
+        def on_result(path, ok, reclaim, apparent, error):
+            results.append((path, ok, reclaim, apparent))
+
+        process_duplicates(items, mode, sudo=self.sudo, on_result=on_result, max_rate=self.delete_rate)
+        self.call_from_thread(self.finish_processing, mode, results, skipped)
+
+    def finish_processing(self, mode, results, skipped):
+        count = 0
+        failed = 0
+        reclaimed_size = 0
+        apparent_size = 0
+        for path, ok, reclaim, apparent in results:
+            self.processing.discard(path)
+            if not ok:
+                failed += 1
+                continue
+            count += 1
+            reclaimed_size += reclaim
+            apparent_size += apparent
+            self.done_paths.add(path)
+
+        self.total_deleted_count += count
+        self.total_reclaimed_space += reclaimed_size
+        self.update_list()
+
+        verb = {"delete": "Deleted", "hardlink": "Hardlinked", "reflink": "Reflinked"}[mode]
+        message = f"{verb} {count} files. {failed} failed or changed since the scan."
+        if skipped:
+            message += f" Skipped {skipped} fully selected groups."
+        self.query_one("#status", Label).update(message)
+        self.push_screen(ResultScreen(count, reclaimed_size, failed, apparent_size=apparent_size))
+
+    def action_delete_selected(self) -> None:
+        self.process_selected("delete")
+
+    def action_hardlink_selected(self) -> None:
+        self.process_selected("hardlink")
+
+    def action_reflink_selected(self) -> None:
+        self.process_selected("reflink")
+
+    def action_cancel_scan(self) -> None:
+        if self.scanning and self.scan_cancel:
+            self.scan_cancel.set()
+            self.query_one("#status", Label).update("Stopping scan...")
+
+    def action_refresh(self) -> None:
+        if self.scan_cancel:
+            self.scan_cancel.set()
+        self.scan_duplicates()
+
+    def action_quit(self) -> None:
+        if self.scan_cancel:
+            self.scan_cancel.set()
+        self.exit()
@@ -1,23 +1,35 @@
 import click
+import json
 import sh
 import sys
 import os
 import shutil
+import threading
 from rich.console import Console
 from rich.prompt import Confirm
 
 console = Console()
 
+# Names found in each $PATH directory, built once per run (see which())
+_tool_index = None
+_tool_paths = {}
+_tool_lock = threading.Lock()
+
 def run_command(command, args, sudo=False, shell=False, capture=False, cwd=None):
     """Runs a command, optionally with sudo, capturing output or running in foreground."""
+    path = which(command)
     if sudo and os.geteuid() != 0:
-        cmd_func = sh.sudo.bake(command)
-    else:
-        try:
-            cmd_func = getattr(sh, command)
-        except AttributeError:
-            console.print(f"[bold red]Error:[/bold red] Command '{command}' not found.")
+        sudo_path = which("sudo")
+        if sudo_path is None:
+            console.print("[bold red]Error:[/bold red] Command 'sudo' not found.")
             return None if capture else False
+        # Tools only root uses may live outside the user's PATH; sudo looks there
+        cmd_func = sh.Command(sudo_path).bake(path or command)
+    elif path is None:
+        console.print(f"[bold red]Error:[/bold red] Command '{command}' not found.")
+        return None if capture else False
+    else:
+        cmd_func = sh.Command(path)
 
     try:
         kwargs = {}
@@ -44,5 +56,143 @@ def confirm_action(message, force=False):
         return True
     return Confirm.ask(message, default=False)
 
+def parse_selection(text, count):
+    """Turns "1,3-5", "all" or "none" into sorted 0-based indexes below `count`."""
+    text = text.strip().lower()
+    if text in ("", "none"):
+        return []
+    if text == "all":
+        return list(range(count))
+    chosen = set()
+    for part in text.replace(" ", ",").split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        try:
+            first = int(first)
+            last = int(last) if last else first
+        except ValueError:
+            raise ValueError(f"not a number or range: {part!r}")
+        if not 1 <= first <= last <= count:
+            raise ValueError(f"out of range: {part!r}")
+        chosen.update(range(first - 1, last))
+    return sorted(chosen)
+
 def check_binary(binary_name):
-    return shutil.which(binary_name) is not None
\ No newline at end of file
+    return which(binary_name) is not None
+
+def _path_dirs():
+    dirs = []
+    for directory in os.environ.get("PATH", os.defpath).split(os.pathsep):
+        directory = os.path.abspath(directory or ".")
+        if directory not in dirs:
+            dirs.append(directory)
+    return dirs
+
+def _dir_stamps(dirs):
+    # A directory's mtime changes whenever a name in it is added or removed
+    stamps = {}
+    for directory in dirs:
+        try:
+            stamps[directory] = os.stat(directory).st_mtime_ns
+        except OSError:
+            stamps[directory] = None
+    return stamps
+
+def _tool_index_path():
+    return os.path.join(xdg_cache_dir(), "tools.json")
+
+def load_tool_index(persist=True):
+    """Returns {name: [dirs]} for every name in the $PATH directories, in PATH order.
+
+    Listing a directory is one readdir instead of a stat per directory for
+    every lookup. With `persist`, the index is saved to the cache directory
+    and reused while PATH and the mtimes of its directories are unchanged.
+    """
+    dirs = _path_dirs()
+    stamps = _dir_stamps(dirs)
+    if persist:
+        try:
+            with open(_tool_index_path()) as f:
+                saved = json.load(f)
+            if saved["stamps"] == stamps and list(saved["stamps"]) == dirs:
+                return saved["index"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    index = {}
+    for directory in dirs:
+        if stamps[directory] is None:
+            continue
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            continue
+        for name in names:
+            index.setdefault(name, []).append(directory)
+
+    if persist:
+        try:
+            os.makedirs(xdg_cache_dir(), exist_ok=True)
+            tmp = _tool_index_path() + f".{os.getpid()}"
+            with open(tmp, "w") as f:
+                json.dump({"stamps": stamps, "index": index}, f)
+            os.replace(tmp, _tool_index_path())
+        except OSError:
+            pass
+    return index
+
+def which(name):
+    """Like shutil.which, answered from the tool index and remembered for the run."""
+    global _tool_index
+    if os.sep in name:
+        return shutil.which(name)
+    with _tool_lock:
+        if name in _tool_paths:
+            return _tool_paths[name]
+        if _tool_index is None:
+            _tool_index = load_tool_index()
+        path = None
+        for directory in _tool_index.get(name, ()):
+            candidate = os.path.join(directory, name)
+            if os.access(candidate, os.X_OK) and not os.path.isdir(candidate):
+                path = candidate
+                break
+        _tool_paths[name] = path
+        return path
+
+def forget_tools():
+    """Drops the tool index, e.g. after installing or removing packages."""
+    global _tool_index
+    with _tool_lock:
+        _tool_index = None
+        _tool_paths.clear()
+
+def xdg_cache_home():
+    """Returns the user's cache directory, $XDG_CACHE_HOME or ~/.cache."""
+    return os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+
+def xdg_cache_dir():
+    """Returns archclean's cache directory, honouring $XDG_CACHE_HOME."""
+    return os.path.join(xdg_cache_home(), "archclean")
+
+def parse_size(text):
+    """Parses sizes like "500", "100K", "1.5M" or "2G" (powers of 1024) into bytes."""
+    text = str(text).strip().upper().removesuffix("B").removesuffix("I")
+    units = {"K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+    factor = 1
+    if text and text[-1] in units:
+        factor = units[text[-1]]
+        text = text[:-1]
+    try:
+        value = float(text)
+    except ValueError:
+        raise ValueError(f"invalid size: {text!r}")
+    if value < 0:
+        raise ValueError(f"invalid size: {text!r}")
+    return int(value * factor)
+
+def xdg_config_dir():
+    """Returns archclean's config directory, honouring $XDG_CONFIG_HOME."""
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    return os.path.join(base, "archclean")
@@ -4,76 +4,84 @@ from archclean import analyzer
 
 class TestAnalyzer(unittest.TestCase):
 
+    def setUp(self):
+        patcher = patch('archclean.analyzer.load_excludes', return_value=[".snapshots"])
+        self.mock_excludes = patcher.start()
+        self.addCleanup(patcher.stop)
+
     @patch('rich.prompt.Prompt.ask')
-    @patch('archclean.analyzer.check_binary')
+    @patch('archclean.analyzer.DiskTreeApp')
     @patch('archclean.analyzer.confirm_action')
     @patch('archclean.analyzer.run_command')
     @patch('archclean.analyzer.os.path.expanduser')
-    def test_analyze_home_success(self, mock_expanduser, mock_run, mock_confirm, mock_check_binary, mock_ask):
+    def test_analyze_home_tree(self, mock_expanduser, mock_run, mock_confirm, mock_app, mock_ask):
         # Setup
-        mock_ask.return_value = "2" # Choose ncdu
-        mock_check_binary.return_value = True # ncdu installed
+        mock_ask.return_value = "2" # Choose directory tree
         mock_confirm.return_value = False # Root? -> No (defaults to Home)
         mock_expanduser.return_value = "/home/testuser"
+        mock_app.return_value.total_deleted_count = 0
     
         # Execute
-        analyzer.analyze_disk_usage(force=False)
+        analyzer.analyze_disk_usage(force=False, delete_rate=50 * 1024**2)
     
         # Verify
-        mock_run.assert_called_with("ncdu", ["/home/testuser"], sudo=False)
+        mock_app.assert_called_with(
+            target_path="/home/testuser", sudo=False, exclude=[".snapshots"], scan_rate=None, delete_rate=50 * 1024**2
+        )
+        mock_app.return_value.run.assert_called_once()
+        assert not mock_run.called
 
     @patch('rich.prompt.Prompt.ask')
-    @patch('archclean.analyzer.check_binary')
+    @patch('archclean.analyzer.DiskTreeApp')
     @patch('archclean.analyzer.confirm_action')
     @patch('archclean.analyzer.run_command')
-    def test_analyze_root_success(self, mock_run, mock_confirm, mock_check_binary, mock_ask):
+    def test_analyze_root_tree(self, mock_run, mock_confirm, mock_app, mock_ask):
         # Setup
-        mock_ask.return_value = "2" # Choose ncdu
-        mock_check_binary.return_value = True # ncdu installed
+        mock_ask.return_value = "2" # Choose directory tree
         mock_confirm.return_value = True # Root? -> Yes
+        mock_app.return_value.total_deleted_count = 0
     
         # Execute
         analyzer.analyze_disk_usage(force=False)
     
-        # Verify
-        mock_run.assert_called_with("ncdu", ["/", "-x"], sudo=True)
+        # Verify sudo is refreshed before the TUI starts
+        mock_run.assert_called_with("sudo", ["-v"])
+        mock_app.assert_called_with(target_path="/", sudo=True, exclude=[".snapshots"], scan_rate=None, delete_rate=None)
 
-    @patch('rich.prompt.Prompt.ask')
-    @patch('archclean.analyzer.check_binary')
+    @patch('archclean.analyzer.LargeFilesApp')
     @patch('archclean.analyzer.confirm_action')
     @patch('archclean.analyzer.run_command')
-    def test_analyze_ncdu_missing_install_declined(self, mock_run, mock_confirm, mock_check_binary, mock_ask):
-        # Setup
-        mock_ask.return_value = "2" # Choose ncdu
-        mock_check_binary.return_value = False # ncdu missing
-        # Sequence: Root? -> No, Install? -> No
-        mock_confirm.side_effect = [False, False] 
+    @patch('archclean.analyzer.os.path.expanduser')
+    def test_analyze_force_uses_large_files(self, mock_expanduser, mock_run, mock_confirm, mock_app):
+        mock_confirm.return_value = False
+        mock_expanduser.return_value = "/home/testuser"
+        mock_app.return_value.total_deleted_count = 2
+        mock_app.return_value.total_reclaimed_space = 4096
     
-        # Execute
-        analyzer.analyze_disk_usage()
+        analyzer.analyze_disk_usage(
+            force=True, limit=5000, min_size=1024, exclude=("~/VMs",), scan_rate=20000, delete_rate=50 * 1024**2
+        )
     
-        # Verify
-        # Should check binary, then ask to install
-        mock_check_binary.assert_called_with("ncdu")
-        # Check second confirm call (Install)
-        mock_confirm.assert_any_call("Do you want to install ncdu? (sudo pacman -S ncdu)", force=False)
-        # Should NOT run pacman or ncdu
-        assert not mock_run.called
+        self.mock_excludes.assert_called_with(("~/VMs",))
+        mock_app.assert_called_with(
+            target_path="/home/testuser", limit=5000, sudo=False, min_size=1024,
+            exclude=[".snapshots"], all_mounts=False, scan_rate=20000, delete_rate=50 * 1024**2
+        )
 
     @patch('rich.prompt.Prompt.ask')
-    @patch('archclean.analyzer.check_binary')
+    @patch('archclean.analyzer.StaleFilesApp')
     @patch('archclean.analyzer.confirm_action')
     @patch('archclean.analyzer.run_command')
-    def test_analyze_ncdu_install_flow(self, mock_run, mock_confirm, mock_check_binary, mock_ask):
-        # Setup
-        mock_ask.return_value = "2" # Choose ncdu
-        # First check fails (not installed), second check passes (installed after command)
-        mock_check_binary.side_effect = [False, True, True]
-        # Sequence: Root? -> No, Install? -> Yes
-        mock_confirm.side_effect = [False, True]
-    
-        # Execute
-        analyzer.analyze_disk_usage()
-    
-        # Verify
-        mock_run.assert_any_call("pacman", ["-S", "ncdu"], sudo=True)
+    @patch('archclean.analyzer.os.path.expanduser')
+    def test_analyze_stale_files(self, mock_expanduser, mock_run, mock_confirm, mock_app, mock_ask):
+        mock_ask.return_value = "4"
+        mock_confirm.return_value = False
+        mock_expanduser.return_value = "/home/testuser"
+        mock_app.return_value.total_deleted_count = 0
+
+        analyzer.analyze_disk_usage(force=False, limit=50)
+
+        mock_app.assert_called_with(
+            target_path="/home/testuser", limit=50, sudo=False, min_size=0, exclude=[".snapshots"],
+            scan_rate=None, delete_rate=None
+        )
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from archclean import deleter
+
+class TestDeleter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_deletes_and_reports_each_path(self):
+        paths = []
+        for name in ("a", "b"):
+            path = os.path.join(self.root, name)
+            with open(path, "wb") as f:
+                f.write(b"x" * 4096)
+            paths.append(path)
+        missing = os.path.join(self.root, "missing")
+        results = []
+
+        deleted, failed = deleter.delete_paths(paths + [missing], on_result=lambda *r: results.append(r))
+
+        self.assertEqual(deleted, paths)
+        self.assertEqual(failed, [missing])
+        self.assertFalse(os.path.exists(paths[0]))
+        self.assertEqual([r[1] for r in results], [True, True, False])
+
+    @patch('archclean.deleter.RateLimit')
+    @patch('archclean.deleter.remove_path', return_value=4096)
+    def test_deletion_is_rate_limited_by_bytes(self, mock_remove, mock_limit):
+        deleter.delete_paths(["/tmp/a", "/tmp/b"], max_rate=1024**2)
+
+        mock_limit.assert_called_with(1024**2)
+        self.assertEqual(mock_limit.return_value.wait.call_count, 2)
+        mock_limit.return_value.wait.assert_called_with(4096)
+
+    @patch('archclean.deleter.subprocess.Popen')
+    @patch('archclean.deleter.remove_path', side_effect=PermissionError(13, "Permission denied"))
+    @patch('archclean.deleter.os.geteuid', return_value=1000)
+    def test_permission_errors_are_batched_into_one_helper(self, mock_euid, mock_remove, mock_popen):
+        proc = mock_popen.return_value
+        proc.stdout = iter(['["/root/a", true, 4096, null]\n', '["/root/b", false, 0, "Busy"]\n'])
+        proc.stderr.read.return_value = ""
+
+        deleted, failed = deleter.delete_paths(["/root/a", "/root/b", "/root/c"])
+
+        # One elevated process for all three, fed NUL-separated paths
+        mock_popen.assert_called_once()
+        self.assertEqual(mock_popen.call_args[0][0][0], "sudo")
+        proc.stdin.buffer.write.assert_called_with(b"/root/a\0/root/b\0/root/c")
+        self.assertEqual(deleted, ["/root/a"])
+        # Paths the helper never reported count as failures
+        self.assertEqual(failed, ["/root/b", "/root/c"])
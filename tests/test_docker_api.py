@@ -0,0 +1,162 @@
+import json
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler
+from unittest.mock import patch
+from urllib.parse import urlparse, parse_qs
+from archclean import docker_api
+from archclean.cleaners import languages
+
+DF = {
+    "LayersSize": 3000,
+    "Images": [
+        {"Id": "a", "RepoTags": ["app:latest"], "Size": 1000, "SharedSize": 0, "Containers": 1},
+        {"Id": "b", "RepoTags": ["<none>:<none>"], "Size": 700, "SharedSize": 200, "Containers": 0},
+        {"Id": "c", "RepoTags": ["old:1"], "Size": 500, "SharedSize": -1, "Containers": 0},
+    ],
+    "Containers": [
+        {"Id": "x", "State": "running", "SizeRw": 50},
+        {"Id": "y", "State": "exited", "SizeRw": 30},
+    ],
+    "Volumes": [
+        {"Name": "v1", "Labels": {"com.docker.volume.anonymous": ""}, "UsageData": {"Size": 400, "RefCount": 0}},
+        {"Name": "v2", "Labels": {"com.docker.volume.anonymous": ""}, "UsageData": {"Size": 100, "RefCount": 1}},
+        # Named volumes are left alone by /volumes/prune unless all=true
+        {"Name": "db", "Labels": None, "UsageData": {"Size": 900, "RefCount": 0}},
+    ],
+    "BuildCache": [
+        {"ID": "1", "Size": 80, "InUse": False, "Shared": False},
+        {"ID": "2", "Size": 20, "InUse": True, "Shared": False},
+    ],
+}
+FREED = {"/containers/prune": 30, "/images/prune": 500, "/build/prune": 80, "/volumes/prune": 400}
+
+
+class FakeDocker(BaseHTTPRequestHandler):
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.server.calls.append(("GET", self.path))
+        if urlparse(self.path).path == "/system/df":
+            self._reply(200, DF)
+        else:
+            self._reply(404, {"message": "page not found"})
+
+    def do_POST(self):
+        self.server.calls.append(("POST", self.path))
+        path = urlparse(self.path).path
+        if path in self.server.failing:
+            self._reply(500, {"message": "prune already running"})
+        elif path in FREED:
+            self._reply(200, {"SpaceReclaimed": FREED[path]})
+        else:
+            self._reply(404, {"message": "page not found"})
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class TestDockerApi(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.sock = os.path.join(self.tmp, "docker.sock")
+        self.server = Server(self.sock, FakeDocker)
+        self.server.calls = []
+        self.server.failing = set()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmp)
+
+    def queries(self):
+        return [(method, urlparse(path).path, parse_qs(urlparse(path).query)) for method, path in self.server.calls]
+
+    def test_summarize_df(self):
+        usage = {item.kind: item for item in docker_api.summarize_df(DF)}
+        self.assertEqual(usage["Images"], docker_api.DockerUsage("Images", 3, 3000, 500))
+        self.assertEqual(usage["Containers"].reclaimable, 30)
+        self.assertEqual(usage["Volumes"], docker_api.DockerUsage("Volumes", 3, 1400, 400))
+        self.assertEqual(usage["Build Cache"].reclaimable, 80)
+
+    def test_summarize_df_all_images(self):
+        usage = {item.kind: item for item in docker_api.summarize_df(DF, dangling_only=False)}
+        self.assertEqual(usage["Images"].reclaimable, 1000)
+
+    def test_system_df(self):
+        usage = docker_api.system_df(sock=self.sock)
+        self.assertEqual([item.kind for item in usage], list(docker_api.KINDS))
+        self.assertEqual(self.server.calls, [("GET", "/system/df")])
+
+    def test_prune_filters(self):
+        freed = docker_api.prune("Images", until="24h", sock=self.sock)
+        self.assertEqual(freed, 500)
+        docker_api.prune("Build Cache", dangling_only=False, sock=self.sock)
+        docker_api.prune("Volumes", until="24h", sock=self.sock)
+        images, cache, volumes = self.queries()
+        self.assertEqual(json.loads(images[2]["filters"][0]), {"until": ["24h"], "dangling": ["true"]})
+        self.assertEqual(cache[2], {"all": ["true"]})
+        # The volumes endpoint rejects "until"
+        self.assertEqual(volumes[2], {})
+
+    def test_error_reply(self):
+        self.server.failing.add("/images/prune")
+        with self.assertRaises(docker_api.DockerError) as cm:
+            docker_api.prune("Images", sock=self.sock)
+        self.assertIn("prune already running", str(cm.exception))
+
+    def test_missing_socket(self):
+        with self.assertRaises(OSError):
+            docker_api.request("GET", "/system/df", sock=os.path.join(self.tmp, "missing.sock"))
+
+    def test_socket_from_docker_host(self):
+        with patch.dict(os.environ, {"DOCKER_HOST": "unix:///run/user/1000/docker.sock"}):
+            self.assertEqual(docker_api.socket_path(), "/run/user/1000/docker.sock")
+        with patch.dict(os.environ, {"DOCKER_HOST": "tcp://10.0.0.1:2375"}):
+            self.assertEqual(docker_api.socket_path(), docker_api.DOCKER_SOCKET)
+
+    @patch('archclean.cleaners.languages.tracker')
+    @patch('archclean.cleaners.languages.run_command')
+    @patch('archclean.cleaners.languages.check_binary', return_value=False)
+    def test_clean_docker_cache_force(self, mock_check, mock_run, mock_tracker):
+        with patch('archclean.docker_api.socket_path', return_value=self.sock):
+            languages.clean_docker_cache(force=True)
+        mock_run.assert_not_called()
+        pruned = [path for method, path, _ in self.queries() if method == "POST"]
+        self.assertEqual(pruned, ["/containers/prune", "/images/prune", "/build/prune"])
+        freed = {call.args[1]: call.kwargs.get("freed") for call in mock_tracker.add.call_args_list}
+        self.assertEqual(freed["Docker (Containers)"], 30)
+        self.assertEqual(freed["Docker (Images)"], 500)
+        self.assertEqual(freed["Docker (Build Cache)"], 80)
+        # Volumes hold data and are never pruned unattended
+        self.assertIsNone(freed["Docker (Volumes)"])
+
+    @patch('archclean.cleaners.languages.tracker')
+    @patch('archclean.cleaners.languages.confirm_action', return_value=True)
+    @patch('archclean.cleaners.languages.check_binary', return_value=False)
+    def test_clean_docker_cache_failure(self, mock_check, mock_confirm, mock_tracker):
+        self.server.failing.add("/images/prune")
+        with patch('archclean.docker_api.socket_path', return_value=self.sock):
+            languages.clean_docker_cache()
+        statuses = {call.args[1]: call.args[2] for call in mock_tracker.add.call_args_list}
+        self.assertEqual(statuses["Docker (Images)"], "Failed")
+        self.assertEqual(statuses["Docker (Volumes)"], "Cleaned")
+
+if __name__ == '__main__':
+    unittest.main()
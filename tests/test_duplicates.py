@@ -0,0 +1,126 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from archclean import duplicates
+
+class TestDuplicates(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        os.makedirs(os.path.join(self.root, "a"))
+        big = os.urandom(200 * 1024)
+        # Same size and same head/tail as `big`, different middle
+        almost = big[:100 * 1024] + b"\0" + big[100 * 1024 + 1:]
+        self.files = {
+            "one": big, "a/two": big, "a/three": big,
+            "almost": almost,
+            "small1": b"hello", "a/small2": b"hello",
+            "unique": b"world!",
+        }
+        for name, data in self.files.items():
+            with open(os.path.join(self.root, name), "wb") as f:
+                f.write(data)
+        # A hardlink is not a duplicate of its own inode
+        os.link(os.path.join(self.root, "one"), os.path.join(self.root, "one-link"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def test_finds_groups_largest_waste_first(self):
+        groups = duplicates.find_duplicates(self.root, workers=4)
+
+        self.assertEqual(len(groups), 2)
+        size, paths = groups[0]
+        self.assertEqual(size, 200 * 1024)
+        self.assertEqual(len(paths), 3)
+        self.assertNotIn(self.path("almost"), paths)
+        self.assertEqual(groups[1], (5, sorted([self.path("small1"), self.path("a/small2")])))
+
+    def test_only_candidates_are_fully_hashed(self):
+        with patch('archclean.duplicates.full_hash', wraps=duplicates.full_hash) as mock_full:
+            duplicates.find_duplicates(self.root, workers=2)
+
+        hashed = {call.args[0] for call in mock_full.call_args_list}
+        # "almost" collides on size and partial hash, so it is hashed too;
+        # small files are settled by the partial round alone.
+        self.assertEqual(len(hashed), 4)
+        self.assertIn(self.path("almost"), hashed)
+
+    def test_changed_file_is_not_replaced(self):
+        groups = duplicates.find_duplicates(self.root, workers=2)
+        size, paths = groups[0]
+        keep, edited = paths[0], paths[1]
+        # Edited after the scan, same size
+        with open(edited, "r+b") as f:
+            f.write(b"edited")
+
+        done, failed = duplicates.process_duplicates([(keep, edited, size), (keep, paths[2], size)], "hardlink")
+
+        self.assertEqual((done, failed), ([paths[2]], [edited]))
+        self.assertNotEqual(os.stat(keep).st_ino, os.stat(edited).st_ino)
+        self.assertEqual(os.stat(keep).st_ino, os.stat(paths[2]).st_ino)
+
+    def test_process_reports_sizes(self):
+        results = []
+        duplicates.process_duplicates(
+            [(self.path("small1"), self.path("a/small2"), 5)], "delete",
+            on_result=lambda *result: results.append(result),
+        )
+        self.assertFalse(os.path.exists(self.path("a/small2")))
+        path, ok, reclaim, apparent, error = results[0]
+        self.assertEqual((path, ok, apparent, error), (self.path("a/small2"), True, 5, None))
+
+    def test_full_hash_rejects_changed_size(self):
+        with self.assertRaises(OSError):
+            duplicates.full_hash(self.path("small1"), 6)
+
+    def test_replace_with_hardlink(self):
+        duplicates.replace_with_link(self.path("a/two"), self.path("a/three"))
+
+        self.assertEqual(os.stat(self.path("a/two")).st_ino, os.stat(self.path("a/three")).st_ino)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.root, "a"))), ["small2", "three", "two"])
+
+    @patch('archclean.duplicates.fcntl.ioctl')
+    def test_reflink_keeps_owner_and_mode(self, mock_ioctl):
+        # Stand in for FICLONE, which tmpfs does not support
+        mock_ioctl.side_effect = lambda dst, request, src: os.write(dst, os.pread(src, 1 << 20, 0))
+        duplicate = self.path("a/three")
+        os.chmod(duplicate, 0o640)
+        try:
+            os.chown(duplicate, 1234, 1234)
+        except PermissionError:
+            self.skipTest("changing ownership needs root")
+
+        duplicates.replace_with_link(self.path("a/two"), duplicate, reflink=True)
+
+        st = os.stat(duplicate)
+        self.assertEqual((st.st_uid, st.st_gid, st.st_mode & 0o7777), (1234, 1234, 0o640))
+        self.assertNotEqual(st.st_ino, os.stat(self.path("a/two")).st_ino)
+        with open(duplicate, "rb") as f:
+            self.assertEqual(f.read(), self.files["a/three"])
+
+    @patch('archclean.duplicates._elevated_apply')
+    @patch('archclean.duplicates.os.geteuid', return_value=1000)
+    def test_sudo_only_escalates_denied_files(self, mock_euid, mock_elevated):
+        keep, two, three = self.path("one"), self.path("a/two"), self.path("a/three")
+        real_apply = duplicates.apply_duplicate
+
+        def apply(keep, duplicate, size, mode):
+            if duplicate == three:
+                raise PermissionError(13, "Permission denied", duplicate)
+            return real_apply(keep, duplicate, size, mode)
+
+        with patch('archclean.duplicates.apply_duplicate', side_effect=apply):
+            done, failed = duplicates.process_duplicates(
+                [(keep, two, 200 * 1024), (keep, three, 200 * 1024)], "hardlink", sudo=True
+            )
+
+        self.assertEqual(done, [two])
+        mock_elevated.assert_called_once()
+        self.assertEqual(mock_elevated.call_args[0][0], [(keep, three, 200 * 1024)])
+
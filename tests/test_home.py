@@ -1,30 +1,182 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, ANY
 from archclean.cleaners import home
 from pathlib import Path
+import tempfile
+from datetime import datetime
 
 class TestHome(unittest.TestCase):
 
     @patch('archclean.cleaners.home.shutil.rmtree')
     @patch('archclean.cleaners.home.tracker')
     @patch('archclean.cleaners.home.confirm_action')
+    @patch('archclean.cleaners.home.estimate_usage')
     @patch('archclean.cleaners.home.get_home_dir')
-    def test_clean_thumbnails(self, mock_home, mock_confirm, mock_tracker, mock_rmtree):
+    def test_clean_thumbnails(self, mock_home, mock_usage, mock_confirm, mock_tracker, mock_rmtree):
         # Setup mock home and thumbnail dir
         mock_path = MagicMock()
         mock_home.return_value = mock_path
         mock_thumb_dir = mock_path / ".cache" / "thumbnails"
         mock_thumb_dir.exists.return_value = True
         
-        # Simulate file iteration for size calc
-        mock_file = MagicMock()
-        mock_file.is_file.return_value = True
-        mock_file.stat.return_value.st_size = 1024 * 1024 * 5 # 5MB
-        mock_thumb_dir.rglob.return_value = [mock_file]
+        # 6MB apparent, 5MB of allocated blocks
+        mock_usage.return_value = (1024 * 1024 * 6, 1024 * 1024 * 5)
         
         mock_confirm.return_value = True
         
         home.clean_thumbnails()
         
         mock_rmtree.assert_called()
-        mock_tracker.add.assert_called_with("Home", "Thumbnails", "Cleaned", "Freed 5.00 MB")
+        mock_tracker.add.assert_called_with("Home", "Thumbnails", "Cleaned", "Freed 5.00 MB", freed=1024 * 1024 * 5, seconds=ANY)
+
+    @patch('archclean.cleaners.home.tracker')
+    @patch('archclean.cleaners.home.confirm_action')
+    @patch('archclean.cleaners.home.get_home_dir')
+    def test_empty_trash(self, mock_home, mock_confirm, mock_tracker):
+        with tempfile.TemporaryDirectory() as tmp:
+            mock_home.return_value = Path(tmp)
+            trash = Path(tmp) / ".local" / "share" / "Trash"
+            (trash / "files").mkdir(parents=True)
+            (trash / "info").mkdir()
+
+            # Only the empty skeleton directories: nothing to ask about
+            home.empty_trash()
+            mock_confirm.assert_not_called()
+            mock_tracker.add.assert_called_with("Home", "Trash", "Cleaned", "Already empty")
+
+            # A leftover size cache alone still means an empty Trash
+            (trash / "directorysizes").write_text("")
+            home.empty_trash(older_than_days=30)
+            mock_confirm.assert_not_called()
+            mock_tracker.add.assert_called_with("Home", "Trash", "Cleaned", "Already empty")
+
+            make_trash_item(trash, "old.iso", "2020-01-01T10:00:00", 8192)
+            mock_confirm.return_value = True
+            home.empty_trash()
+
+            # The prompt carries the size, and both halves of the item are gone
+            self.assertIn("kB", mock_confirm.call_args[0][0])
+            self.assertEqual(list((trash / "files").iterdir()), [])
+            self.assertEqual(list((trash / "info").iterdir()), [])
+            self.assertEqual(mock_tracker.add.call_args[0][:3], ("Home", "Trash", "Cleaned"))
+
+def make_trash_item(trash, name, deleted, size, directory=False):
+    target = trash / "files" / name
+    if directory:
+        target.mkdir()
+        (target / "data").write_bytes(b"x" * size)
+    else:
+        target.write_bytes(b"x" * size)
+    (trash / "info" / f"{name}.trashinfo").write_text(
+        f"[Trash Info]\nPath=/home/user/My%20Files/{name}\nDeletionDate={deleted}\n"
+    )
+
+class TestTrash(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.trash = Path(self.tmp.name)
+        (self.trash / "files").mkdir()
+        (self.trash / "info").mkdir()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parse_trashinfo(self):
+        original, deleted = home.parse_trashinfo("[Trash Info]\nPath=/home/u/a%20b.txt\nDeletionDate=2024-03-01T12:30:00\n")
+        self.assertEqual(original, "/home/u/a b.txt")
+        self.assertEqual(deleted, datetime(2024, 3, 1, 12, 30).timestamp())
+        self.assertEqual(home.parse_trashinfo("DeletionDate=yesterday"), (None, None))
+
+    def test_read_and_select_oldest_first(self):
+        make_trash_item(self.trash, "new", "2024-06-01T00:00:00", 4096)
+        make_trash_item(self.trash, "old", "2020-01-01T00:00:00", 8192, directory=True)
+        make_trash_item(self.trash, "mid", "2023-01-01T00:00:00", 4096)
+        # Data without an info file is still listed
+        (self.trash / "files" / "stray").write_bytes(b"x")
+
+        items = {item.name: item for item in home.read_trash(str(self.trash))}
+        self.assertEqual(set(items), {"new", "old", "mid", "stray"})
+        self.assertEqual(items["old"].original, "/home/user/My Files/old")
+        self.assertGreaterEqual(items["old"].size, 8192)
+        self.assertIsNone(items["stray"].original)
+
+        now = datetime(2024, 6, 2).timestamp()
+        older = home.select_trash(items.values(), older_than_days=365, now=now)
+        self.assertEqual([item.name for item in older], ["old", "mid"])
+        # The oldest item alone already meets the target
+        self.assertEqual([item.name for item in home.select_trash(items.values(), target=8000)], ["old"])
+
+    def test_purge_removes_files_and_info_together(self):
+        make_trash_item(self.trash, "a dir", "2020-01-01T00:00:00", 100, directory=True)
+        make_trash_item(self.trash, "keep", "2024-01-01T00:00:00", 100)
+        (self.trash / "directorysizes").write_text("4096 1577836800 a%20dir\n100 1704067200 other\n")
+
+        items = {item.name: item for item in home.read_trash(str(self.trash))}
+        purged, failed = home.purge_trash(str(self.trash), [items["a dir"]])
+
+        self.assertEqual((len(purged), failed), (1, []))
+        self.assertEqual(sorted(p.name for p in (self.trash / "files").iterdir()), ["keep"])
+        self.assertEqual(sorted(p.name for p in (self.trash / "info").iterdir()), ["keep.trashinfo"])
+        self.assertEqual((self.trash / "directorysizes").read_text(), "100 1704067200 other\n")
+
+class TestAppCaches(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = Path(self.tmp.name)
+        for name, size in [("mozilla", 8192), ("JetBrains", 65536), ("thumbnails", 4096), ("someapp", 4096)]:
+            (self.cache / name).mkdir()
+            (self.cache / name / "data").write_bytes(b"x" * size)
+        (self.cache / "empty").mkdir()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        home.forget_usage()
+
+    def test_read_ranks_and_names(self):
+        entries = home.read_app_caches(str(self.cache))
+        # Largest first; thumbnails have their own cleaner and empty dirs free nothing
+        self.assertEqual([entry.name for entry in entries], ["JetBrains", "mozilla", "someapp"])
+        self.assertEqual([entry.app for entry in entries], ["JetBrains IDEs", "Firefox", "someapp"])
+        self.assertGreaterEqual(entries[0].size, 65536)
+
+    def test_language_caches_are_left_out(self):
+        (self.cache / "pip").mkdir()
+        (self.cache / "pip" / "wheel").write_bytes(b"x" * 4096)
+        with patch('archclean.cleaners.languages.cache_dirs', return_value={"pip": [str(self.cache / "pip")]}):
+            entries = home.read_app_caches(str(self.cache))
+        self.assertNotIn("pip", [entry.name for entry in entries])
+
+    @patch('archclean.cleaners.home.tracker')
+    def test_force_only_clears_safe_caches(self, mock_tracker):
+        (self.cache / "mesa_shader_cache").mkdir()
+        (self.cache / "mesa_shader_cache" / "index").write_bytes(b"x" * 4096)
+        with patch('archclean.cleaners.home.xdg_cache_home', return_value=str(self.cache)):
+            home.clean_app_caches(force=True)
+
+        self.assertFalse((self.cache / "mesa_shader_cache").exists())
+        for name in ("mozilla", "JetBrains", "someapp"):
+            self.assertTrue((self.cache / name).exists())
+
+    def test_parse_selection(self):
+        self.assertEqual(home.parse_selection("1, 3-4", 5), [0, 2, 3])
+        self.assertEqual(home.parse_selection("all", 3), [0, 1, 2])
+        self.assertEqual(home.parse_selection("none", 3), [])
+        with self.assertRaises(ValueError):
+            home.parse_selection("0", 3)
+        with self.assertRaises(ValueError):
+            home.parse_selection("2-x", 3)
+
+    @patch('archclean.cleaners.home.tracker')
+    @patch('archclean.cleaners.home.Prompt.ask', return_value="2")
+    def test_clean_only_chosen(self, mock_ask, mock_tracker):
+        with patch('archclean.cleaners.home.xdg_cache_home', return_value=str(self.cache)):
+            home.clean_app_caches()
+
+        self.assertFalse((self.cache / "mozilla").exists())
+        self.assertTrue((self.cache / "JetBrains").exists())
+        self.assertTrue((self.cache / "someapp").exists())
+        category, action, status, info = mock_tracker.add.call_args[0]
+        self.assertEqual((category, action, status), ("Home", "Cache: Firefox", "Cleaned"))
+        self.assertIn("kB", info)
@@ -46,11 +46,12 @@ class TestLanguages(unittest.TestCase):
         mock_rmtree.assert_called_with(mock_bun_cache)
         mock_tracker.add.assert_called()
 
+    @patch('archclean.docker_api.socket_path', return_value="/nonexistent/docker.sock")
     @patch('archclean.cleaners.languages.tracker')
     @patch('archclean.cleaners.languages.check_binary')
     @patch('archclean.cleaners.languages.confirm_action')
     @patch('archclean.cleaners.languages.run_command')
-    def test_clean_docker_cache(self, mock_run, mock_confirm, mock_check, mock_tracker):
+    def test_clean_docker_cache(self, mock_run, mock_confirm, mock_check, mock_tracker, mock_socket):
         mock_check.return_value = True
         mock_confirm.return_value = True
         mock_run.return_value = True
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from archclean import mounts
+
+MOUNTINFO = """\
+22 1 259:2 / / rw,relatime shared:1 - ext4 /dev/nvme0n1p2 rw
+23 22 0:21 / /proc rw,nosuid shared:5 - proc proc rw
+24 22 259:3 / /home rw,relatime shared:2 - ext4 /dev/nvme0n1p3 rw
+25 22 8:1 / /mnt/data\\040disk rw,relatime shared:3 - xfs /dev/sda1 rw
+26 22 0:30 / /tmp rw shared:4 - tmpfs tmpfs rw
+27 22 7:0 / /snap/core/1 ro shared:6 - squashfs /dev/loop0 ro
+28 24 259:3 /u/shared /srv/shared rw,relatime shared:2 - ext4 /dev/nvme0n1p3 rw
+"""
+
+
+class TestMounts(unittest.TestCase):
+
+    def test_parse_mountinfo(self):
+        parsed = mounts.parse_mountinfo(MOUNTINFO)
+        self.assertEqual(len(parsed), 7)
+        self.assertEqual(parsed[3].mount_point, "/mnt/data disk")
+        self.assertEqual(parsed[3].fstype, "xfs")
+        self.assertEqual(parsed[3].source, "/dev/sda1")
+
+    def test_block_mounts_skip_pseudo_images_and_binds(self):
+        kept = mounts.block_mounts(mounts.parse_mountinfo(MOUNTINFO))
+        # /srv/shared is a bind mount of a directory inside /home
+        self.assertEqual([m.mount_point for m in kept], ["/", "/home", "/mnt/data disk"])
+
+    @patch('archclean.mounts.is_rotational', side_effect=lambda disk: disk == "sda")
+    @patch('archclean.mounts.disk_of', side_effect=lambda source: source[5:-1].rstrip("p"))
+    def test_device_groups_by_disk(self, mock_disk, mock_rot):
+        groups = mounts.device_groups("/", mounts.parse_mountinfo(MOUNTINFO))
+        self.assertEqual(groups, [
+            mounts.DeviceGroup("nvme0n1", False, ["/", "/home"]),
+            mounts.DeviceGroup("sda", True, ["/mnt/data disk"]),
+        ])
+
+        groups = mounts.device_groups("/home/u", mounts.parse_mountinfo(MOUNTINFO))
+        self.assertEqual(groups, [mounts.DeviceGroup("nvme0n1", False, ["/home/u"])])
+
+    @patch('archclean.mounts.is_rotational', return_value=False)
+    @patch('archclean.mounts.disk_of', side_effect=lambda source: source[5:-1].rstrip("p"))
+    def test_device_groups_skip_excluded_mounts(self, mock_disk, mock_rot):
+        # snapper mounts its snapshot subvolumes inside the trees they copy
+        snapshots = MOUNTINFO + (
+            "29 22 0:40 /@snapshots /.snapshots rw shared:7 - btrfs /dev/nvme0n1p2 rw\n"
+            "30 24 0:41 /@home-snapshots /home/.snapshots rw shared:8 - btrfs /dev/nvme0n1p3 rw\n"
+        )
+        groups = mounts.device_groups("/", mounts.parse_mountinfo(snapshots), exclude=[".snapshots"])
+        self.assertEqual([point for group in groups for point in group.mount_points], ["/", "/home", "/mnt/data disk"])
+        # The target itself is always scanned
+        groups = mounts.device_groups("/.snapshots", mounts.parse_mountinfo(snapshots), exclude=[".snapshots"])
+        self.assertEqual(groups[0].mount_points, ["/.snapshots"])
+
+    def test_disk_of_follows_device_mapper(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            # sysfs layout of LVM on LUKS on /dev/nvme0n1p3
+            devices = os.path.join(tmp, "devices", "nvme0n1")
+            os.makedirs(os.path.join(devices, "nvme0n1p3"))
+            open(os.path.join(devices, "nvme0n1p3", "partition"), "w").close()
+            block = os.path.join(tmp, "block")
+            os.makedirs(os.path.join(block, "dm-0", "slaves", "nvme0n1p3"))
+            os.makedirs(os.path.join(block, "dm-1", "slaves", "dm-0"))
+            os.makedirs(os.path.join(block, "md0", "slaves", "sda1"))
+            os.makedirs(os.path.join(block, "md0", "slaves", "sdb1"))
+            os.symlink(os.path.join(devices, "nvme0n1p3"), os.path.join(block, "nvme0n1p3"))
+
+            self.assertEqual(mounts.disk_of("/dev/nvme0n1p3", block), "nvme0n1")
+            self.assertEqual(mounts.disk_of("/dev/dm-1", block), "nvme0n1")
+            # RAID across two disks cannot be pinned to either
+            self.assertEqual(mounts.disk_of("/dev/md0", block), "md0")
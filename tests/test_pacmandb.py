@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+from archclean import pacmandb
+from archclean.pacmandb import LocalPackage, EXPLICIT, DEPENDENCY
+
+VIM_DESC = """%NAME%
+vim
+
+%VERSION%
+9.1.0-1
+
+%DESC%
+Vi Improved: 100%% compatible
+
+%SIZE%
+4194304
+
+%DEPENDS%
+glibc>=2.38
+libgcrypt
+vim-runtime=9.1.0-1
+
+%OPTDEPENDS%
+python: Python language support
+
+%PROVIDES%
+xxd=9.1.0
+"""
+
+
+def package(name, reason=DEPENDENCY, depends=(), optdepends=(), provides=(), size=100):
+    return LocalPackage(name, "1.0-1", reason, size, depends, optdepends, provides)
+
+
+def graph(*packages):
+    return {p.name: p for p in packages}
+
+
+class TestPacmanDb(unittest.TestCase):
+
+    def test_dependency_name(self):
+        self.assertEqual(pacmandb.dependency_name("glibc>=2.38"), "glibc")
+        self.assertEqual(pacmandb.dependency_name("sh"), "sh")
+        self.assertEqual(pacmandb.dependency_name("xxd=9.1.0"), "xxd")
+        self.assertEqual(pacmandb.dependency_name("python: Python language support"), "python")
+
+    def test_package_from_desc(self):
+        vim = pacmandb.package_from_desc(VIM_DESC)
+        self.assertEqual(vim, LocalPackage(
+            "vim", "9.1.0-1", EXPLICIT, 4194304, ("glibc", "libgcrypt", "vim-runtime"), ("python",), ("xxd",),
+        ))
+        self.assertEqual(pacmandb.package_from_desc("%NAME%\nlib\n\n%REASON%\n1\n").reason, DEPENDENCY)
+        self.assertIsNone(pacmandb.package_from_desc("%VERSION%\n1.0\n"))
+
+    def test_read_local_db(self):
+        with tempfile.TemporaryDirectory() as db:
+            os.mkdir(os.path.join(db, "vim-9.1.0-1"))
+            with open(os.path.join(db, "vim-9.1.0-1", "desc"), "w") as f:
+                f.write(VIM_DESC)
+            # A package being installed has no desc yet
+            os.mkdir(os.path.join(db, "half-1.0-1"))
+            with open(os.path.join(db, "ALPM_DB_VERSION"), "w") as f:
+                f.write("9\n")
+
+            packages = pacmandb.read_local_db(db)
+            self.assertEqual(list(packages), ["vim"])
+        self.assertEqual(pacmandb.read_local_db("/nonexistent"), {})
+
+    def test_orphans_are_transitive(self):
+        packages = graph(
+            package("app", EXPLICIT, depends=("lib",)),
+            package("lib"),
+            package("old"),
+            package("old-dep", depends=("older-dep",)),
+            package("older-dep"),
+        )
+        # pacman -Qtdq would only report old and old-dep on the first run
+        orphans = pacmandb.find_orphans(packages)
+        self.assertEqual([p.name for p in orphans], ["old", "old-dep", "older-dep"])
+
+    def test_orphan_cycles(self):
+        packages = graph(package("a", depends=("b",)), package("b", depends=("a",)), package("c", EXPLICIT))
+        self.assertEqual([p.name for p in pacmandb.find_orphans(packages)], ["a", "b"])
+
+    def test_provides(self):
+        packages = graph(
+            package("app", EXPLICIT, depends=("sh",)),
+            package("bash", provides=("sh",)),
+            package("java-runtime-common"),
+            package("jre-openjdk", provides=("java-runtime",)),
+        )
+        self.assertEqual([p.name for p in pacmandb.find_orphans(packages)], ["java-runtime-common", "jre-openjdk"])
+
+    def test_real_package_beats_provider(self):
+        packages = graph(package("app", EXPLICIT, depends=("sh",)), package("sh"), package("bash", provides=("sh",)))
+        self.assertEqual([p.name for p in pacmandb.find_orphans(packages)], ["bash"])
+
+    def test_optdepends(self):
+        packages = graph(package("vim", EXPLICIT, optdepends=("python",)), package("python"))
+        self.assertEqual(pacmandb.find_orphans(packages), [])
+        self.assertEqual([p.name for p in pacmandb.find_orphans(packages, keep_optional=False)], ["python"])
+
+    def test_missing_dependency(self):
+        packages = graph(package("app", EXPLICIT, depends=("gone",)))
+        self.assertEqual(pacmandb.find_orphans(packages), [])
+
+if __name__ == '__main__':
+    unittest.main()
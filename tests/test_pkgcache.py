@@ -0,0 +1,101 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from archclean import pkgcache
+from archclean.pkgcache import CachedPackage
+from archclean.pacmandb import LocalPackage
+
+
+def package(name, version, arch="x86_64", size=100):
+    return CachedPackage(name, version, arch, (f"/cache/{name}-{version}-{arch}.pkg.tar.zst",), size)
+
+
+class TestPkgCache(unittest.TestCase):
+
+    def test_parse_package_filename(self):
+        parse = pkgcache.parse_package_filename
+        self.assertEqual(parse("vim-9.1.0-1-x86_64.pkg.tar.zst"), ("vim", "9.1.0-1", "x86_64"))
+        self.assertEqual(parse("lib32-gcc-libs-14.1.1+r1-1-x86_64.pkg.tar.zst.sig"), ("lib32-gcc-libs", "14.1.1+r1-1", "x86_64"))
+        self.assertEqual(parse("python-2:1.0-3-any.pkg.tar.xz"), ("python", "2:1.0-3", "any"))
+        self.assertEqual(parse("old-1.0-1-i686.pkg.tar"), ("old", "1.0-1", "i686"))
+        self.assertIsNone(parse("download-abc"))
+        self.assertIsNone(parse("broken-1.0-x86_64.pkg.tar.zst"))
+        self.assertIsNone(parse("vim-9.1.0-1-x86_64.pkg.tar.zst.part"))
+
+    def test_vercmp(self):
+        # Expected results from pacman's own vercmp
+        cases = [
+            ("1.0", "1.0", 0), ("1.0", "1.1", -1), ("1.1", "1.0", 1),
+            ("1.0a", "1.0", -1), ("1.0alpha", "1.0beta", -1), ("1.0.a", "1.0.1", -1),
+            ("1.0", "1.0.1", -1), ("1.01", "1.1", 0), ("2.0", "2_0", 0),
+            ("1.0.1", "1.0+1", 0), ("1.0-1", "1.0-2", -1), ("1.0", "1.0-2", 0),
+            ("1:1.0", "2.0", 1), ("0:1.0", "1.0", 0), ("r1234.abc", "r999.abc", 1),
+            ("1.10", "1.9", 1), ("1.0rc1", "1.0", -1), ("1.0.0", "1.0", 1),
+        ]
+        for a, b, expected in cases:
+            with self.subTest(a=a, b=b):
+                self.assertEqual(pkgcache.vercmp(a, b), expected)
+                self.assertEqual(pkgcache.vercmp(b, a), -expected)
+
+    def test_scan_cache_merges_signatures_and_dirs(self):
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+            for directory, name in [(first, "vim-9.1.0-1-x86_64.pkg.tar.zst"),
+                                    (first, "vim-9.1.0-1-x86_64.pkg.tar.zst.sig"),
+                                    (second, "vim-9.1.0-1-x86_64.pkg.tar.zst"),
+                                    (second, "notes.txt")]:
+                with open(os.path.join(directory, name), "wb") as f:
+                    f.write(b"x" * 4096)
+            os.mkdir(os.path.join(first, "download-abc"))
+
+            packages = pkgcache.scan_cache([first, second, "/nonexistent"])
+            self.assertEqual(len(packages), 1)
+            self.assertEqual(len(packages[0].files), 3)
+            self.assertEqual(packages[0].size, 3 * 4096)
+
+    def test_select_removals_keeps_newest(self):
+        packages = [package("vim", v) for v in ["9.0.0-2", "9.1.0-1", "8.2.0-1", "1:7.0-1", "9.0.0-10"]]
+        removed = pkgcache.select_removals(packages, keep=2)
+        # The epoch makes 7.0 the newest
+        self.assertEqual(sorted(p.version for p in removed), ["8.2.0-1", "9.0.0-10", "9.0.0-2"])
+
+    def test_select_removals_groups_by_arch(self):
+        packages = [package("gcc", "14-1", "x86_64"), package("gcc", "13-1", "x86_64"), package("gcc", "13-1", "i686")]
+        removed = pkgcache.select_removals(packages, keep=1)
+        self.assertEqual([(p.version, p.arch) for p in removed], [("13-1", "x86_64")])
+
+    def test_select_removals_spares_installed_version(self):
+        packages = [package("vim", v) for v in ["9.1.0-1", "9.0.0-1", "8.0.0-1"]]
+        removed = pkgcache.select_removals(packages, keep=1, installed={"vim": "8.0.0-1"})
+        self.assertEqual([p.version for p in removed], ["9.0.0-1"])
+
+    def test_select_removals_uninstalled(self):
+        packages = [package("vim", "9.1.0-1"), package("gone", "2.0-1"), package("gone", "1.0-1")]
+        installed = {"vim": "9.1.0-1"}
+        removed = pkgcache.select_removals(packages, keep=3, installed=installed, keep_uninstalled=0)
+        self.assertEqual(sorted(p.version for p in removed), ["1.0-1", "2.0-1"])
+        # Without a package list every package would look uninstalled
+        self.assertEqual(pkgcache.select_removals(packages, keep=3, installed={}, keep_uninstalled=0), [])
+
+    @patch('archclean.pkgcache.read_local_db')
+    def test_installed_packages(self, mock_db):
+        mock_db.return_value = {"vim": LocalPackage("vim", "9.1.0-1", 0, 0, (), (), ())}
+        self.assertEqual(pkgcache.installed_packages(), {"vim": "9.1.0-1"})
+
+    def test_large_cache_is_fast(self):
+        pkgcache.vercmp.cache_clear()
+        packages = [
+            package(f"pkg{n}", f"{major}.{minor}.{n % 7}-{rel}")
+            for n in range(3000) for major, minor, rel in [(1, 2, 1), (1, 10, 1), (2, 0, 1), (2, 0, 2), (1, 9, 3),
+                                                          (3, 1, 1), (0, 9, 9), (2, 1, 1), (1, 1, 1), (2, 10, 1)]
+        ]
+        started = time.monotonic()
+        removed = pkgcache.select_removals(packages, keep=3)
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(len(removed), 3000 * 7)
+        kept = {p.version for p in packages if p.name == "pkg0"} - {p.version for p in removed if p.name == "pkg0"}
+        self.assertEqual(kept, {"3.1.0-1", "2.10.0-1", "2.1.0-1"})
+
+if __name__ == '__main__':
+    unittest.main()
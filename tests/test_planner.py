@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from archclean import planner
+
+class TestPlanner(unittest.TestCase):
+
+    def test_parse_human_size(self):
+        self.assertEqual(planner.parse_human_size("1.50 MiB"), 1536 * 1024)
+        self.assertEqual(planner.parse_human_size("2GB"), 2 * 1000**3)
+        self.assertEqual(planner.parse_human_size(" 0 B"), 0)
+        self.assertIsNone(planner.parse_human_size("lots"))
+
+    @patch('archclean.planner.check_binary', return_value=True)
+    @patch('archclean.pkgcache.installed_packages', return_value={"vim": "9.1.0-1"})
+    def test_plan_pacman_keeps_recent_versions(self, mock_installed, mock_check):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ["vim-9.1.0-1-x86_64.pkg.tar.zst", "vim-9.0.0-2-x86_64.pkg.tar.zst",
+                         "vim-8.2.0-1-x86_64.pkg.tar.zst", "vim-8.1.0-1-x86_64.pkg.tar.zst",
+                         "vim-8.1.0-1-x86_64.pkg.tar.zst.sig", "gone-1.0-1-any.pkg.tar.xz"]:
+                with open(os.path.join(tmp, name), "wb") as f:
+                    f.write(b"x" * 4096)
+            os.mkdir(os.path.join(tmp, "download-abc"))
+
+            with patch('archclean.planner.system.pacman_cache_dirs', return_value=[tmp]):
+                items = planner.plan_pacman()
+            cache = [item for item in items if item.action.startswith("Pacman Cache")][0]
+            # The fourth newest vim and its signature
+            self.assertEqual(cache.estimate, 2 * 4096)
+            self.assertTrue(any(item.action == "Broken Downloads" for item in items))
+
+    def test_detectors_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def first():
+            barrier.wait()
+            return [planner.PlanItem("System", "A", "a", 1, "")]
+
+        def second():
+            barrier.wait()
+            return [planner.PlanItem("Home", "B", "b", 2, "")]
+
+        # Each detector waits for the other, so this only finishes if they overlap
+        items = planner.build_plan([first, second])
+        self.assertEqual([item.action for item in items], ["A", "B"])
+
+    def test_failing_detector_is_reported(self):
+        def plan_broken():
+            raise RuntimeError("boom")
+
+        items = planner.build_plan([plan_broken])
+        self.assertEqual((items[0].category, items[0].action), ("Planner", "broken"))
+        self.assertIn("boom", items[0].note)
+
+    @patch('archclean.planner.estimate_usage', return_value=(0, 5000))
+    @patch('archclean.planner.prefetch_usage')
+    @patch('archclean.planner.check_binary')
+    def test_plan_languages_follows_binaries(self, mock_check, mock_prefetch, mock_usage):
+        mock_check.side_effect = lambda name: name in ("python3", "pip", "go")
+        items = planner.plan_languages()
+        self.assertEqual([item.action for item in items], ["Python (pip)", "Go"])
+        self.assertEqual(items[0].estimate, 5000)
+
+    @patch('archclean.docker_api.available', return_value=False)
+    @patch('archclean.planner.run_command')
+    def test_plan_never_runs_cleaning_commands(self, mock_run, mock_available):
+        mock_run.return_value = None
+        with patch('archclean.planner.DETECTORS', [planner.plan_languages, planner.plan_docker]), \
+             patch('builtins.print') as mock_print:
+            planner.plan(as_json=True)
+        for call in mock_run.call_args_list:
+            self.assertTrue(call.kwargs.get("capture"))
+        data = json.loads(mock_print.call_args[0][0])
+        self.assertIn("actions", data)
+
+    @patch('archclean.planner.load_excludes', return_value=[])
+    @patch('archclean.planner.load_workspaces', return_value=["/src"])
+    @patch('archclean.planner.projects.find_artifacts')
+    def test_projects_count_only_with_flag(self, mock_find, mock_roots, mock_excludes):
+        mock_find.return_value = [
+            planner.projects.Artifact("/src/app/node_modules", "/src/app", "Node", 5000, 0),
+            planner.projects.Artifact("/src/app/.venv", "/src/app", "Python", 7000, 0),
+        ]
+
+        items = planner.build_plan([planner.plan_projects])
+        self.assertIsNone(items[0].estimate)
+        self.assertIn("--with-projects", items[0].note)
+        mock_find.assert_not_called()
+
+        # Old virtualenvs are kept even then
+        items = planner.build_plan([planner.plan_projects], with_projects=True)
+        self.assertEqual(items[0].estimate, 5000)
+
+if __name__ == '__main__':
+    unittest.main()
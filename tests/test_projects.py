@@ -0,0 +1,87 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from archclean.cleaners import projects
+
+DAY = 86400
+
+def make_file(path, size=4096, mtime=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+class TestProjects(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        now = time.time()
+        # An old Rust project, a fresh Node project and a Python one
+        make_file(os.path.join(self.root, "rusty", "Cargo.toml"), 10)
+        make_file(os.path.join(self.root, "rusty", "target", "debug", "app"), 8 * 4096, now - 90 * DAY)
+        make_file(os.path.join(self.root, "web", "package.json"), 10)
+        make_file(os.path.join(self.root, "web", "node_modules", "left-pad", "index.js"), 2 * 4096, now - DAY)
+        make_file(os.path.join(self.root, "web", "node_modules", "x", "node_modules", "y", "i.js"), 4096, now - DAY)
+        make_file(os.path.join(self.root, "py", "pyproject.toml"), 10)
+        make_file(os.path.join(self.root, "py", "pkg", "__pycache__", "mod.pyc"), 4096, now - 40 * DAY)
+        make_file(os.path.join(self.root, "py", ".venv", "bin", "python"), 4096, now - 60 * DAY)
+        # Not a project: a "target" directory without a Cargo.toml next to it is data
+        make_file(os.path.join(self.root, "notes", "target", "plan.txt"), 4096)
+        make_file(os.path.join(self.root, "web", ".git", "node_modules", "x"), 4096)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_find_artifacts(self):
+        artifacts = projects.find_artifacts([self.root])
+        found = {os.path.relpath(a.path, self.root): a for a in artifacts}
+        self.assertEqual(set(found), {"rusty/target", "web/node_modules", "py/pkg/__pycache__", "py/.venv"})
+        # Largest first; the nested node_modules is part of its parent, not a second entry
+        self.assertEqual(os.path.relpath(artifacts[0].path, self.root), "rusty/target")
+        self.assertEqual(found["web/node_modules"].kind, "Node")
+        self.assertGreaterEqual(found["web/node_modules"].size, 3 * 4096)
+        self.assertGreater(projects.idle_days(found["rusty/target"]), 89)
+
+    def test_reads_count_as_use(self):
+        now = time.time()
+        app = os.path.join(self.root, "rusty", "target", "debug", "app")
+        # Read yesterday, last written 90 days ago
+        os.utime(app, (now - DAY, now - 90 * DAY))
+        found = {os.path.relpath(a.path, self.root): a for a in projects.find_artifacts([self.root])}
+        self.assertLess(projects.idle_days(found["rusty/target"]), 2)
+
+    def test_artifacts_are_not_entered(self):
+        with patch.object(projects.ArtifactWalker, '_scandir', autospec=True, side_effect=projects.ArtifactWalker._scandir) as mock_scandir:
+            projects.ArtifactWalker([self.root]).scan()
+        listed = {os.path.relpath(call.args[1], self.root) for call in mock_scandir.call_args_list}
+        self.assertNotIn("rusty/target", listed)
+        self.assertNotIn("web/node_modules", listed)
+        self.assertNotIn("web/.git", listed)
+
+    @patch('archclean.cleaners.projects.tracker')
+    def test_force_deletes_only_old_artifacts(self, mock_tracker):
+        projects.clean_project_artifacts(force=True, roots=[self.root], stale_days=30)
+
+        self.assertFalse(os.path.exists(os.path.join(self.root, "rusty", "target")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "py", "pkg", "__pycache__")))
+        self.assertTrue(os.path.exists(os.path.join(self.root, "web", "node_modules")))
+        # Old, but an environment
+        self.assertTrue(os.path.exists(os.path.join(self.root, "py", ".venv")))
+        actions = {call.args[1]: call.kwargs["freed"] for call in mock_tracker.add.call_args_list}
+        self.assertEqual(set(actions), {"Rust artifacts", "Python artifacts"})
+        self.assertGreaterEqual(actions["Rust artifacts"], 8 * 4096)
+
+    @patch('archclean.cleaners.projects.tracker')
+    @patch('archclean.cleaners.projects.Prompt.ask', return_value="2")
+    def test_choose_by_number(self, mock_ask, mock_tracker):
+        projects.clean_project_artifacts(roots=[self.root], stale_days=30)
+        # Second largest is node_modules, kept by "old" but picked here
+        self.assertFalse(os.path.exists(os.path.join(self.root, "web", "node_modules")))
+        self.assertTrue(os.path.exists(os.path.join(self.root, "rusty", "target")))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from archclean import prune
+from archclean.prune import Budget, PruneEntry
+
+DAY = 86400
+
+def make_file(path, size, used):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    os.utime(path, (used, used))
+
+class TestSelectVictims(unittest.TestCase):
+
+    def setUp(self):
+        now = 100 * DAY
+        self.now = now
+        self.entries = [
+            PruneEntry("hot", now - DAY, 400),
+            PruneEntry("cold", now - 60 * DAY, 100),
+            PruneEntry("warm", now - 10 * DAY, 300),
+            PruneEntry("cool", now - 20 * DAY, 200),
+        ]
+
+    def test_size_budget_evicts_least_recently_used(self):
+        victims = prune.select_victims(self.entries, Budget(700, None), now=self.now)
+        self.assertEqual([entry.path for entry in victims], ["cold", "cool"])
+
+    def test_age_budget(self):
+        victims = prune.select_victims(self.entries, Budget(None, 15), now=self.now)
+        self.assertEqual([entry.path for entry in victims], ["cold", "cool"])
+
+    def test_both_budgets(self):
+        # Age alone evicts "cold"; the size budget then takes "cool" and "warm" too
+        victims = prune.select_victims(self.entries, Budget(450, 30), now=self.now)
+        self.assertEqual([entry.path for entry in victims], ["cold", "cool", "warm"])
+
+    def test_within_budget(self):
+        self.assertEqual(prune.select_victims(self.entries, Budget(10**6, 365), now=self.now), [])
+
+class TestIndexCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cargo_units(self):
+        registry = os.path.join(self.root, "registry")
+        make_file(os.path.join(registry, "cache", "index.crates.io-1", "serde-1.0.0.crate"), 4096, 10 * DAY)
+        make_file(os.path.join(registry, "src", "index.crates.io-1", "serde-1.0.0", "src", "lib.rs"), 4096, 20 * DAY)
+        make_file(os.path.join(registry, "src", "index.crates.io-1", "serde-1.0.0", "Cargo.toml"), 100, 30 * DAY)
+        make_file(os.path.join(registry, "index", "index.crates.io-1", "config.json"), 100, DAY)
+
+        entries = {os.path.relpath(entry.path, registry): entry for entry in prune.index_cache("cargo", [registry])}
+        # The index is never a unit; an extracted crate is dated by its newest file
+        self.assertEqual(set(entries), {"cache/index.crates.io-1/serde-1.0.0.crate", "src/index.crates.io-1/serde-1.0.0"})
+        self.assertEqual(entries["src/index.crates.io-1/serde-1.0.0"].last_used, 30 * DAY)
+
+    def test_go_units_and_read_only_removal(self):
+        mod = os.path.join(self.root, "mod")
+        module = os.path.join(mod, "github.com", "foo", "bar@v1.2.3")
+        make_file(os.path.join(module, "go.mod"), 100, DAY)
+        make_file(os.path.join(mod, "cache", "download", "github.com", "foo", "bar", "@v", "v1.2.3.zip"), 100, DAY)
+        # Go leaves extracted modules read-only
+        for directory, _, files in os.walk(module):
+            for name in files:
+                os.chmod(os.path.join(directory, name), 0o444)
+            os.chmod(directory, 0o555)
+
+        entries = prune.index_cache("go", [mod])
+        self.assertEqual(
+            sorted(os.path.relpath(entry.path, mod) for entry in entries),
+            ["cache/download/github.com/foo/bar/@v/v1.2.3.zip", "github.com/foo/bar@v1.2.3"],
+        )
+        removed, failed = prune.remove_entries(entries)
+        self.assertEqual((len(removed), failed), (2, []))
+        self.assertFalse(os.path.exists(module))
+
+class TestPruneCache(unittest.TestCase):
+
+    @patch('archclean.cleaners.languages.tracker')
+    @patch('archclean.cleaners.languages.check_binary', return_value=True)
+    @patch('archclean.cleaners.languages.confirm_action', return_value=True)
+    @patch('archclean.cleaners.languages.run_command')
+    def test_pip_is_pruned_not_purged(self, mock_run, mock_confirm, mock_check, mock_tracker):
+        from archclean.cleaners import languages
+        with tempfile.TemporaryDirectory() as tmp:
+            make_file(os.path.join(tmp, "http-v2", "a", "old"), 8192, DAY)
+            make_file(os.path.join(tmp, "http-v2", "b", "new"), 8192, 50 * DAY)
+            with patch.dict(os.environ, {"PIP_CACHE_DIR": tmp}):
+                languages.clean_python_cache(budget=Budget(8192, None))
+
+            mock_run.assert_not_called()
+            self.assertFalse(os.path.exists(os.path.join(tmp, "http-v2", "a", "old")))
+            self.assertTrue(os.path.exists(os.path.join(tmp, "http-v2", "b", "new")))
+            self.assertEqual(mock_tracker.add.call_args[0][:3], ("Language", "Python (pip)", "Cleaned"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+import unittest.mock
+from archclean import rules
+
+
+class TestRules(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "rules.toml")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, text):
+        with open(self.path, "w") as f:
+            f.write(text)
+
+    def test_defaults(self):
+        classifier = rules.load_rules(self.path)
+        self.assertEqual(classifier.classify("/home/u/.cache/pip/x.whl"), ("Cache", "yellow"))
+        self.assertEqual(classifier.classify("/var/log/journal/a"), ("Cache", "yellow"))
+        self.assertEqual(classifier.classify("/home/u/video.mkv"), ("User", "green"))
+        self.assertEqual(classifier.classify("/usr/lib/libc.so"), ("System", "red"))
+        # Prefixes stop at a path component boundary
+        self.assertEqual(classifier.classify("/tmpfs/file"), ("System", "red"))
+
+    def test_user_rules_come_first(self):
+        self.write("""
+[[rule]]
+category = "VM-Image"
+color = "magenta"
+glob = "*.qcow2"
+
+[[rule]]
+category = "Build"
+color = "blue"
+regex = "/(target|node_modules)/"
+
+[[rule]]
+category = "Games"
+prefix = "/home/u/Games/"
+""")
+        classifier = rules.load_rules(self.path)
+        self.assertEqual(classifier.classify("/home/u/vms/win.qcow2"), ("VM-Image", "magenta"))
+        self.assertEqual(classifier.classify("/home/u/.cache/x/target/a.o"), ("Build", "blue"))
+        self.assertEqual(classifier.classify("/home/u/Games/big.pak"), ("Games", "white"))
+        # A glob without a slash only looks at the file name
+        self.assertEqual(classifier.classify("/home/u/x.qcow2.d/readme"), ("User", "green"))
+        self.assertEqual(classifier.width, len("VM-Image"))
+        self.assertEqual([entry[0] for entry in classifier.legend()], ["VM-Image", "Build", "Games", "Cache", "User", "System"])
+
+    def test_glob_with_slash_matches_whole_path(self):
+        classifier = rules.Classifier([{"category": "Steam", "glob": "/home/*/.local/share/Steam/**"}])
+        self.assertEqual(classifier.classify("/home/u/.local/share/Steam/a/b")[0], "Steam")
+        self.assertEqual(classifier.classify("/home/u/x/.local/share/Steam/a")[0], "System")
+
+    def test_broken_config_falls_back_to_defaults(self):
+        self.write('[[rule]]\ncategory = "Bad"\nregex = "("\n')
+        classifier = rules.load_rules(self.path)
+        self.assertEqual(classifier.rules, rules.Classifier(rules.DEFAULT_RULES).rules)
+
+    def test_rule_needs_exactly_one_matcher(self):
+        with self.assertRaises(ValueError):
+            rules.Classifier([{"category": "X", "prefix": "/a", "glob": "*.b"}])
+
+
+class TestPruner(unittest.TestCase):
+
+    def test_names_and_paths(self):
+        prune = rules.Pruner([".snapshots", "*.tmp", "/var/lib/docker/overlay2", "/srv/*/cache"])
+        self.assertTrue(prune("/home/.snapshots", ".snapshots"))
+        self.assertTrue(prune("/x/build.tmp", "build.tmp"))
+        self.assertTrue(prune("/var/lib/docker/overlay2", "overlay2"))
+        self.assertTrue(prune("/srv/web/cache", "cache"))
+        self.assertFalse(prune("/srv/web/cache2", "cache2"))
+        self.assertFalse(prune("/home/u/overlay2", "overlay2"))
+
+    def test_load_excludes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rules.toml")
+            with open(path, "w") as f:
+                f.write('exclude = ["node_modules"]\n')
+            excludes = rules.load_excludes(["~/VMs"], path=path)
+        self.assertEqual(excludes[:len(rules.DEFAULT_EXCLUDES)][0], ".snapshots")
+        self.assertEqual(excludes[-2:], ["node_modules", os.path.expanduser("~/VMs")])
+
+    def test_load_workspaces(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rules.toml")
+            with open(path, "w") as f:
+                f.write('workspaces = ["~/work", "/srv/src"]\n')
+            self.assertEqual(rules.load_workspaces(path=path), [os.path.expanduser("~/work"), "/srv/src"])
+            # Without the setting, only default roots that exist are used
+            home = os.path.join(tmp, "home")
+            os.makedirs(os.path.join(home, "src"))
+            with unittest.mock.patch.dict(os.environ, {"HOME": home}):
+                self.assertEqual(rules.load_workspaces(path=os.path.join(tmp, "missing.toml")), [os.path.join(home, "src")])
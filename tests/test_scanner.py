@@ -0,0 +1,307 @@
+import os
+import threading
+import unittest
+import tempfile
+from unittest.mock import patch, MagicMock
+from archclean import scanner
+from archclean.scan_index import ScanIndex
+
+class TestScanner(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        os.makedirs(os.path.join(self.root, "a", "b"))
+        sizes = {"small": 10, "a/medium": 500, "a/b/large": 5000, "a/b/tiny": 1}
+        for name, size in sizes.items():
+            with open(os.path.join(self.root, name), "wb") as f:
+                f.write(b"x" * size)
+        os.symlink(os.path.join(self.root, "a/b/large"), os.path.join(self.root, "link"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_keeps_only_top_n(self):
+        s = scanner.TopFilesScanner(self.root, limit=2, workers=4)
+        top = s.scan()
+
+        self.assertEqual([entry[:2] for entry in top], [
+            (5000, os.path.join(self.root, "a", "b", "large")),
+            (500, os.path.join(self.root, "a", "medium")),
+        ])
+        # Symlinks are not counted, like find -type f
+        self.assertEqual(s.files_seen, 4)
+        self.assertEqual(s.bytes_seen, 5511)
+
+    def test_min_size_filters_small_files(self):
+        s = scanner.TopFilesScanner(self.root, limit=10, min_size=500)
+        top = s.scan()
+
+        self.assertEqual([entry[0] for entry in top], [5000, 500])
+        # Smaller files are still counted, just not listed
+        self.assertEqual(s.files_seen, 4)
+
+    def test_unreadable_directory_is_skipped(self):
+        with patch('archclean.scanner.os.scandir', side_effect=PermissionError):
+            s = scanner.TopFilesScanner(self.root, limit=5)
+            self.assertEqual(s.scan(), [])
+            self.assertEqual(s.errors, 1)
+
+    def test_progress_snapshots(self):
+        snapshots = []
+        s = scanner.TopFilesScanner(self.root, limit=1)
+        top = s.scan(progress=lambda *snap: snapshots.append(snap), interval=0.01)
+
+        # The final snapshot always matches the returned result
+        self.assertEqual(snapshots[-1], (top, 4, 5511, 0))
+
+    def test_excluded_directories_are_not_walked(self):
+        s = scanner.TopFilesScanner(self.root, limit=10, exclude=["b"])
+        top = s.scan()
+
+        self.assertEqual([entry[0] for entry in top], [500, 10])
+        self.assertEqual(s.pruned, 1)
+
+    def test_bind_mounted_directory_is_walked_once(self):
+        a = os.path.join(self.root, "a")
+        a_st = os.stat(a)
+        s = scanner.TopFilesScanner(self.root, limit=10)
+
+        self.assertFalse(s._prune(a, "a", a_st))
+        # A second path to the same directory inode, as a bind mount gives
+        self.assertTrue(s._prune(os.path.join(self.root, "bind"), "bind", a_st))
+
+    def test_scan_waits_on_rate_limit_per_directory(self):
+        rate = MagicMock()
+        s = scanner.TopFilesScanner(self.root, limit=10, rate=rate)
+        s.scan()
+
+        # root: small, link, a; a: medium, b; b: large, tiny
+        self.assertEqual(sorted(c.args[0] for c in rate.wait.call_args_list), [2, 2, 3])
+
+    def test_cancelled_scan_stops_early(self):
+        cancel = threading.Event()
+        cancel.set()
+        top = scanner.scan_largest(self.root, limit=5, cancel=cancel)
+        self.assertEqual(top, [])
+
+    def test_scan_largest_mounts_merges_devices(self):
+        from archclean.mounts import DeviceGroup
+        with tempfile.TemporaryDirectory() as other:
+            with open(os.path.join(other, "disk2"), "wb") as f:
+                f.write(b"x" * 700)
+            groups = [
+                DeviceGroup("nvme0n1", False, [os.path.join(self.root, "a")]),
+                DeviceGroup("sda", True, [other]),
+            ]
+            snapshots = []
+            top = scanner.scan_largest_mounts(
+                self.root, limit=2, groups=groups, progress=lambda *snap: snapshots.append(snap), interval=0.01
+            )
+
+        # One ranking across both disks, with their counts added up
+        self.assertEqual([entry[0] for entry in top], [5000, 700])
+        self.assertEqual(snapshots[-1], (top, 4, 6201, 0))
+
+    def test_stale_scan_filters_by_age_and_buckets_bytes(self):
+        day = 86400
+        now = 1_000_000_000
+        ages = {"small": 400, "a/medium": 90, "a/b/large": 5, "a/b/tiny": 200}
+        for name, age in ages.items():
+            stamp = now - age * day
+            os.utime(os.path.join(self.root, name), (stamp, stamp))
+
+        s = scanner.StaleFilesScanner(self.root, min_age_days=30, limit=10, now=now * 10**9)
+        top = s.scan()
+
+        # The recently used large file is counted but not listed
+        self.assertEqual([(entry[0], entry[3]) for entry in top], [(500, 90), (10, 400), (1, 200)])
+        self.assertEqual(s.buckets, [5000, 500, 11])
+        self.assertEqual(s.dir_buckets[os.path.join(self.root, "a", "b")], [5000, 0, 1])
+        self.assertEqual(s.stalest_dirs(1), [(self.root, [0, 0, 10])])
+
+    def test_stale_scan_uses_latest_of_access_and_modification(self):
+        day = 86400
+        now = 1_000_000_000
+        path = os.path.join(self.root, "small")
+        # Modified long ago but read yesterday
+        os.utime(path, (now - day, now - 400 * day))
+
+        s = scanner.StaleFilesScanner(self.root, min_age_days=30, limit=10, now=now * 10**9)
+        self.assertNotIn(path, [entry[1] for entry in s.scan()])
+
+    @patch('archclean.scanner.subprocess.Popen')
+    @patch('archclean.scanner.os.geteuid', return_value=1000)
+    def test_scan_largest_sudo_uses_helper(self, mock_euid, mock_popen):
+        proc = mock_popen.return_value
+        proc.stdout = iter([
+            '{"files": 1, "bytes": 7, "top": [[7, "/root/x", 4096]]}\n',
+            '{"files": 2, "bytes": 9, "top": [[7, "/root/x", 4096], [2, "/root/y", 0]]}\n',
+        ])
+        proc.stderr.read.return_value = ""
+        proc.returncode = 0
+        progress = MagicMock()
+
+        top = scanner.scan_largest("/", limit=5, sudo=True, progress=progress)
+
+        self.assertEqual(top, [(7, "/root/x", 4096), (2, "/root/y", 0)])
+        self.assertEqual(progress.call_count, 2)
+        cmd = mock_popen.call_args[0][0]
+        self.assertEqual(cmd[0], "sudo")
+        self.assertEqual(cmd[2:7], ["-m", "archclean.scanner", "/", "--limit", "5"])
+        self.assertNotIn("--max-rate", " ".join(cmd))
+
+        proc.stdout = iter([])
+        scanner.scan_largest("/", limit=5, sudo=True, max_rate=5000)
+        self.assertIn("--max-rate=5000", mock_popen.call_args[0][0])
+
+    @patch('archclean.scanner.subprocess.Popen')
+    @patch('archclean.scanner.os.geteuid', return_value=1000)
+    def test_scan_stale_sudo_reads_summary(self, mock_euid, mock_popen):
+        proc = mock_popen.return_value
+        proc.stdout = iter([
+            '{"files": 1, "bytes": 7, "pruned": 0, "top": [[7, "/root/x", 4096, 400]]}\n',
+            '{"buckets": [0, 0, 7], "dirs": [["/root", [0, 0, 7]]]}\n',
+        ])
+        proc.stderr.read.return_value = ""
+        proc.returncode = 0
+
+        top, buckets, dirs = scanner.scan_stale("/", min_age_days=90, limit=5, sudo=True)
+
+        self.assertEqual(top, [(7, "/root/x", 4096, 400)])
+        self.assertEqual(buckets, [0, 0, 7])
+        self.assertEqual(dirs, [("/root", [0, 0, 7])])
+        self.assertIn("--stale=90", mock_popen.call_args[0][0])
+
+class TestIncrementalScan(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "tree")
+        os.makedirs(os.path.join(self.root, "keep"))
+        os.makedirs(os.path.join(self.root, "change"))
+        for name, size in {"keep/a": 300, "change/b": 200}.items():
+            with open(os.path.join(self.root, name), "wb") as f:
+                f.write(b"x" * size)
+        self.db = os.path.join(self.tmp.name, "index.sqlite3")
+        # Back-date the directories so they are outside the racy window
+        for d in ("", "keep", "change"):
+            os.utime(os.path.join(self.root, d), ns=(10**18, 10**18))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def scan(self):
+        with ScanIndex(self.root, db_path=self.db) as index:
+            s = scanner.TopFilesScanner(self.root, limit=10, index=index)
+            return s, s.scan()
+
+    def test_unchanged_directories_are_not_listed(self):
+        self.scan()
+
+        with open(os.path.join(self.root, "change", "c"), "wb") as f:
+            f.write(b"x" * 900)
+
+        real_scandir = os.scandir
+        listed = []
+        def tracking_scandir(path):
+            listed.append(path)
+            return real_scandir(path)
+
+        with patch('archclean.scanner.os.scandir', side_effect=tracking_scandir):
+            s, top = self.scan()
+
+        self.assertEqual(listed, [os.path.join(self.root, "change")])
+        self.assertEqual([entry[0] for entry in top], [900, 300, 200])
+        self.assertEqual(s.files_seen, 3)
+
+    def test_file_growing_in_place(self):
+        # limit=1 so the small file is below the floor when it is indexed
+        with ScanIndex(self.root, db_path=self.db) as index:
+            scanner.TopFilesScanner(self.root, limit=1, index=index).scan()
+
+        grown = os.path.join(self.root, "change", "b")
+        with open(grown, "ab") as f:
+            f.write(b"x" * 4800)
+        os.utime(os.path.join(self.root, "change"), ns=(10**18, 10**18))
+
+        with ScanIndex(self.root, db_path=self.db) as index:
+            s = scanner.TopFilesScanner(self.root, limit=1, index=index)
+            top = s.scan()
+            self.assertEqual([entry[:2] for entry in top], [(5000, grown)])
+            self.assertEqual(s.bytes_seen, 5300)
+            # The new size is written back to the index
+            self.assertEqual(index.top(1)[0][:2], (5000, grown))
+
+    def test_excluded_directory_is_walked_once_included_again(self):
+        vm = os.path.join(self.root, "vm")
+        os.makedirs(vm)
+        with open(os.path.join(vm, "big"), "wb") as f:
+            f.write(b"x" * 100000)
+        os.utime(vm, ns=(10**18, 10**18))
+        os.utime(self.root, ns=(10**18, 10**18))
+
+        with ScanIndex(self.root, db_path=self.db) as index:
+            scanner.TopFilesScanner(self.root, limit=10, index=index, exclude=["vm"]).scan()
+            # Excluded files are not served from the index either
+            self.assertNotIn(100000, [entry[0] for entry in index.top(10)])
+
+        # The root is unchanged and reused, but vm is still one of its children
+        s, top = self.scan()
+        self.assertEqual([entry[:2] for entry in top][0], (100000, os.path.join(vm, "big")))
+        self.assertEqual(s.files_seen, 3)
+
+    def test_refresh_lists_everything_and_updates_index(self):
+        self.scan()
+        grown = os.path.join(self.root, "keep", "new")
+        with open(grown, "wb") as f:
+            f.write(b"x" * 700)
+        # Same mtime as before, so a normal rescan would reuse the listing
+        os.utime(os.path.join(self.root, "keep"), ns=(10**18, 10**18))
+
+        real_scandir = os.scandir
+        listed = []
+        def tracking_scandir(path):
+            listed.append(path)
+            return real_scandir(path)
+
+        with patch('archclean.scanner.os.scandir', side_effect=tracking_scandir):
+            with ScanIndex(self.root, db_path=self.db) as index:
+                top = scanner.TopFilesScanner(self.root, limit=10, index=index, refresh=True).scan()
+                self.assertEqual([entry[:2] for entry in index.top(1)], [(700, grown)])
+
+        self.assertEqual(len(listed), 3)
+        self.assertEqual([entry[0] for entry in top], [700, 300, 200])
+
+    def test_forget_and_top(self):
+        self.scan()
+        with ScanIndex(self.root, db_path=self.db) as index:
+            index.forget([os.path.join(self.root, "keep", "a")])
+            self.assertEqual([entry[:2] for entry in index.top(10)], [(200, os.path.join(self.root, "change", "b"))])
+            self.assertEqual(index.top(10, min_size=300), [])
+            known, _ = index.load_dirs()
+        # The parent is relisted on the next scan
+        self.assertEqual(known[os.path.join(self.root, "keep")][1], -1)
+
+class TestDirTreeScanner(unittest.TestCase):
+
+    def test_rollup_and_detach(self):
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, "a", "b"))
+            os.makedirs(os.path.join(root, "c"))
+            sizes = {"top": 5, "a/one": 10, "a/b/two": 100, "c/three": 50}
+            for name, size in sizes.items():
+                with open(os.path.join(root, name), "wb") as f:
+                    f.write(b"x" * size)
+
+            tree = scanner.DirTreeScanner(root, workers=4).scan()
+
+            self.assertEqual((tree.size, tree.files), (165, 4))
+            self.assertEqual([c.name for c in tree.children], ["a", "c"])
+            a = tree.children[0]
+            self.assertEqual((a.size, a.own_size), (110, 10))
+            self.assertEqual(a.children[0].path, os.path.join(root, "a", "b"))
+
+            a.children[0].detach()
+            self.assertEqual((tree.size, tree.files), (65, 3))
+            self.assertEqual(a.children, [])
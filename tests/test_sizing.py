@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from archclean import sizing
+
+class TestSizing(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sparse_file_reclaims_allocated_blocks(self):
+        path = os.path.join(self.root, "sparse.img")
+        with open(path, "wb") as f:
+            f.truncate(64 * 1024 * 1024)
+
+        st = os.stat(path)
+        self.assertEqual(st.st_size, 64 * 1024 * 1024)
+        self.assertLess(sizing.reclaimable_size(st, path), 1024 * 1024)
+
+    def test_hardlinked_file_reclaims_nothing(self):
+        path = os.path.join(self.root, "a")
+        with open(path, "wb") as f:
+            f.write(b"x" * 8192)
+        os.link(path, os.path.join(self.root, "b"))
+
+        self.assertEqual(sizing.reclaimable_size(os.stat(path)), 0)
+
+    def test_tree_usage_counts_links_once(self):
+        os.makedirs(os.path.join(self.root, "tree"))
+        inside = os.path.join(self.root, "tree", "a")
+        with open(inside, "wb") as f:
+            f.write(b"x" * 8192)
+        os.link(inside, os.path.join(self.root, "tree", "b"))
+        allocated = sizing.allocated_size(os.stat(inside))
+
+        # Both links inside the tree: counted once and reclaimable
+        self.assertEqual(sizing.tree_usage(os.path.join(self.root, "tree")), (8192, allocated))
+
+        # A third link outside keeps the data alive
+        os.link(inside, os.path.join(self.root, "c"))
+        self.assertEqual(sizing.tree_usage(os.path.join(self.root, "tree")), (8192, 0))
+
+    @patch('archclean.sizing.shared_bytes', return_value=4096)
+    def test_reflinked_extents_are_not_reclaimable(self, mock_shared):
+        st = MagicMock(st_nlink=1, st_blocks=16, st_mode=0o100644)
+        self.assertEqual(sizing.reclaimable_size(st, "/some/file"), 8192 - 4096)
+
+    def test_parallel_tree_usage_matches_serial(self):
+        tree = os.path.join(self.root, "tree")
+        for sub in ("a", "b", "c/d"):
+            os.makedirs(os.path.join(tree, sub))
+            with open(os.path.join(tree, sub, "f"), "wb") as f:
+                f.write(b"x" * 5000)
+        with open(os.path.join(tree, "top"), "wb") as f:
+            f.write(b"x" * 100)
+        # A hardlink across two subtrees walked by different threads
+        os.link(os.path.join(tree, "a", "f"), os.path.join(tree, "b", "link"))
+
+        serial = sizing.tree_usage(tree)
+        self.assertEqual(serial[0], 3 * 5000 + 100)
+        self.assertEqual(sizing.tree_usage(tree, workers=4), serial)
+
+    def test_is_empty_stops_at_first_file(self):
+        os.makedirs(os.path.join(self.root, "files", "nested"))
+        self.assertTrue(sizing.is_empty(self.root))
+        self.assertTrue(sizing.is_empty(os.path.join(self.root, "missing")))
+
+        with open(os.path.join(self.root, "files", "nested", "x"), "wb") as f:
+            f.write(b"x")
+        self.assertFalse(sizing.is_empty(self.root))
+
+    def test_estimate_usage_is_cached_until_forgotten(self):
+        path = os.path.join(self.root, "f")
+        with open(path, "wb") as f:
+            f.write(b"x" * 4096)
+        sizing.forget_usage()
+
+        with patch('archclean.sizing.tree_usage', wraps=sizing.tree_usage) as mock_usage:
+            first = sizing.estimate_usage([self.root, os.path.join(self.root, "missing")])
+            self.assertEqual(first[0], 4096)
+            self.assertEqual(sizing.estimate_usage(self.root), first)
+            self.assertEqual(mock_usage.call_count, 1)
+
+            # Deleting a file inside invalidates the estimate of its parent
+            os.remove(path)
+            sizing.forget_usage(path)
+            self.assertEqual(sizing.estimate_usage(self.root), (0, 0))
+            self.assertEqual(mock_usage.call_count, 2)
+
+    def test_reclaim_measures_paths(self):
+        cache = os.path.join(self.root, "cache")
+        os.mkdir(cache)
+        with open(os.path.join(cache, "f"), "wb") as f:
+            f.write(b"x" * 8192)
+        sizing.forget_usage()
+
+        reclaim = sizing.Reclaim(cache)
+        os.remove(os.path.join(cache, "f"))
+        measured = reclaim.finish()
+        self.assertGreaterEqual(measured["freed"], 8192)
+        self.assertGreaterEqual(measured["seconds"], 0)
+
+    def test_reclaim_falls_back_to_free_space(self):
+        with patch('archclean.sizing.free_space', side_effect=[1000, 5000]):
+            measured = sizing.Reclaim(mount="/var/lib/docker").finish()
+        self.assertEqual(measured["freed"], 4000)
+        # Something else filling the disk meanwhile is not negative savings
+        with patch('archclean.sizing.free_space', side_effect=[5000, 1000]):
+            self.assertEqual(sizing.Reclaim(mount="/").finish()["freed"], 0)
+
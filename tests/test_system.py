@@ -1,6 +1,8 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, ANY
 from archclean.cleaners import system
+from archclean.pkgcache import CachedPackage
+from archclean.pacmandb import LocalPackage
 
 class TestSystem(unittest.TestCase):
 
@@ -47,6 +49,36 @@ class TestSystem(unittest.TestCase):
         mock_run.assert_any_call("pacman", ["-Scc"], sudo=True)
         mock_tracker.add.assert_called()
 
+    @patch('archclean.cleaners.system.tracker')
+    @patch('archclean.cleaners.system.confirm_action', return_value=True)
+    @patch('archclean.cleaners.system.delete_paths')
+    @patch('archclean.cleaners.system.plan_removals')
+    def test_prune_pacman_cache(self, mock_plan, mock_delete, mock_confirm, mock_tracker):
+        old = CachedPackage("vim", "9.0.0-1", "x86_64", ("/c/vim-9.0.0-1-x86_64.pkg.tar.zst", "/c/vim-9.0.0-1-x86_64.pkg.tar.zst.sig"), 8192)
+        gone = CachedPackage("gone", "1.0-1", "any", ("/c/gone-1.0-1-any.pkg.tar.xz",), 4096)
+        mock_plan.return_value = ([old, gone], 100000)
+
+        def delete(paths, sudo=False, on_result=None):
+            for path in paths:
+                on_result(path, True, 4096, None)
+            return list(paths), []
+
+        mock_delete.side_effect = delete
+        system.prune_pacman_cache(["/c"], keep=2, keep_uninstalled=0)
+
+        mock_plan.assert_called_once_with(["/c"], 2, 0)
+        # Everything goes in one privileged batch, signatures included
+        mock_delete.assert_called_once_with(list(old.files + gone.files), sudo=True, on_result=ANY)
+        mock_tracker.add.assert_called_with("System", "Pacman Cache (keep 2)", "Cleaned", "Removed 3 files", freed=3 * 4096, seconds=ANY)
+
+    @patch('archclean.cleaners.system.tracker')
+    @patch('archclean.cleaners.system.delete_paths')
+    @patch('archclean.cleaners.system.plan_removals', return_value=([], 0))
+    def test_prune_pacman_cache_nothing(self, mock_plan, mock_delete, mock_tracker):
+        system.prune_pacman_cache(["/c"], force=True)
+        mock_delete.assert_not_called()
+        mock_tracker.add.assert_called_with("System", "Pacman Cache (keep 3)", "Cleaned", "Nothing to remove")
+
     @patch('archclean.cleaners.system.run_command')
     @patch('archclean.cleaners.system.tracker')
     @patch('archclean.cleaners.system.confirm_action')
@@ -57,20 +89,24 @@ class TestSystem(unittest.TestCase):
         system.vacuum_journal()
         
         mock_run.assert_called_with("journalctl", ["--vacuum-time=2weeks"], sudo=True)
-        mock_tracker.add.assert_called_with("System", "Journal", "Cleaned", "Vacuumed to 2 weeks")
+        mock_tracker.add.assert_called_with("System", "Journal", "Cleaned", "Vacuumed to 2 weeks", freed=ANY, seconds=ANY)
 
     @patch('archclean.cleaners.system.run_command')
     @patch('archclean.cleaners.system.tracker')
     @patch('archclean.cleaners.system.confirm_action')
-    @patch('archclean.cleaners.system.sh.pacman')
-    def test_remove_orphans(self, mock_pacman, mock_confirm, mock_tracker, mock_run):
-        # Simulate output with color codes
-        mock_pacman.return_value = "\x1b[31mpackage1\x1b[0m\npackage2"
+    @patch('archclean.cleaners.system.pacmandb.read_local_db')
+    def test_remove_orphans(self, mock_db, mock_confirm, mock_tracker, mock_run):
+        mock_db.return_value = {
+            "app": LocalPackage("app", "1.0-1", 0, 10, ("lib",), (), ()),
+            "lib": LocalPackage("lib", "1.0-1", 1, 20, (), (), ()),
+            "package1": LocalPackage("package1", "2.0-1", 1, 30, ("package2",), (), ()),
+            "package2": LocalPackage("package2", "3.0-1", 1, 40, (), (), ()),
+        }
         mock_confirm.return_value = True
         mock_run.return_value = True
-        
+
         system.remove_orphans()
-        
-        # Check if stripping worked and proper command was called
+
+        # package2 is only needed by the orphan package1, so both go at once
         mock_run.assert_called_with("pacman", ["-Rns", "package1", "package2"], sudo=True)
-        mock_tracker.add.assert_called_with("System", "Orphans", "Cleaned", "Removed 2 packages")
\ No newline at end of file
+        mock_tracker.add.assert_called_with("System", "Orphans", "Cleaned", "Removed 2 packages", freed=ANY, seconds=ANY)
\ No newline at end of file
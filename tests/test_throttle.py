@@ -0,0 +1,65 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from archclean import throttle
+
+class TestRateLimit(unittest.TestCase):
+
+    def test_no_rate_never_waits(self):
+        limit = throttle.RateLimit(None)
+        with patch('archclean.throttle.time.sleep') as mock_sleep:
+            limit.wait(10**9)
+        mock_sleep.assert_not_called()
+
+    def test_burst_passes_then_waits(self):
+        with patch('archclean.throttle.time.monotonic', return_value=50.0), \
+             patch('archclean.throttle.time.sleep') as mock_sleep:
+            limit = throttle.RateLimit(100, burst=1.0)
+            # One second's worth goes through at once
+            limit.wait(100)
+            mock_sleep.assert_not_called()
+            # The next 50 have to wait half a second
+            limit.wait(50)
+            mock_sleep.assert_called_once_with(0.5)
+
+    def test_shared_between_threads(self):
+        limit = throttle.RateLimit(1000, burst=0)
+        start = time.monotonic()
+        threads = [threading.Thread(target=limit.wait, args=(50,)) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # 200 units at 1000/s, whichever thread asked first
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+    def test_cancel_stops_waiting(self):
+        cancel = threading.Event()
+        cancel.set()
+        limit = throttle.RateLimit(1, burst=0)
+        start = time.monotonic()
+        limit.wait(60, cancel)
+        self.assertLess(time.monotonic() - start, 1)
+
+class TestPriority(unittest.TestCase):
+
+    @patch('archclean.throttle.set_idle_io', return_value=True)
+    @patch('archclean.throttle.os.getpriority', return_value=0)
+    @patch('archclean.throttle.os.setpriority')
+    def test_lower_priority(self, mock_set, mock_get, mock_idle):
+        self.assertTrue(throttle.lower_priority())
+        mock_set.assert_called_with(throttle.os.PRIO_PROCESS, 0, 19)
+        mock_idle.assert_called_once()
+
+    @patch('archclean.throttle.platform.machine', return_value="x86_64")
+    @patch('archclean.throttle.ctypes.CDLL')
+    def test_set_idle_io_uses_ioprio_set(self, mock_cdll, mock_machine):
+        mock_cdll.return_value.syscall.return_value = 0
+        self.assertTrue(throttle.set_idle_io())
+        # ioprio_set(IOPRIO_WHO_PROCESS, 0, IOPRIO_PRIO_VALUE(IOPRIO_CLASS_IDLE, 0))
+        mock_cdll.return_value.syscall.assert_called_with(251, 1, 0, 3 << 13)
+
+    @patch('archclean.throttle.platform.machine', return_value="sparc64")
+    def test_set_idle_io_unknown_arch(self, mock_machine):
+        self.assertFalse(throttle.set_idle_io())
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from archclean import tombstone
+
+class TestTombstone(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        env = patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(self.tmp.name, "cache")})
+        env.start()
+        self.addCleanup(env.stop)
+        self.cache = os.path.join(self.tmp.name, "data", "cache")
+        os.makedirs(os.path.join(self.cache, "sub"))
+        with open(os.path.join(self.cache, "sub", "file"), "w") as f:
+            f.write("x" * 100)
+
+    def test_bury_moves_and_records(self):
+        buried = tombstone.bury(self.cache)
+        self.assertFalse(os.path.exists(self.cache))
+        self.assertTrue(os.path.basename(buried).startswith(tombstone.PREFIX))
+        self.assertTrue(os.path.exists(os.path.join(buried, "sub", "file")))
+        self.assertEqual(tombstone.pending(), [buried])
+
+    def test_reap_deletes_and_clears(self):
+        buried = tombstone.bury(self.cache)
+        self.assertEqual(tombstone.reap(), 1)
+        self.assertFalse(os.path.exists(buried))
+        self.assertEqual(tombstone.pending(), [])
+
+    def test_pending_finds_unlisted_tombstones(self):
+        # Renamed just before a crash, never written to the list
+        leftover = os.path.join(tombstone.tombstone_root(), tombstone.PREFIX + "old")
+        os.makedirs(leftover)
+        self.assertEqual(tombstone.pending(), [leftover])
+        tombstone.reap()
+        self.assertFalse(os.path.exists(leftover))
+
+    @patch('archclean.tombstone.subprocess.Popen')
+    def test_remove_tree_background(self, mock_popen):
+        self.assertTrue(tombstone.remove_tree(self.cache, background=True))
+        self.assertFalse(os.path.exists(self.cache))
+        args, kwargs = mock_popen.call_args
+        self.assertEqual(args[0][1:], ["-m", "archclean.tombstone"])
+        self.assertTrue(kwargs["start_new_session"])
+
+    @patch('archclean.tombstone.subprocess.Popen')
+    @patch('archclean.tombstone.shutil.rmtree')
+    def test_remove_tree_foreground(self, mock_rmtree, mock_popen):
+        self.assertFalse(tombstone.remove_tree(self.cache))
+        mock_rmtree.assert_called_with(self.cache)
+        mock_popen.assert_not_called()
+
+    @patch('archclean.tombstone.subprocess.Popen')
+    def test_resume_only_with_pending(self, mock_popen):
+        tombstone.resume()
+        mock_popen.assert_not_called()
+        tombstone.bury(self.cache)
+        tombstone.resume()
+        mock_popen.assert_called_once()
+
+    def test_reap_read_only_tree(self):
+        # Go module caches are extracted without write permission
+        os.chmod(os.path.join(self.cache, "sub"), 0o555)
+        buried = tombstone.bury(self.cache)
+        tombstone.reap()
+        self.assertFalse(os.path.exists(buried))
+        self.assertEqual(tombstone.failed(), [])
+
+    @patch('archclean.tombstone.subprocess.Popen')
+    @patch('archclean.tombstone.rmtree_writable', side_effect=PermissionError)
+    def test_unremovable_tombstone_is_given_up(self, mock_rmtree, mock_popen):
+        buried = tombstone.bury(self.cache)
+        tombstone.reap()
+        self.assertEqual(tombstone.pending(), [])
+        self.assertEqual(tombstone.failed(), [buried])
+        # Reported, but no new reaper for it
+        self.assertEqual(tombstone.resume(), [buried])
+        mock_popen.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
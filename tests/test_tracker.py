@@ -0,0 +1,29 @@
+import unittest
+from unittest.mock import patch
+from archclean.tracker import Tracker
+
+class TestTracker(unittest.TestCase):
+
+    def test_totals_per_category(self):
+        tracker = Tracker()
+        tracker.add("Language", "Python (pip)", "Cleaned", "Cache purged", freed=1000, seconds=0.5)
+        tracker.add("System", "Journal", "Cleaned", "Vacuumed", freed=300, seconds=2.0)
+        tracker.add("Language", "Go", "Cleaned", "Module cache cleared", freed=200, seconds=1.0)
+        tracker.add("Language", "Rust", "Skipped", "User declined")
+
+        self.assertEqual(tracker.totals(), {"Language": 1200, "System": 300})
+        self.assertIsNone(tracker.records[-1]["Freed"])
+
+    @patch('archclean.tracker.console')
+    def test_summary_shows_grand_total(self, mock_console):
+        tracker = Tracker()
+        tracker.add("Language", "Python (pip)", "Cleaned", "Cache purged", freed=2_000_000, seconds=0.5)
+        tracker.add("Home", "Trash", "Cleaned", "Trash emptied", freed=1_000_000, seconds=0.1)
+        tracker.print_summary()
+
+        summary = mock_console.print.call_args_list[-1][0][0]
+        self.assertEqual(summary.title, "Space Reclaimed")
+        self.assertEqual(summary.columns[1].footer, "3.0 MB")
+
+if __name__ == '__main__':
+    unittest.main()
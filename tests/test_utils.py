@@ -1,71 +1,95 @@
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 from archclean import utils
 import sh
 
+def make_tool(directory, name, mode):
+    path = os.path.join(directory, name)
+    with open(path, "w") as f:
+        f.write("#!/bin/sh\n")
+    os.chmod(path, mode)
+
 class TestUtils(unittest.TestCase):
 
-    @patch('archclean.utils.shutil.which')
+    @patch('archclean.utils.which')
     def test_check_binary_exists(self, mock_which):
         mock_which.return_value = "/usr/bin/pacman"
         self.assertTrue(utils.check_binary("pacman"))
 
-    @patch('archclean.utils.shutil.which')
+    @patch('archclean.utils.which')
     def test_check_binary_not_exists(self, mock_which):
         mock_which.return_value = None
         self.assertFalse(utils.check_binary("nonexistent_binary"))
 
+    def test_which_uses_persisted_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first, second = os.path.join(tmp, "a"), os.path.join(tmp, "b")
+            os.mkdir(first)
+            os.mkdir(second)
+            # Not executable in the first directory, so the second one wins
+            make_tool(first, "tool", 0o644)
+            make_tool(second, "tool", 0o755)
+            env = {"PATH": f"{first}:{second}", "XDG_CACHE_HOME": os.path.join(tmp, "cache")}
+            with patch.dict(os.environ, env):
+                utils.forget_tools()
+                self.addCleanup(utils.forget_tools)
+                self.assertEqual(utils.which("tool"), os.path.join(second, "tool"))
+                self.assertIsNone(utils.which("missing"))
+
+                # Unchanged directories: the saved index is used without listing them
+                with patch('archclean.utils.os.listdir', side_effect=AssertionError):
+                    self.assertIn("tool", utils.load_tool_index())
+
+                # A new name changes the directory's mtime and triggers a rescan
+                make_tool(first, "other", 0o755)
+                os.utime(first, ns=(0, 1))
+                self.assertEqual(utils.load_tool_index()["other"], [first])
+
+    @patch('archclean.utils.which', return_value="/bin/ls")
     @patch('archclean.utils.sh')
-    def test_run_command_success(self, mock_sh):
-        # Mock a command like 'ls' existing in sh module
-        mock_cmd = MagicMock()
-        mock_sh.ls = mock_cmd
-        
+    def test_run_command_success(self, mock_sh, mock_which):
+        mock_cmd = mock_sh.Command.return_value
+
         result = utils.run_command("ls", ["-l"], cwd="/tmp")
-        
+
         self.assertTrue(result)
+        # The resolved path is reused instead of a second PATH lookup in sh
+        mock_sh.Command.assert_called_once_with("/bin/ls")
         mock_cmd.assert_called_once()
         args, kwargs = mock_cmd.call_args
         self.assertEqual(args[0], "-l")
         self.assertTrue(kwargs.get('_fg'))
         self.assertEqual(kwargs.get('_cwd'), "/tmp")
 
+    @patch('archclean.utils.which', return_value=None)
     @patch('archclean.utils.sh')
-    def test_run_command_fail(self, mock_sh):
-        # Mocking an attribute error if command doesn't exist in sh
-        del mock_sh.nonexistent
-        
-        # We need to simulate getattr raising AttributeError
-        # But 'sh' module uses dynamic getattr. 
-        # In our utils.py code: cmd_func = getattr(sh, command)
-        
-        # Let's mock getattr on the module itself if possible, but mocking a module and its getattr is tricky.
-        # Instead, let's rely on the fact that if we didn't set it on the mock, it might behave differently or we can side_effect.
-        
-        # Easier way: The utils.py catches AttributeError. 
-        # If we use a real mock object, getattr usually returns a new Mock unless specified.
-        # So we should force raise AttributeError.
-        
-        # However, run_command does: try: cmd_func = getattr(sh, command)
-        
-        # Let's mock the 'command' not being in sh.
-        # Since we patch archclean.utils.sh, we can configure it.
-        def raise_attr_error(name):
-            raise AttributeError
-        
-        # It's hard to mock __getattr__ on an imported module mock in this specific way without affecting others.
-        # A simpler test might be to verify it returns False if we pass a command that implies an error.
-        pass
-
-    @patch('archclean.utils.sh.sudo')
-    def test_run_command_sudo(self, mock_sudo):
-        # Mock execution with sudo
+    def test_run_command_fail(self, mock_sh, mock_which):
+        self.assertFalse(utils.run_command("nonexistent", []))
+        self.assertIsNone(utils.run_command("nonexistent", [], capture=True))
+        mock_sh.Command.assert_not_called()
+
+    @patch('archclean.utils.which', side_effect=lambda name: f"/usr/bin/{name}")
+    @patch('archclean.utils.sh')
+    def test_run_command_sudo(self, mock_sh, mock_which):
+        mock_sudo = mock_sh.Command.return_value
         mock_bake = mock_sudo.bake.return_value
-        
+
         # We need to mock os.geteuid to return non-root
         with patch('os.geteuid', return_value=1000):
             result = utils.run_command("pacman", ["-Syu"], sudo=True)
-            
+
         self.assertTrue(result)
-        mock_sudo.bake.assert_called_with("pacman")
+        mock_sh.Command.assert_called_with("/usr/bin/sudo")
+        mock_sudo.bake.assert_called_with("/usr/bin/pacman")
         mock_bake.assert_called_once()
+
+    def test_parse_size(self):
+        self.assertEqual(utils.parse_size("500"), 500)
+        self.assertEqual(utils.parse_size("100K"), 100 * 1024)
+        self.assertEqual(utils.parse_size("1.5M"), 1536 * 1024)
+        self.assertEqual(utils.parse_size("2GiB"), 2 * 1024**3)
+        with self.assertRaises(ValueError):
+            utils.parse_size("big")
+